@@ -9,7 +9,13 @@ class Base(DeclarativeBase, TimestampMixin):
     """
 
     def to_dict(self):
+        state = inspect(self)
+        unloaded = state.unloaded
+
+        # colunas deferred só entram quando foram carregadas explicitamente
+        # (undefer/undefer_group), evitando lazy load implícito em AsyncSession
         return {
             column.key: getattr(self, column.key)
-            for column in inspect(self).mapper.column_attrs
+            for column in state.mapper.column_attrs
+            if not (column.deferred and column.key in unloaded)
         }
@@ -4,10 +4,89 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# =====================================================
+# Perfis de engine do banco
+# =====================================================
+# Presets por ambiente (APP_ENV) e por papel do processo:
+# - "api"    → uvicorn (AsyncSession, muitas requisições curtas)
+# - "worker" → Celery (SessionLocal sync, poucos jobs longos por processo)
+#
+# Cada worker Celery (prefork) abre seu próprio pool, então o preset de worker
+# é propositalmente pequeno. Qualquer valor pode ser sobrescrito por env var
+# no formato DB_<PAPEL>_<CAMPO>, ex: DB_API_POOL_SIZE=20.
+ENGINE_PROFILES = {
+    "development": {
+        "api": {
+            "pool_size": 5,
+            "max_overflow": 5,
+            "pool_recycle": 1800,
+            "pool_timeout": 30,
+            "statement_timeout_ms": 0,
+            "echo": True,
+        },
+        "worker": {
+            "pool_size": 2,
+            "max_overflow": 2,
+            "pool_recycle": 1800,
+            "pool_timeout": 60,
+            "statement_timeout_ms": 0,
+            "echo": False,
+        },
+    },
+    "production": {
+        "api": {
+            "pool_size": 10,
+            "max_overflow": 10,
+            "pool_recycle": 1800,
+            "pool_timeout": 10,
+            "statement_timeout_ms": 30000,
+            "echo": False,
+        },
+        "worker": {
+            "pool_size": 2,
+            "max_overflow": 3,
+            "pool_recycle": 1800,
+            "pool_timeout": 60,
+            "statement_timeout_ms": 300000,
+            "echo": False,
+        },
+    },
+}
+
+
+def _env_bool(value: str) -> bool:
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+class EngineProfile:
+    def __init__(
+        self,
+        *,
+        pool_size: int,
+        max_overflow: int,
+        pool_recycle: int,
+        pool_timeout: int,
+        statement_timeout_ms: int,
+        echo: bool,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_timeout = pool_timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.echo = echo
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
 class Settings:
     def __init__(self):
         self.app_name = os.getenv("APP_NAME", "SmartQA")
 
+        # development | production
+        self.APP_ENV = os.getenv("APP_ENV", "development")
+
         self.database_url = os.getenv("DATABASE_URL")
         self.database_url_sync = os.getenv("DATABASE_URL_SYNC")
 
@@ -24,5 +103,78 @@ class Settings:
 
         self.FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost")
 
+    def engine_profile(self, role: str) -> EngineProfile:
+        """
+        Resolve o perfil de engine para o papel ("api" | "worker") no APP_ENV atual,
+        aplicando overrides DB_<PAPEL>_<CAMPO> e DB_ECHO.
+        """
+        env_profiles = ENGINE_PROFILES.get(self.APP_ENV)
+        if env_profiles is None:
+            raise ValueError(
+                f"APP_ENV desconhecido: {self.APP_ENV!r} (valores válidos: {', '.join(ENGINE_PROFILES)})"
+            )
+        if role not in env_profiles:
+            raise ValueError(f"Perfil de engine desconhecido: {role}")
+
+        values = dict(env_profiles[role])
+        prefix = f"DB_{role.upper()}_"
+
+        for key, default in values.items():
+            raw = os.getenv(prefix + key.upper())
+            if raw is None:
+                continue
+            values[key] = _env_bool(raw) if isinstance(default, bool) else int(raw)
+
+        if os.getenv("DB_ECHO") is not None:
+            values["echo"] = _env_bool(os.getenv("DB_ECHO"))
+
+        return EngineProfile(**values)
+
 
 settings = Settings()
+
+
+def create_db_engine(role: str, *, async_engine: bool):
+    """
+    Cria o engine do SQLAlchemy a partir do perfil do papel informado.
+
+    - async_engine=True  → create_async_engine (asyncpg) com DATABASE_URL
+    - async_engine=False → create_engine (psycopg2) com DATABASE_URL_SYNC
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.core.database.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
+    profile = settings.engine_profile(role)
+
+    connect_args = {}
+    if profile.statement_timeout_ms:
+        if async_engine:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(profile.statement_timeout_ms),
+            }
+        else:
+            connect_args["options"] = f"-c statement_timeout={profile.statement_timeout_ms}"
+
+    kwargs = dict(
+        echo=profile.echo,
+        pool_pre_ping=True,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_recycle=profile.pool_recycle,
+        pool_timeout=profile.pool_timeout,
+        connect_args=connect_args,
+    )
+
+    if async_engine:
+        return create_async_engine(
+            settings.database_url,
+            poolclass=TimedAsyncAdaptedQueuePool,
+            **kwargs,
+        )
+
+    return create_engine(
+        settings.database_url_sync,
+        poolclass=TimedQueuePool,
+        **kwargs,
+    )
@@ -1,8 +1,9 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from app.core.config import create_db_engine
+from app.core.database.pool_metrics import pool_stats
 
-engine = create_async_engine(settings.database_url, echo=True)
+engine = create_db_engine("api", async_engine=True)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -13,3 +14,7 @@ AsyncSessionLocal = sessionmaker(
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def get_pool_stats() -> dict:
+    return pool_stats(engine)
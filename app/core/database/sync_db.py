@@ -1,14 +1,16 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from app.core.config import create_db_engine
+from app.core.database.pool_metrics import pool_stats
 
-engine = create_engine(
-    settings.database_url_sync,
-    pool_pre_ping=True
-)
+# Usado pelos jobs Celery e seeders
+engine = create_db_engine("worker", async_engine=False)
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
+
+
+def get_pool_stats() -> dict:
+    return pool_stats(engine)
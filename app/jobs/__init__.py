@@ -6,4 +6,6 @@ import app.jobs.ia.generate_test_case
 import app.jobs.ia.generate_scripts_playwright
 import app.jobs.ia.generate_documentation
 
+import app.jobs.screen.ingest_documents
+
 import app.jobs.organization.send_invitation_email
\ No newline at end of file
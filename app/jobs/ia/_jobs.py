@@ -20,12 +20,12 @@ def mark_job_running(db, target_id: int, job_type: str) -> None:
     )
 
 
-def mark_job_completed(db, target_id: int, job_type: str) -> None:
+def mark_job_completed(db, target_id: int, job_type: str, usage: dict | None = None) -> None:
     db.query(TargetJob).filter(
         TargetJob.target_id == target_id,
         TargetJob.job_type == job_type,
     ).update(
-        {"status": "completed", "completed_at": datetime.now(timezone.utc)},
+        {"status": "completed", "completed_at": datetime.now(timezone.utc), **(usage or {})},
         synchronize_session=False,
     )
 
@@ -81,12 +81,12 @@ def mark_screen_job_running(db, screen_id: int, job_type: str) -> None:
     )
 
 
-def mark_screen_job_completed(db, screen_id: int, job_type: str) -> None:
+def mark_screen_job_completed(db, screen_id: int, job_type: str, usage: dict | None = None) -> None:
     db.query(ScreenJob).filter(
         ScreenJob.screen_id == screen_id,
         ScreenJob.job_type == job_type,
     ).update(
-        {"status": "completed", "completed_at": datetime.now(timezone.utc)},
+        {"status": "completed", "completed_at": datetime.now(timezone.utc), **(usage or {})},
         synchronize_session=False,
     )
 
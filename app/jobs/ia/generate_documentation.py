@@ -1,6 +1,6 @@
 import logging
 import os
-import hashlib
+import time
 
 import app.core.database.models
 from app.core.celery_app import celery_app
@@ -9,6 +9,7 @@ from app.modules.screen.service.screen_service import ScreenService
 from app.modules.screen.model.screen_model import Screen
 from app.modules.screen.model.access_credential_model import AccessCredential
 from app.modules.ai.utils.ai_utils import AiUtils
+from app.modules.ai.utils.token_budget import TokenBudget
 from app.modules.ai.service.docs_generator_service import DocumentationAgent
 from app.modules.ai.service.screen_explorer_service import ScreenExplorerService
 from app.modules.documentation.model.documentation_model import Documentation
@@ -18,12 +19,54 @@ from sqlalchemy import func
 
 logger = logging.getLogger(__name__)
 
+# O rascunho é atualizado em lotes: a cada N segundos ou N caracteres novos
+DOCS_STREAM_FLUSH_SECONDS = float(os.getenv("DOCS_STREAM_FLUSH_SECONDS", "1.0"))
+DOCS_STREAM_FLUSH_CHARS = int(os.getenv("DOCS_STREAM_FLUSH_CHARS", "800"))
+
+
+def _stream_into_draft(db, documentation_id: int, deltas) -> str:
+    """
+    Consome os trechos do modelo anexando ao content do rascunho em lotes
+    (UPDATE ... SET content = content || :trecho), sem reescrever o texto
+    inteiro a cada flush. Retorna o texto final.
+    """
+    parts: list[str] = []
+    pending: list[str] = []
+    pending_chars = 0
+    last_flush = time.monotonic()
+
+    def _flush() -> None:
+        nonlocal pending_chars, last_flush
+        if pending:
+            db.query(Documentation).filter(Documentation.id == documentation_id).update(
+                {"content": Documentation.content + "".join(pending)},
+                synchronize_session=False,
+            )
+            db.commit()
+            pending.clear()
+        pending_chars = 0
+        last_flush = time.monotonic()
+
+    for delta in deltas:
+        parts.append(delta)
+        pending.append(delta)
+        pending_chars += len(delta)
+
+        if (
+            pending_chars >= DOCS_STREAM_FLUSH_CHARS
+            or time.monotonic() - last_flush >= DOCS_STREAM_FLUSH_SECONDS
+        ):
+            _flush()
+
+    _flush()
+    return "".join(parts).strip()
+
 
 @celery_app.task(
     name="jobs.ia.generate_documentation",
     autoretry_for=(),
 )
-def generate_documentation(*, screen_id: int, user_id: int):
+def generate_documentation(*, screen_id: int, user_id: int, use_cache: bool = True):
     logger.info(
         "🚀 Job generate_documentation iniciado",
         extra={"screen_id": screen_id, "user_id": user_id},
@@ -73,7 +116,9 @@ def generate_documentation(*, screen_id: int, user_id: int):
             }
 
             descriptions = explorer_service.generate_screen_descriptions(
-                analysis=explorer_payload
+                analysis=explorer_payload,
+                screen_id=screen_id,
+                use_cache=use_cache,
             )
 
             db.query(Screen).filter(Screen.id == screen_id).update(
@@ -106,17 +151,17 @@ def generate_documentation(*, screen_id: int, user_id: int):
             "documentation_description": documentation_description,
         }
 
-        docs_prompt = AiUtils.build_docs_prompt(analysis=analysis_payload)
+        ai_model_used = os.getenv("OPENAI_MODEL_DOCS", "gpt-4.1-mini")
+        budget = TokenBudget(model=ai_model_used, job="generate_documentation")
+        docs_prompt = AiUtils.build_docs_prompt(analysis=analysis_payload, budget=budget)
+        budget.log(screen_id=screen_id)
 
         logger.info(
             "🧠 Prompt Docs gerado",
             extra={"screen_id": screen_id},
         )
 
-        ai_model_used = os.getenv("OPENAI_MODEL_DOCS", "gpt-4.1-mini")
-
         agent = DocumentationAgent(model=ai_model_used)
-        documentation_text = agent.generate(docs_prompt)
 
         last_version = (
             db.query(func.max(Documentation.version))
@@ -128,22 +173,43 @@ def generate_documentation(*, screen_id: int, user_id: int):
 
         title = screen.get("name") or f"Documentação funcional - Tela {screen_id}"
 
-        prompt_hash = hashlib.sha256(docs_prompt.encode()).hexdigest()
-
+        # rascunho visível desde o início: o SSE acompanha o content crescendo
         documentation = Documentation(
             screen_id=screen_id,
             title=title,
             version=next_version,
-            status="generated",
-            content=documentation_text,
+            status="generating",
+            content="",
             content_format="text",
             generated_by="ai",
             generator_model=ai_model_used,
-            prompt_hash=prompt_hash,
+            prompt_hash=agent.prompt_hash(docs_prompt),
         )
-
         db.add(documentation)
-        mark_screen_job_completed(db, screen_id, "documentation")
+        db.commit()
+        documentation_id = documentation.id
+
+        try:
+            documentation_text = _stream_into_draft(
+                db,
+                documentation_id,
+                agent.stream(docs_prompt, use_cache=use_cache),
+            )
+        except Exception as e:
+            db.rollback()
+            db.query(Documentation).filter(Documentation.id == documentation_id).update(
+                {"status": "failed", "error_message": str(e)[:2000]},
+                synchronize_session=False,
+            )
+            db.commit()
+            raise
+
+        db.query(Documentation).filter(Documentation.id == documentation_id).update(
+            {"status": "generated", "content": documentation_text},
+            synchronize_session=False,
+        )
+        agent.usage.log("generate_documentation", screen_id=screen_id)
+        mark_screen_job_completed(db, screen_id, "documentation", usage=agent.usage.as_dict())
         db.commit()
 
         logger.info(
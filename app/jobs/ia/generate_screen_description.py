@@ -19,9 +19,10 @@ logger = logging.getLogger(__name__)
 )
 def generate_screen_description(*, analysis_id: int, user_id: int, requirements: list = None):
     """
-    Explora a(s) tela(s) do alvo via BrowserUse.
+    Explora todas as telas do alvo via BrowserUse, em paralelo e com limite
+    de concorrência (EXPLORER_MAX_CONCURRENCY).
 
-    - Descrições de execução (tests_description, playwright_description) → salvas no Target
+    - Descrições de execução (tests_description, playwright_description) → mescladas e salvas no Target
     - Descrições de conhecimento (documentation_description, uiux_description) → salvas em cada Screen
     """
     logger.info(
@@ -45,49 +46,50 @@ def generate_screen_description(*, analysis_id: int, user_id: int, requirements:
         if not isinstance(target_payload, dict):
             target_payload = target_payload.to_dict()
 
-        # Obtém a primeira tela (tela primária para exploração)
-        screens = target_payload.get("screens", [])
+        # Ordem estável das telas para a descrição mesclada do Target
+        screens = sorted(target_payload.get("screens", []), key=lambda s: s["id"])
         if not screens:
             raise ValueError(f"Target {analysis_id} não possui telas associadas")
 
-        primary_screen = screens[0]
-
-        # Monta payload de análise compatível com o ScreenExplorerService
-        analysis_payload = {
-            "id": analysis_id,
-            "name": target_payload.get("name"),
-            "target_url": primary_screen.get("url"),
-            "description": target_payload.get("description"),
-            "screen_context": primary_screen.get("screen_context"),
-            "access_credentials": primary_screen.get("access_credentials", []),
-        }
+        # Um payload de análise por tela, compatível com o ScreenExplorerService
+        analysis_payloads = [
+            {
+                "id": analysis_id,
+                "name": target_payload.get("name"),
+                "target_url": screen.get("url"),
+                "description": target_payload.get("description"),
+                "screen_context": screen.get("screen_context"),
+                "access_credentials": screen.get("access_credentials", []),
+            }
+            for screen in screens
+        ]
 
         db.query(Target).filter(
             Target.id == analysis_id
         ).update({"status": "generating"}, synchronize_session=False)
         db.commit()
 
-        descriptions = explorer_service.generate_screen_descriptions(
-            analysis=analysis_payload
+        results = explorer_service.explore_screens(
+            analyses=analysis_payloads,
+            screen_ids=[screen["id"] for screen in screens],
         )
 
-        # Salva descrições de execução no Target
+        # Salva descrições de execução (mescladas entre as telas) no Target
+        target_descriptions = explorer_service.merge_target_descriptions(screens, results)
         db.query(Target).filter(Target.id == analysis_id).update(
-            {
-                "tests_description": descriptions["tests_description"],
-                "playwright_description": descriptions["playwright_description"],
-            },
+            target_descriptions,
             synchronize_session=False,
         )
 
-        # Salva descrições de conhecimento na Screen primária
-        db.query(Screen).filter(Screen.id == primary_screen["id"]).update(
-            {
-                "documentation_description": descriptions["documentation_description"],
-                "uiux_description": descriptions["uiux_description"],
-            },
-            synchronize_session=False,
-        )
+        # Salva descrições de conhecimento em cada Screen
+        for screen, descriptions in zip(screens, results):
+            db.query(Screen).filter(Screen.id == screen["id"]).update(
+                {
+                    "documentation_description": descriptions["documentation_description"],
+                    "uiux_description": descriptions["uiux_description"],
+                },
+                synchronize_session=False,
+            )
 
         db.commit()
 
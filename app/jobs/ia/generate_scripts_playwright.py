@@ -6,6 +6,7 @@ from app.core.celery_app import celery_app
 from app.core.database.sync_db import SessionLocal
 from app.modules.target.service.target_service import TargetService
 from app.modules.ai.utils.ai_utils import AiUtils
+from app.modules.ai.utils.token_budget import TokenBudget
 
 from app.modules.ai.service.scripts_playwright_service import ScriptsPlaywrightAgent
 from app.modules.playwright.model.playwright_script_model import PlaywrightScript
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
     name="jobs.ia.generate_scripts_playwright",
     autoretry_for=(),
 )
-def generate_scripts_playwright(*, analysis_id: int, user_id: int):
+def generate_scripts_playwright(*, analysis_id: int, user_id: int, use_cache: bool = True):
     logger.info(
         "🚀 Job generate_scripts_playwright iniciado",
         extra={"target_id": analysis_id, "user_id": user_id},
@@ -59,18 +60,21 @@ def generate_scripts_playwright(*, analysis_id: int, user_id: int):
             "access_credentials": primary_screen.get("access_credentials", []),
         }
 
+        ai_model_used = os.getenv("OPENAI_MODEL_PLAYWRIGHT", "gpt-4.1-mini")
+        budget = TokenBudget(model=ai_model_used, job="generate_scripts_playwright")
         scripts_playwright_prompt = AiUtils.build_playwright_script_prompt(
             analysis=analysis_payload,
+            budget=budget,
         )
+        budget.log(target_id=analysis_id)
 
         logger.info(
             "🧠 Prompt Playwright gerado",
             extra={"target_id": analysis_id, "user_id": user_id},
         )
 
-        ai_model_used = os.getenv("OPENAI_MODEL_PLAYWRIGHT", "gpt-4.1-mini")
         agent = ScriptsPlaywrightAgent(model=ai_model_used)
-        result = agent.generate(scripts_playwright_prompt)
+        result = agent.generate(scripts_playwright_prompt, use_cache=use_cache)
 
         last_version = (
             db.query(PlaywrightScript.version)
@@ -89,12 +93,14 @@ def generate_scripts_playwright(*, analysis_id: int, user_id: int):
             status="generated",
             script=result["script"],
             generator_model=ai_model_used,
+            prompt_hash=agent.prompt_hash(scripts_playwright_prompt),
             meta={"source": "celery_job"},
         )
 
         db.add(script_row)
 
-        mark_job_completed(db, analysis_id, "scripts")
+        agent.usage.log("generate_scripts_playwright", target_id=analysis_id)
+        mark_job_completed(db, analysis_id, "scripts", usage=agent.usage.as_dict())
         db.commit()
 
         logger.info(
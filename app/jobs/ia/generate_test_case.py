@@ -1,31 +1,33 @@
 from app.core.celery_app import celery_app
 import logging
+import os
 
-from app.modules.ai.service.tests_generator_service import TestCaseAgent
+from app.modules.ai.service.tests_generator_service import ShardedTestCaseGenerator, TestCaseAgent
 from app.modules.ai.utils.ai_utils import AiUtils
+from app.modules.ai.utils.token_budget import TokenBudget
 from app.core.database.sync_db import SessionLocal
 
 from app.modules.target.model.target_model import Target
 from app.modules.test_case.model.test_case_model import TestCase
 from app.modules.test_case.model.test_case_step_model import TestCaseStep
 from app.modules.target.service.target_service import TargetService
+from app.modules.test_case.service.test_case_similarity import (
+    TEST_CASE_DUPLICATE_POLICY,
+    TestCaseSimilarityIndex,
+    case_text,
+)
+from sqlalchemy.orm import selectinload
 from app.jobs.ia._jobs import mark_job_running, mark_job_completed, mark_job_error
 
 
 logger = logging.getLogger(__name__)
 
 
-ALLOWED_TEST_TYPE = {"functional", "regression", "smoke", "exploratory"}
-ALLOWED_SCENARIO_TYPE = {"positive", "negative", "edge"}
-ALLOWED_PRIORITY = {"low", "medium", "high", "critical"}
-ALLOWED_RISK = {"low", "medium", "high"}
-
-
-def normalize_enum(value: str, allowed: set, default: str) -> str:
-    if not value:
-        return default
-    v = str(value).strip().lower()
-    return v if v in allowed else default
+# Casos são gravados (e ficam visíveis) em lotes conforme o stream avança
+TEST_CASE_INSERT_BATCH = int(os.getenv("TEST_CASE_INSERT_BATCH", "5"))
+# Divisão da tests_description em seções geradas em paralelo
+TEST_CASE_SECTION_CHARS = int(os.getenv("TEST_CASE_SECTION_CHARS", "3000"))
+TEST_CASE_MAX_SECTIONS = int(os.getenv("TEST_CASE_MAX_SECTIONS", "6"))
 
 
 def safe_text(value):
@@ -35,6 +37,115 @@ def safe_text(value):
     return v if v else None
 
 
+def _load_similarity_index(db, target_id: int) -> TestCaseSimilarityIndex:
+    """Índice com os casos ativos já gravados para o alvo."""
+    index = TestCaseSimilarityIndex()
+    existing = (
+        db.query(TestCase)
+        .options(selectinload(TestCase.steps))
+        .filter(TestCase.target_id == target_id, TestCase.deleted_at.is_(None))
+        .all()
+    )
+    for tc in existing:
+        index.add(tc.id, case_text(tc.title, tc.objective, (s.action for s in tc.steps if not s.deleted_at)))
+    return index
+
+
+def _insert_batch(
+    db,
+    target_id: int,
+    ai_model_used: str,
+    payloads: list[dict],
+    index: TestCaseSimilarityIndex | None = None,
+) -> tuple[int, int, int]:
+    """
+    Insere um lote de casos (e seus steps), consultando o índice de
+    similaridade do alvo. Retorna (casos, steps, duplicados).
+    """
+    created_test_cases: list[tuple[TestCase, dict]] = []
+    duplicates = 0
+
+    for tc in payloads:
+        title = safe_text(tc.get("title"))
+        if not title:
+            logger.warning("[GenerateTestCase] Caso ignorado: sem title")
+            continue
+
+        duplicate_of_id = None
+        text = case_text(
+            title,
+            safe_text(tc.get("objective")),
+            (safe_text(st.get("action")) for st in (tc.get("steps") or []) if isinstance(st, dict)),
+        )
+        if index is not None:
+            match = index.match(text)
+            if match:
+                duplicates += 1
+                original, similarity = match
+                if TEST_CASE_DUPLICATE_POLICY == "skip":
+                    logger.info(f"[GenerateTestCase] Caso duplicado descartado ({similarity:.2f}): {title[:80]}")
+                    continue
+                if isinstance(original, TestCase):
+                    if original.id is None:
+                        db.flush()
+                    original = original.id
+                duplicate_of_id = original
+
+        test_case = TestCase(
+            target_id=target_id,
+            title=title[:255],
+            description=safe_text(tc.get("description")),
+            objective=safe_text(tc.get("objective")),
+            test_type=tc["test_type"],
+            scenario_type=tc["scenario_type"],
+            priority=tc["priority"],
+            risk_level=tc["risk_level"],
+            preconditions=safe_text(tc.get("preconditions")),
+            expected_result=safe_text(tc.get("expected_result")),
+            status="generated",
+            generated_by_ai=True,
+            ai_model_used=ai_model_used,
+            duplicate_of_id=duplicate_of_id,
+        )
+
+        db.add(test_case)
+        created_test_cases.append((test_case, tc))
+        if index is not None:
+            index.add(test_case, text)
+
+    db.flush()
+
+    steps_to_create: list[TestCaseStep] = []
+
+    for tc_obj, tc_payload in created_test_cases:
+        steps = tc_payload.get("steps") or []
+        if not isinstance(steps, list) or len(steps) == 0:
+            continue
+
+        for st in steps:
+            order = st.get("order")
+            action = safe_text(st.get("action"))
+            expected = safe_text(st.get("expected_result"))
+
+            if order is None or not action or not expected:
+                continue
+
+            steps_to_create.append(
+                TestCaseStep(
+                    test_case_id=tc_obj.id,
+                    order=int(order),
+                    action=action,
+                    expected_result=expected,
+                    step_type="action",
+                )
+            )
+
+    if steps_to_create:
+        db.bulk_save_objects(steps_to_create)
+
+    return len(created_test_cases), len(steps_to_create), duplicates
+
+
 @celery_app.task(
     name="jobs.ia.generate_test_case",
     autoretry_for=(Exception,),
@@ -45,6 +156,7 @@ def generate_test_case(*args, **kwargs):
 
     target_id = kwargs.get("analysis_id")
     ai_model_used = kwargs.get("ai_model_used", "gpt-4.1-mini")
+    use_cache = kwargs.get("use_cache", True)
 
     if not target_id:
         raise ValueError("analysis_id (target_id) não informado")
@@ -86,89 +198,105 @@ def generate_test_case(*args, **kwargs):
         documents_block = None
         documents = analysis_payload.get("documents")
         if documents:
-            documents_text = AiUtils.read_documents_with_docling(documents=documents)
+            # consulta da recuperação: o que o alvo deve testar
+            retrieval_query = "\n".join(
+                filter(None, [analysis_payload.get("description"), analysis_payload.get("tests_description")])
+            )
+            documents_text = AiUtils.read_documents_with_docling(
+                documents=documents,
+                query=retrieval_query,
+            )
             if documents_text and documents_text.strip():
                 documents_block = AiUtils.build_documents_block(documents_text)
 
-        test_case_prompt = AiUtils.build_test_case_prompt(
-            ui_description=analysis_payload["tests_description"],
-            analysis=analysis_payload,
-            documents_block=documents_block,
+        # map-reduce: uma chamada por seção da interface, em paralelo
+        sections = AiUtils.split_test_sections(
+            analysis_payload["tests_description"],
+            max_chars=TEST_CASE_SECTION_CHARS,
+            max_sections=TEST_CASE_MAX_SECTIONS,
         )
-
-        agent = TestCaseAgent(model=ai_model_used)
-        test_cases_payload = agent.generate(test_case_prompt)
-
-        if not isinstance(test_cases_payload, list) or len(test_cases_payload) == 0:
-            raise ValueError("IA retornou lista vazia de casos de teste")
-
-        logger.info(f"[GenerateTestCase] IA retornou {len(test_cases_payload)} casos")
-
-        created_test_cases: list[TestCase] = []
-
-        for idx, tc in enumerate(test_cases_payload, start=1):
-            title = safe_text(tc.get("title"))
-            if not title:
-                logger.warning(f"[GenerateTestCase] Caso {idx} ignorado: sem title")
-                continue
-
-            test_case = TestCase(
-                target_id=target_id,
-                title=title[:255],
-                description=safe_text(tc.get("description")),
-                objective=safe_text(tc.get("objective")),
-                test_type=normalize_enum(tc.get("test_type"), ALLOWED_TEST_TYPE, "functional"),
-                scenario_type=normalize_enum(tc.get("scenario_type"), ALLOWED_SCENARIO_TYPE, "positive"),
-                priority=normalize_enum(tc.get("priority"), ALLOWED_PRIORITY, "medium"),
-                risk_level=normalize_enum(tc.get("risk_level"), ALLOWED_RISK, "medium"),
-                preconditions=safe_text(tc.get("preconditions")),
-                expected_result=safe_text(tc.get("expected_result")),
-                status="generated",
-                generated_by_ai=True,
-                ai_model_used=ai_model_used,
+        budget = TokenBudget(model=ai_model_used, job="generate_test_case")
+        test_case_prompts = [
+            AiUtils.build_test_case_prompt(
+                ui_description=section,
+                analysis=analysis_payload,
+                documents_block=documents_block,
+                section=(index, len(sections)),
+                budget=budget,
             )
+            for index, section in enumerate(sections, start=1)
+        ]
+        budget.log(target_id=target_id)
 
-            db.add(test_case)
-            created_test_cases.append(test_case)
-
-        db.flush()
+        logger.info(f"[GenerateTestCase] {len(test_case_prompts)} seções | target_id={target_id}")
 
-        steps_to_create: list[TestCaseStep] = []
-
-        for tc_obj, tc_payload in zip(created_test_cases, test_cases_payload):
-            steps = tc_payload.get("steps") or []
-            if not isinstance(steps, list) or len(steps) == 0:
-                continue
+        agent = TestCaseAgent(model=ai_model_used)
+        generator = ShardedTestCaseGenerator(agent)
 
-            for st in steps:
-                order = st.get("order")
-                action = safe_text(st.get("action"))
-                expected = safe_text(st.get("expected_result"))
+        similarity_index = (
+            _load_similarity_index(db, target_id) if TEST_CASE_DUPLICATE_POLICY != "off" else None
+        )
 
-                if order is None or not action or not expected:
-                    continue
+        saved_cases = 0
+        saved_steps = 0
+        similar_cases = 0
+        batch: list[dict] = []
+        insert_failed = False
 
-                steps_to_create.append(
-                    TestCaseStep(
-                        test_case_id=tc_obj.id,
-                        order=int(order),
-                        action=action,
-                        expected_result=expected,
-                        step_type="action",
-                    )
-                )
+        def _flush_batch() -> None:
+            nonlocal saved_cases, saved_steps, similar_cases, insert_failed
+            if not batch:
+                return
+            try:
+                cases, steps, duplicates = _insert_batch(db, target_id, ai_model_used, batch, similarity_index)
+                db.commit()
+            except Exception:
+                insert_failed = True
+                raise
+            saved_cases += cases
+            saved_steps += steps
+            similar_cases += duplicates
+            batch.clear()
+
+        try:
+            for tc in generator.stream(test_case_prompts, use_cache=use_cache):
+                batch.append(tc)
+                if len(batch) >= TEST_CASE_INSERT_BATCH:
+                    _flush_batch()
+            _flush_batch()
+        except Exception as e:
+            db.rollback()
+            if batch and not insert_failed:
+                # o stream caiu: os casos já validados do lote em aberto ainda são gravados
+                try:
+                    _flush_batch()
+                except Exception as flush_error:
+                    db.rollback()
+                    logger.warning(f"[GenerateTestCase] Falha ao salvar lote pendente: {flush_error}")
+            if saved_cases == 0:
+                raise
+            # o que já foi salvo fica: não reexecuta para não duplicar casos
+            logger.warning(
+                f"[GenerateTestCase] Stream interrompido — mantendo {saved_cases} casos já salvos | "
+                f"target_id={target_id} | erro={e}"
+            )
 
-        if steps_to_create:
-            db.bulk_save_objects(steps_to_create)
+        if saved_cases == 0 and similar_cases == 0:
+            raise ValueError("IA retornou lista vazia de casos de teste")
 
-        mark_job_completed(db, target_id, "test_cases")
+        agent.usage.log("generate_test_case", target_id=target_id, secoes=len(test_case_prompts))
+        mark_job_completed(db, target_id, "test_cases", usage=agent.usage.as_dict())
         db.commit()
 
         logger.info(
             f"✅ Job GenerateTestCase finalizado | "
             f"target_id={target_id} | "
-            f"test_cases_salvos={len(created_test_cases)} | "
-            f"steps_salvos={len(steps_to_create)}"
+            f"test_cases_salvos={saved_cases} | "
+            f"steps_salvos={saved_steps} | "
+            f"duplicados={generator.duplicates + similar_cases} | "
+            f"corrigidos={agent.salvaged} | "
+            f"descartados={agent.dropped} | "
+            f"secoes_com_falha={generator.failed_shards or 0}"
         )
 
     except Exception as e:
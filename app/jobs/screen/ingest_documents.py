@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import app.core.database.models
+from app.core.celery_app import celery_app
+from app.core.database.sync_db import SessionLocal
+from app.modules.ai.utils.ai_utils import AiUtils
+from app.modules.screen.model.screen_document_model import ScreenDocument
+from app.modules.screen.model.screen_model import Screen
+from app.modules.screen.service.screen_document_service import ScreenDocumentService
+from sqlalchemy.orm import undefer
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="jobs.screen.ingest_documents",
+    autoretry_for=(),
+)
+def ingest_documents(*, screen_id: int, document_ids: list[int]):
+    """
+    Pré-processa os documentos recém-enviados de uma tela:
+    texto extraído, número de páginas e dica de idioma ficam salvos no
+    ScreenDocument, e o texto alimenta o cache usado por read_documents_with_docling.
+
+    Cada documento é tratado isoladamente: erro em um não impede os demais.
+    """
+    logger.info(
+        "🚀 Job ingest_documents iniciado",
+        extra={"screen_id": screen_id, "documents": len(document_ids)},
+    )
+
+    db = SessionLocal()
+    summary = {"completed": 0, "error": 0}
+
+    try:
+        documents = (
+            db.query(ScreenDocument)
+            .filter(
+                ScreenDocument.screen_id == screen_id,
+                ScreenDocument.id.in_(document_ids),
+            )
+            .all()
+        )
+
+        for document in documents:
+            document.ingestion_status = "processing"
+            document.ingestion_error = None
+            db.commit()
+
+            try:
+                path = Path(document.path)
+                if not path.is_file():
+                    raise FileNotFoundError(f"Arquivo não encontrado: {document.path}")
+
+                content_hash = ScreenDocumentService.hash_file(str(path))
+
+                # mesmo conteúdo já ingerido (outra tela/upload): reaproveita
+                previous = (
+                    db.query(ScreenDocument)
+                    .options(undefer(ScreenDocument.extracted_text))
+                    .filter(
+                        ScreenDocument.content_hash == content_hash,
+                        ScreenDocument.extracted_text.isnot(None),
+                        ScreenDocument.id != document.id,
+                    )
+                    .first()
+                )
+
+                if previous:
+                    text = previous.extracted_text
+                    page_count = previous.page_count
+                else:
+                    extraction = AiUtils.extract_document(str(path), content_type=document.type)
+                    text = extraction["text"]
+                    page_count = extraction["page_count"]
+
+                document.content_hash = content_hash
+                document.extracted_text = text
+                document.extracted_at = datetime.utcnow()
+                document.page_count = page_count
+                document.language = AiUtils.detect_language_hint(text)
+                document.ingestion_status = "completed"
+                db.commit()
+                summary["completed"] += 1
+
+            except Exception as e:
+                db.rollback()
+                logger.exception(
+                    "❌ Erro ao ingerir documento",
+                    extra={"screen_id": screen_id, "document_id": document.id},
+                )
+                db.query(ScreenDocument).filter(ScreenDocument.id == document.id).update(
+                    {"ingestion_status": "error", "ingestion_error": f"{type(e).__name__}: {e}"[:1000]},
+                    synchronize_session=False,
+                )
+                db.commit()
+                summary["error"] += 1
+
+        logger.info("✅ Job ingest_documents finalizado", extra={"screen_id": screen_id, **summary})
+        return {"screen_id": screen_id, **summary}
+
+    finally:
+        db.close()
+
+
+def queue_pending_ingestion(dry_run: bool = False) -> dict:
+    """
+    Backfill: enfileira a ingestão dos documentos ainda "pending" — os que
+    existiam antes da coluna ingestion_status e os cujo envio ao broker falhou.
+    Um job por tela, como no upload.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(ScreenDocument.screen_id, ScreenDocument.id)
+            .join(Screen, Screen.id == ScreenDocument.screen_id)
+            .filter(
+                ScreenDocument.ingestion_status == "pending",
+                Screen.deleted_at.is_(None),
+            )
+            .order_by(ScreenDocument.screen_id, ScreenDocument.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+    by_screen: dict[int, list[int]] = {}
+    for screen_id, document_id in rows:
+        by_screen.setdefault(screen_id, []).append(document_id)
+
+    if not dry_run:
+        for screen_id, document_ids in by_screen.items():
+            celery_app.send_task(
+                "jobs.screen.ingest_documents",
+                kwargs={"screen_id": screen_id, "document_ids": document_ids},
+            )
+
+    logger.info(
+        f"[IngestDocuments] Backfill: {len(rows)} documentos pendentes em {len(by_screen)} telas"
+        + (" (dry-run, nada enfileirado)" if dry_run else " enfileirados")
+    )
+    return {"screens": len(by_screen), "documents": len(rows)}
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from app.core.config import settings
@@ -16,6 +16,8 @@ from app.modules.plans.router import router as plans_router
 from app.modules.email.router import router as email_router
 from app.modules.notification.router import router as notification_router
 import app.core.database.models
+from app.core.database.async_db import get_pool_stats
+from app.core.dependencies import get_current_user_id
 
 load_dotenv()
 
@@ -46,4 +48,16 @@ app.include_router(plans_router)
 app.include_router(email_router)
 app.include_router(notification_router)
 
+
+@app.get("/health/db", tags=["Health"])
+async def db_health():
+    return {"status": "ok"}
+
+
+# tamanhos e tempos de espera do pool não ficam expostos sem autenticação
+@app.get("/health/db/pool", tags=["Health"])
+async def db_pool_stats(user_id: int = Depends(get_current_user_id)):
+    return {"env": settings.APP_ENV, "pool": get_pool_stats()}
+
+
 app.mount("/dados", StaticFiles(directory="/dados"), name="dados")
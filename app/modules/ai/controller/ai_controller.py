@@ -14,19 +14,19 @@ class AiController(BaseController):
             requirements=requirements,
         )
 
-    async def generate_test_cases(self, db, target_id: int, user_id: int):
+    async def generate_test_cases(self, db, target_id: int, user_id: int, use_cache: bool = True):
         return await self.service.generate_test_cases(
-            db=db, target_id=target_id, user_id=user_id
+            db=db, target_id=target_id, user_id=user_id, use_cache=use_cache
         )
 
-    async def generate_scripts_playwright(self, db, target_id: int, user_id: int):
+    async def generate_scripts_playwright(self, db, target_id: int, user_id: int, use_cache: bool = True):
         return await self.service.generate_scripts_playwright(
-            db=db, target_id=target_id, user_id=user_id
+            db=db, target_id=target_id, user_id=user_id, use_cache=use_cache
         )
 
-    async def generate_documentation_for_screen(self, db, screen_id: int, user_id: int):
+    async def generate_documentation_for_screen(self, db, screen_id: int, user_id: int, use_cache: bool = True):
         return await self.service.generate_documentation_for_screen(
-            db=db, screen_id=screen_id, user_id=user_id
+            db=db, screen_id=screen_id, user_id=user_id, use_cache=use_cache
         )
 
     async def get_target_jobs(self, db, target_id: int, user_id: int):
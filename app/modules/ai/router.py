@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.ai.controller.ai_controller import AiController
 from app.core.database.async_db import get_db
@@ -40,11 +40,14 @@ async def analyze_target(
 @router.get("/testCase/{target_id}")
 async def generate_test_cases(
     target_id: int,
+    use_cache: bool = Query(True, description="False força nova chamada ao modelo"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
-        return await controller.generate_test_cases(db=db, target_id=target_id, user_id=user_id)
+        return await controller.generate_test_cases(
+            db=db, target_id=target_id, user_id=user_id, use_cache=use_cache
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -54,11 +57,14 @@ async def generate_test_cases(
 @router.get("/scriptsPlaywright/{target_id}")
 async def generate_scripts_playwright(
     target_id: int,
+    use_cache: bool = Query(True, description="False força nova chamada ao modelo"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
-        return await controller.generate_scripts_playwright(db=db, target_id=target_id, user_id=user_id)
+        return await controller.generate_scripts_playwright(
+            db=db, target_id=target_id, user_id=user_id, use_cache=use_cache
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -86,11 +92,14 @@ async def get_target_jobs(
 @router.post("/documentation/screen/{screen_id}")
 async def generate_documentation_for_screen(
     screen_id: int,
+    use_cache: bool = Query(True, description="False força nova chamada ao modelo"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
-        return await controller.generate_documentation_for_screen(db=db, screen_id=screen_id, user_id=user_id)
+        return await controller.generate_documentation_for_screen(
+            db=db, screen_id=screen_id, user_id=user_id, use_cache=use_cache
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception:
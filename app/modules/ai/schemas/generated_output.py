@@ -0,0 +1,163 @@
+"""
+Formato das respostas dos agentes de geração (casos de teste, scripts e
+descrições do explorador).
+
+Os mesmos modelos validam a resposta e geram o JSON Schema enviado ao
+provedor em modo estrito (structured outputs), em que o modelo só consegue
+emitir JSON naquele formato.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, Literal, get_args
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+TestType = Literal["functional", "regression", "smoke", "exploratory"]
+ScenarioType = Literal["positive", "negative", "edge"]
+Priority = Literal["low", "medium", "high", "critical"]
+RiskLevel = Literal["low", "medium", "high"]
+
+# Valor usado quando o enum vem ausente, nulo ou fora da lista (modo json_object)
+_ENUM_DEFAULTS: dict[str, tuple[Any, str]] = {
+    "test_type": (TestType, "functional"),
+    "scenario_type": (ScenarioType, "positive"),
+    "priority": (Priority, "medium"),
+    "risk_level": (RiskLevel, "medium"),
+}
+
+
+class _GeneratedModel(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _strip_strings(cls, value: Any) -> Any:
+        return value.strip() if isinstance(value, str) else value
+
+
+class GeneratedTestStep(_GeneratedModel):
+    order: int
+    action: str
+    expected_result: str
+
+    @field_validator("action", "expected_result")
+    @classmethod
+    def _not_empty(cls, value: str) -> str:
+        if not value:
+            raise ValueError("não pode ser vazio")
+        return value
+
+
+class GeneratedTestCase(_GeneratedModel):
+    """
+    Fora do modo estrito o modelo às vezes manda enums fora da lista ou
+    textos nulos: enums caem no padrão e textos opcionais viram "" (como o
+    job já fazia). Steps incompletos são descartados; o caso precisa de ao
+    menos um step válido.
+    """
+
+    title: str
+    description: str = ""
+    objective: str = ""
+    test_type: TestType = "functional"
+    scenario_type: ScenarioType = "positive"
+    priority: Priority = "medium"
+    risk_level: RiskLevel = "medium"
+    preconditions: str = ""
+    expected_result: str = ""
+    steps: list[GeneratedTestStep] = Field(min_length=1)
+
+    @field_validator("title")
+    @classmethod
+    def _title_not_empty(cls, value: str) -> str:
+        if not value:
+            raise ValueError("não pode ser vazio")
+        return value
+
+    @field_validator("description", "objective", "preconditions", "expected_result", mode="before")
+    @classmethod
+    def _null_text(cls, value: Any) -> Any:
+        return "" if value is None else value
+
+    @field_validator("test_type", "scenario_type", "priority", "risk_level", mode="before")
+    @classmethod
+    def _coerce_enum(cls, value: Any, info) -> Any:
+        allowed, default = _ENUM_DEFAULTS[info.field_name]
+        value = value.strip().lower() if isinstance(value, str) else value
+        return value if value in get_args(allowed) else default
+
+    @field_validator("steps", mode="before")
+    @classmethod
+    def _drop_incomplete_steps(cls, value: Any) -> Any:
+        if not isinstance(value, list):
+            return value
+        return [
+            step
+            for step in value
+            if not isinstance(step, dict)
+            or (
+                step.get("order") is not None
+                and str(step.get("action") or "").strip()
+                and str(step.get("expected_result") or "").strip()
+            )
+        ]
+
+
+class GeneratedTestCaseList(_GeneratedModel):
+    items: list[GeneratedTestCase]
+
+
+class GeneratedPlaywrightScript(_GeneratedModel):
+    language: Literal["typescript", "javascript"]
+    framework: Literal["playwright"]
+    title: str
+    script: str
+
+    @field_validator("language", "framework", mode="before")
+    @classmethod
+    def _lower_enum(cls, value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+
+
+class ExplorerDescriptions(_GeneratedModel):
+    tests_description: str
+    playwright_description: str
+    documentation_description: str
+    uiux_description: str
+
+
+def _strict(node: Any) -> None:
+    """Ajusta o schema do Pydantic às regras do modo estrito do provedor."""
+    if isinstance(node, dict):
+        node.pop("title", None)
+        node.pop("default", None)
+        if "const" in node:
+            node["enum"] = [node.pop("const")]
+        if node.get("type") == "object" and "properties" in node:
+            node["additionalProperties"] = False
+            node["required"] = list(node["properties"])
+            # as chaves de "properties" são nomes de campo, não anotações
+            for value in node["properties"].values():
+                _strict(value)
+        for key, value in node.items():
+            if key != "properties":
+                _strict(value)
+    elif isinstance(node, list):
+        for value in node:
+            _strict(value)
+
+
+_formats: dict[str, dict] = {}
+
+
+def strict_response_format(model: type[BaseModel], name: str) -> dict:
+    """response_format json_schema (strict) para o modelo Pydantic."""
+    if name not in _formats:
+        schema = copy.deepcopy(model.model_json_schema())
+        _strict(schema)
+        _formats[name] = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": schema},
+        }
+    return _formats[name]
@@ -17,6 +17,7 @@ class AiService:
         user_id: int,
         job_type: str,
         celery_task_name: str,
+        use_cache: bool = True,
     ) -> dict:
         result = await db.execute(
             select(Target).where(
@@ -38,25 +39,40 @@ class AiService:
         target.status = "processing"
         await db.commit()
 
-        celery_app.send_task(celery_task_name, kwargs={"analysis_id": target_id, "user_id": user_id})
+        celery_app.send_task(
+            celery_task_name,
+            kwargs={"analysis_id": target_id, "user_id": user_id, "use_cache": use_cache},
+        )
 
         return {"status": "processing", "target_id": target_id}
 
-    async def generate_test_cases(self, db: AsyncSession, target_id: int, user_id: int):
-        return await self._register_job(db, target_id, user_id, "test_cases", "jobs.ia.generate_test_case")
+    async def generate_test_cases(self, db: AsyncSession, target_id: int, user_id: int, use_cache: bool = True):
+        return await self._register_job(
+            db, target_id, user_id, "test_cases", "jobs.ia.generate_test_case", use_cache=use_cache
+        )
 
-    async def generate_scripts_playwright(self, db: AsyncSession, target_id: int, user_id: int):
-        return await self._register_job(db, target_id, user_id, "scripts", "jobs.ia.generate_scripts_playwright")
+    async def generate_scripts_playwright(self, db: AsyncSession, target_id: int, user_id: int, use_cache: bool = True):
+        return await self._register_job(
+            db, target_id, user_id, "scripts", "jobs.ia.generate_scripts_playwright", use_cache=use_cache
+        )
 
-    async def generate_documentation_for_screen(self, db: AsyncSession, screen_id: int, user_id: int) -> dict:
+    async def _screen_exists(self, db: AsyncSession, screen_id: int, user_id: int) -> bool:
         result = await db.execute(
-            select(Screen).where(
+            select(Screen.id).where(
                 Screen.id == screen_id,
                 Screen.user_id == user_id,
             )
         )
-        screen = result.scalar_one_or_none()
-        if screen is None:
+        return result.scalar_one_or_none() is not None
+
+    async def generate_documentation_for_screen(
+        self,
+        db: AsyncSession,
+        screen_id: int,
+        user_id: int,
+        use_cache: bool = True,
+    ) -> dict:
+        if not await self._screen_exists(db, screen_id, user_id):
             raise ValueError(f"Tela {screen_id} não encontrada")
 
         await db.execute(
@@ -70,20 +86,13 @@ class AiService:
 
         celery_app.send_task(
             "jobs.ia.generate_documentation",
-            kwargs={"screen_id": screen_id, "user_id": user_id},
+            kwargs={"screen_id": screen_id, "user_id": user_id, "use_cache": use_cache},
         )
 
         return {"status": "pending", "screen_id": screen_id}
 
     async def get_screen_doc_status(self, db: AsyncSession, screen_id: int, user_id: int) -> dict:
-        result = await db.execute(
-            select(Screen).where(
-                Screen.id == screen_id,
-                Screen.user_id == user_id,
-            )
-        )
-        screen = result.scalar_one_or_none()
-        if screen is None:
+        if not await self._screen_exists(db, screen_id, user_id):
             raise ValueError(f"Tela {screen_id} não encontrada")
 
         job_result = await db.execute(
@@ -110,30 +119,44 @@ class AiService:
                 "started_at": job.started_at,
                 "completed_at": job.completed_at,
                 "error_message": job.error_message,
+                "llm_usage": {
+                    "prompt_tokens": job.llm_prompt_tokens,
+                    "cached_tokens": job.llm_cached_tokens,
+                    "completion_tokens": job.llm_completion_tokens,
+                },
             },
         }
 
     async def get_target_jobs(self, db: AsyncSession, target_id: int, user_id: int) -> dict:
         result = await db.execute(
-            select(Target).where(
+            select(Target.status).where(
                 Target.id == target_id,
                 Target.user_id == user_id,
             )
         )
-        target = result.scalar_one_or_none()
-        if target is None:
+        target_status = result.scalar_one_or_none()
+        if target_status is None:
             raise ValueError(f"Alvo {target_id} não encontrado")
 
         jobs_result = await db.execute(
-            select(TargetJob)
+            select(
+                TargetJob.job_type,
+                TargetJob.status,
+                TargetJob.started_at,
+                TargetJob.completed_at,
+                TargetJob.error_message,
+                TargetJob.llm_prompt_tokens,
+                TargetJob.llm_cached_tokens,
+                TargetJob.llm_completion_tokens,
+            )
             .where(TargetJob.target_id == target_id)
             .order_by(TargetJob.created_at)
         )
-        jobs = jobs_result.scalars().all()
+        jobs = jobs_result.all()
 
         return {
             "target_id": target_id,
-            "status": target.status,
+            "status": target_status,
             "jobs": [
                 {
                     "job_type": j.job_type,
@@ -141,6 +164,11 @@ class AiService:
                     "started_at": j.started_at,
                     "completed_at": j.completed_at,
                     "error_message": j.error_message,
+                    "llm_usage": {
+                        "prompt_tokens": j.llm_prompt_tokens,
+                        "cached_tokens": j.llm_cached_tokens,
+                        "completion_tokens": j.llm_completion_tokens,
+                    },
                 }
                 for j in jobs
             ],
@@ -0,0 +1,332 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from websockets.sync.client import connect as ws_connect
+from celery.signals import worker_process_init, worker_process_shutdown
+
+logger = logging.getLogger(__name__)
+
+BROWSER_EXECUTABLE = os.getenv("BROWSER_EXECUTABLE_PATH", "/root/.cache/ms-playwright/chromium-1200/chrome-linux64/chrome")
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_POOL_MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+BROWSER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_POOL_ACQUIRE_TIMEOUT", "300"))
+BROWSER_POOL_WARM = os.getenv("BROWSER_POOL_WARM", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+_STARTUP_TIMEOUT_SECONDS = 20
+_HEALTH_TIMEOUT_SECONDS = 2
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-setuid-sandbox",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-default-apps",
+]
+
+
+class BrowserPoolError(Exception):
+    """Erro ao iniciar ou obter um Chromium do pool."""
+
+
+def url_origin(url: str | None) -> str | None:
+    """Origem (scheme://host[:port]) de uma URL http(s); None para o resto."""
+    try:
+        parts = urlsplit(url or "")
+    except ValueError:
+        return None
+    if parts.scheme not in {"http", "https"} or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class _CDPConnection:
+    """Conexão CDP síncrona e mínima com o alvo do browser (uso no release)."""
+
+    def __init__(self, ws_url: str):
+        self._ws = ws_connect(ws_url, open_timeout=_HEALTH_TIMEOUT_SECONDS, max_size=None)
+        self._ids = itertools.count(1)
+
+    def send(self, method: str, params: dict | None = None, session_id: str | None = None) -> dict:
+        message = {"id": next(self._ids), "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        self._ws.send(json.dumps(message))
+
+        while True:
+            reply = json.loads(self._ws.recv(timeout=_HEALTH_TIMEOUT_SECONDS))
+            if reply.get("id") != message["id"]:
+                continue  # eventos
+            if "error" in reply:
+                raise BrowserPoolError(f"CDP {method}: {reply['error'].get('message')}")
+            return reply.get("result") or {}
+
+    def close(self) -> None:
+        self._ws.close()
+
+
+class PooledChromium:
+    """
+    Um processo Chromium headless com CDP exposto em 127.0.0.1.
+    O browser_use conecta via cdp_url e não é dono do processo.
+    """
+
+    def __init__(self, executable: str, args: list[str]):
+        self.user_data_dir = tempfile.mkdtemp(prefix="smartqa-chromium-")
+        self.uses = 0
+        # origens visitadas no lease atual; o job registra as que conhece
+        self.visited_origins: set[str] = set()
+        self.port: int | None = None
+
+        self.process = subprocess.Popen(
+            [
+                executable,
+                "--headless=new",
+                "--remote-debugging-address=127.0.0.1",
+                "--remote-debugging-port=0",
+                f"--user-data-dir={self.user_data_dir}",
+                "--no-first-run",
+                "--no-default-browser-check",
+                *args,
+                "about:blank",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            self.port = self._wait_for_port()
+        except Exception:
+            self.terminate()
+            raise
+
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _wait_for_port(self) -> int:
+        # Com --remote-debugging-port=0 o Chromium escolhe a porta e a grava
+        # em DevToolsActivePort, o que evita corrida por portas livres
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + _STARTUP_TIMEOUT_SECONDS
+
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise BrowserPoolError(f"Chromium encerrou na inicialização (code={self.process.returncode})")
+            try:
+                with open(port_file) as f:
+                    first_line = f.readline().strip()
+                if first_line:
+                    return int(first_line)
+            except (FileNotFoundError, ValueError):
+                pass
+            time.sleep(0.1)
+
+        raise BrowserPoolError("Timeout aguardando o Chromium expor a porta CDP")
+
+    def is_healthy(self) -> bool:
+        if self.process.poll() is not None:
+            return False
+        try:
+            response = httpx.get(f"{self.cdp_url}/json/version", timeout=_HEALTH_TIMEOUT_SECONDS)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def reset(self) -> None:
+        """
+        Isola o próximo job: apaga todo o armazenamento (cookies, localStorage,
+        sessionStorage, IndexedDB, Cache Storage, service workers) das origens
+        usadas no lease, limpa o cache HTTP e fecha as abas, deixando uma
+        about:blank. Qualquer falha aqui faz o pool reciclar o processo.
+        """
+        with httpx.Client(base_url=self.cdp_url, timeout=_HEALTH_TIMEOUT_SECONDS) as client:
+            ws_url = client.get("/json/version").json()["webSocketDebuggerUrl"]
+
+        cdp = _CDPConnection(ws_url)
+        try:
+            targets = cdp.send("Target.getTargets")["targetInfos"]
+            origins = set(self.visited_origins)
+            origins.update(filter(None, (url_origin(t.get("url")) for t in targets)))
+
+            for origin in sorted(origins):
+                cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            cdp.send("Storage.clearCookies")
+
+            blank = cdp.send("Target.createTarget", {"url": "about:blank"})["targetId"]
+            session = cdp.send("Target.attachToTarget", {"targetId": blank, "flatten": True})["sessionId"]
+            cdp.send("Network.clearBrowserCache", session_id=session)
+            cdp.send("Target.detachFromTarget", {"sessionId": session})
+
+            for target in targets:
+                if target.get("type") == "page":
+                    cdp.send("Target.closeTarget", {"targetId": target["targetId"]})
+        finally:
+            cdp.close()
+
+        self.visited_origins.clear()
+
+    def terminate(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait(timeout=5)
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class ChromiumPool:
+    """
+    Pool de Chromium por processo (worker Celery).
+
+    - Mantém até `size` instâncias já iniciadas; cada job recebe uma instância
+      exclusiva durante o lease.
+    - Na devolução a instância passa por health check e limpeza completa de
+      armazenamento e abas; se falhar ou atingir `max_uses`, é encerrada e
+      substituída sob demanda.
+    - O pool é descartado quando o PID muda (prefork herda o módulo do pai).
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = BROWSER_POOL_SIZE,
+        max_uses: int = BROWSER_POOL_MAX_USES,
+        executable: str = BROWSER_EXECUTABLE,
+        args: list[str] | None = None,
+    ):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.executable = executable
+        self.args = list(args if args is not None else CHROMIUM_ARGS)
+
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._idle: list[PooledChromium] = []
+        self._leased = 0
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            # os processos pertencem ao pai; só esquecemos as referências
+            self._pid = os.getpid()
+            self._idle = []
+            self._leased = 0
+
+    def _launch(self) -> PooledChromium:
+        start = time.perf_counter()
+        chromium = PooledChromium(self.executable, self.args)
+        logger.info(
+            f"[BrowserPool] Chromium iniciado na porta {chromium.port} "
+            f"em {time.perf_counter() - start:.2f}s"
+        )
+        return chromium
+
+    def warm(self) -> None:
+        with self._cond:
+            self._check_fork()
+            missing = self.size - len(self._idle) - self._leased
+
+        for _ in range(max(0, missing)):
+            try:
+                chromium = self._launch()
+            except Exception as e:
+                logger.warning(f"[BrowserPool] Falha ao pré-aquecer Chromium: {e}")
+                return
+            with self._cond:
+                self._idle.append(chromium)
+                self._cond.notify()
+
+    def acquire(self, timeout: float = BROWSER_POOL_ACQUIRE_TIMEOUT) -> PooledChromium:
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            self._check_fork()
+            while not self._idle and self._leased >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrowserPoolError("Timeout aguardando Chromium livre no pool")
+                self._cond.wait(remaining)
+
+            chromium = self._idle.pop() if self._idle else None
+            self._leased += 1
+
+        try:
+            if chromium is not None and not chromium.is_healthy():
+                logger.warning(f"[BrowserPool] Chromium da porta {chromium.port} não responde — substituindo")
+                chromium.terminate()
+                chromium = None
+            if chromium is None:
+                chromium = self._launch()
+        except Exception:
+            with self._cond:
+                self._leased -= 1
+                self._cond.notify()
+            raise
+
+        chromium.uses += 1
+        return chromium
+
+    def release(self, chromium: PooledChromium) -> None:
+        keep = chromium.uses < self.max_uses and chromium.is_healthy()
+        if keep:
+            try:
+                chromium.reset()
+            except Exception as e:
+                logger.warning(f"[BrowserPool] Falha ao isolar Chromium para o próximo job: {e}")
+                keep = False
+
+        if not keep:
+            logger.info(f"[BrowserPool] Reciclando Chromium da porta {chromium.port} após {chromium.uses} usos")
+            chromium.terminate()
+
+        with self._cond:
+            self._leased -= 1
+            if keep and self._pid == os.getpid():
+                self._idle.append(chromium)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        chromium = self.acquire()
+        try:
+            yield chromium
+        finally:
+            self.release(chromium)
+
+    def shutdown(self) -> None:
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            idle, self._idle = self._idle, []
+        for chromium in idle:
+            chromium.terminate()
+
+
+chromium_pool = ChromiumPool()
+atexit.register(chromium_pool.shutdown)
+
+
+@worker_process_init.connect(weak=False)
+def _warm_chromium_pool(**kwargs):
+    if BROWSER_POOL_WARM:
+        chromium_pool.warm()
+
+
+@worker_process_shutdown.connect(weak=False)
+def _shutdown_chromium_pool(**kwargs):
+    chromium_pool.shutdown()
@@ -1,30 +1,90 @@
-import os
-from openai import OpenAI
+import logging
+from typing import Iterator
+
+from app.modules.ai.service.llm_client_service import LLMUsage, llm_clients
+from app.modules.ai.service.llm_cache_service import llm_cache, prompt_hash
+
+logger = logging.getLogger("uvicorn.error")
 
 
 class DocumentationAgent:
-    def __init__(self, model: str):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY não definida")
+    SYSTEM_PROMPT = (
+        "Você é um Analista de Sistemas Sênior especializado "
+        "em documentação funcional de software."
+    )
+    TEMPERATURE = 0.3
 
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, model: str):
+        self.client = llm_clients.get_sync(model)
         self.model = model
+        self.usage = LLMUsage()
+
+    def prompt_hash(self, prompt: str) -> str:
+        return prompt_hash(prompt, self.SYSTEM_PROMPT)
+
+    def generate(self, prompt: str, use_cache: bool = True) -> str:
+        digest = self.prompt_hash(prompt)
+
+        if use_cache:
+            cached = llm_cache.get(self.model, digest, self.TEMPERATURE)
+            if cached:
+                logger.info("[IA][DOCS_AGENT] Resposta reaproveitada do cache (prompt_hash=%s)", digest[:12])
+                return cached
 
-    def generate(self, prompt: str) -> str:
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Você é um Analista de Sistemas Sênior especializado "
-                        "em documentação funcional de software."
-                    ),
-                },
+                {"role": "system", "content": self.SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.3,
+            temperature=self.TEMPERATURE,
         )
+        self.usage.record(response.usage)
+
+        content = response.choices[0].message.content.strip()
+        if use_cache:
+            llm_cache.set(self.model, digest, self.TEMPERATURE, content)
+        return content
+
+    def stream(self, prompt: str, use_cache: bool = True) -> Iterator[str]:
+        """
+        Gera a documentação em streaming, devolvendo os trechos conforme o
+        modelo produz. Em cache hit, devolve o texto inteiro de uma vez.
+        """
+        digest = self.prompt_hash(prompt)
+
+        if use_cache:
+            cached = llm_cache.get(self.model, digest, self.TEMPERATURE)
+            if cached:
+                logger.info("[IA][DOCS_AGENT] Resposta reaproveitada do cache (prompt_hash=%s)", digest[:12])
+                yield cached
+                return
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=self.TEMPERATURE,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        parts: list[str] = []
+        try:
+            for chunk in stream:
+                # o uso vem num último chunk, sem choices
+                if chunk.usage is not None:
+                    self.usage.record(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            stream.close()
 
-        return response.choices[0].message.content.strip()
+        if use_cache:
+            llm_cache.set(self.model, digest, self.TEMPERATURE, "".join(parts).strip())
@@ -0,0 +1,147 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.celery_app import REDIS_URL
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 0 desativa o cache
+EXPLORER_CACHE_TTL_SECONDS = int(os.getenv("EXPLORER_CACHE_TTL_SECONDS", "21600"))
+
+_KEY_PREFIX = "smartqa:explorer"
+_SOCKET_TIMEOUT_SECONDS = 2
+
+
+def _credentials_fingerprint(access_credentials: list[dict]) -> str:
+    """
+    HMAC (SECRET_KEY) dos pares campo/valor: logins diferentes na mesma tela
+    geram chaves diferentes, sem expor os valores no Redis.
+    """
+    pairs = sorted(
+        ((c.get("field_name") or "").strip(), str(c.get("value") or ""))
+        for c in access_credentials
+        if c.get("field_name")
+    )
+    material = json.dumps(pairs, ensure_ascii=False).encode()
+    secret = (settings.SECRET_KEY or "").encode()
+    return hmac.new(secret, material, hashlib.sha256).hexdigest()
+
+
+def explorer_cache_key(analysis: dict, screen_id: int) -> str:
+    """
+    Chave da exploração, sempre escopada pela Screen (e portanto pelo dono):
+    URL, contexto da tela e a impressão digital das credenciais usadas no
+    login, já que o resultado reflete o que aquela conta enxerga.
+    """
+    material = json.dumps(
+        {
+            "url": (analysis.get("target_url") or "").strip(),
+            "screen_context": (analysis.get("screen_context") or "").strip(),
+            "credentials": _credentials_fingerprint(analysis.get("access_credentials") or []),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256(material.encode()).hexdigest()
+    return f"{_KEY_PREFIX}:result:{screen_id}:{digest}"
+
+
+def _screen_index_key(screen_id: int) -> str:
+    return f"{_KEY_PREFIX}:screen:{screen_id}"
+
+
+class ExplorerCache:
+    """
+    Cache dos resultados do ScreenExplorerService em Redis.
+
+    Sem screen_id não há cache: a chave precisa do escopo da tela para que
+    uma conta nunca receba a exploração feita com o login de outra.
+
+    Cada resultado também é registrado num set por Screen, para que qualquer
+    alteração na tela invalide explicitamente as explorações dela. Falhas do
+    Redis nunca interrompem o job: o cache é só um atalho.
+    """
+
+    def __init__(self, ttl_seconds: int = EXPLORER_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._client: redis.Redis | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _redis(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                REDIS_URL,
+                socket_timeout=_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=_SOCKET_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    def get(self, analysis: dict, *, screen_id: int | None) -> dict | None:
+        if not self.enabled or screen_id is None:
+            return None
+        try:
+            raw = self._redis().get(explorer_cache_key(analysis, screen_id))
+        except redis.RedisError as e:
+            logger.warning(f"[ExplorerCache] Falha ao ler cache: {e}")
+            return None
+
+        if not raw:
+            return None
+
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set(self, analysis: dict, descriptions: dict, *, screen_id: int | None) -> None:
+        if not self.enabled or screen_id is None:
+            return
+
+        key = explorer_cache_key(analysis, screen_id)
+        try:
+            index_key = _screen_index_key(screen_id)
+            pipe = self._redis().pipeline()
+            pipe.set(key, json.dumps(descriptions, ensure_ascii=False), ex=self.ttl_seconds)
+            pipe.sadd(index_key, key)
+            pipe.expire(index_key, self.ttl_seconds)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"[ExplorerCache] Falha ao gravar cache: {e}")
+
+    def invalidate_screen(self, screen_id: int) -> None:
+        try:
+            client = self._redis()
+            index_key = _screen_index_key(screen_id)
+            keys = client.smembers(index_key)
+            client.delete(index_key, *keys)
+        except redis.RedisError as e:
+            logger.warning(f"[ExplorerCache] Falha ao invalidar tela {screen_id}: {e}")
+
+    async def ainvalidate_screen(self, screen_id: int) -> None:
+        # cliente curto: a invalidação é rara e o loop da API não é fixo
+        client = aioredis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=_SOCKET_TIMEOUT_SECONDS,
+        )
+        try:
+            index_key = _screen_index_key(screen_id)
+            keys = await client.smembers(index_key)
+            await client.delete(index_key, *keys)
+        except redis.RedisError as e:
+            logger.warning(f"[ExplorerCache] Falha ao invalidar tela {screen_id}: {e}")
+        finally:
+            await client.aclose()
+
+
+explorer_cache = ExplorerCache()
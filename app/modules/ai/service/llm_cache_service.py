@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+
+import redis
+
+from app.core.celery_app import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# 0 desativa o cache
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+
+_KEY_PREFIX = "smartqa:llm"
+_SOCKET_TIMEOUT_SECONDS = 2
+
+
+def prompt_hash(prompt: str, system_prompt: str = "") -> str:
+    """sha256 do prompt completo (system + user) enviado ao modelo."""
+    digest = hashlib.sha256()
+    digest.update(system_prompt.encode())
+    digest.update(b"\x00")
+    digest.update(prompt.encode())
+    return digest.hexdigest()
+
+
+def llm_cache_key(model: str, prompt_digest: str, temperature: float) -> str:
+    return f"{_KEY_PREFIX}:{model}:{float(temperature):g}:{prompt_digest}"
+
+
+class LLMResponseCache:
+    """
+    Cache das respostas dos agentes de geração em Redis, chaveado por
+    (modelo, hash do prompt, temperatura).
+
+    Guarda o texto bruto retornado pelo modelo; o agente continua parseando e
+    validando normalmente, e só grava depois que a resposta passou na
+    validação. Falhas do Redis nunca interrompem o job.
+    """
+
+    def __init__(self, ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._client: redis.Redis | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _redis(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                REDIS_URL,
+                socket_timeout=_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=_SOCKET_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    def get(self, model: str, prompt_digest: str, temperature: float) -> str | None:
+        if not self.enabled:
+            return None
+        try:
+            raw = self._redis().get(llm_cache_key(model, prompt_digest, temperature))
+        except redis.RedisError as e:
+            logger.warning(f"[LLMCache] Falha ao ler cache: {e}")
+            return None
+
+        if not raw:
+            return None
+
+        try:
+            return json.loads(raw)["content"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, model: str, prompt_digest: str, temperature: float, content: str) -> None:
+        if not self.enabled or not content:
+            return
+        try:
+            self._redis().set(
+                llm_cache_key(model, prompt_digest, temperature),
+                json.dumps({"content": content}, ensure_ascii=False),
+                ex=self.ttl_seconds,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"[LLMCache] Falha ao gravar cache: {e}")
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# =====================================================
+# Configuração por modelo
+# =====================================================
+# Valores padrão para qualquer modelo; entradas em LLM_MODEL_CONFIG sobrescrevem
+# só o que for informado. Geração de casos de teste/scripts pode levar minutos,
+# por isso o read timeout é alto e o connect timeout é curto.
+LLM_DEFAULT_CONFIG = {
+    "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+    "read_timeout": float(os.getenv("LLM_READ_TIMEOUT", "300")),
+    "write_timeout": float(os.getenv("LLM_WRITE_TIMEOUT", "30")),
+    "max_retries": int(os.getenv("LLM_MAX_RETRIES", "2")),
+}
+
+LLM_MODEL_CONFIG = {
+    "gpt-4.1-mini": {"read_timeout": 300},
+    "gpt-4.1": {"read_timeout": 600},
+    "gpt-4o-mini": {"read_timeout": 180},
+}
+
+# Pool HTTP compartilhado por todos os modelos do processo
+LLM_POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+)
+
+
+# Structured outputs: response_format json_schema estrito (desligue para
+# modelos/provedores sem suporte; volta ao json_object)
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def model_config(model: str) -> dict:
+    config = dict(LLM_DEFAULT_CONFIG)
+    config.update(LLM_MODEL_CONFIG.get(model, {}))
+    return config
+
+
+def _timeout(config: dict) -> httpx.Timeout:
+    return httpx.Timeout(
+        config["read_timeout"],
+        connect=config["connect_timeout"],
+        write=config["write_timeout"],
+        pool=config["connect_timeout"],
+    )
+
+
+class LLMClientRegistry:
+    """
+    Registro de clientes OpenAI do processo.
+
+    Existe um único pool HTTP (keep-alive) para o cliente sync e um por event
+    loop para o cliente async; cada modelo recebe uma visão (with_options) com
+    seus próprios timeouts/retries, reutilizando o mesmo pool.
+
+    Workers Celery em prefork herdam o módulo do processo pai, então o
+    registro é descartado quando o PID muda, evitando compartilhar sockets
+    entre processos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sync_base: OpenAI | None = None
+        self._sync_by_model: dict[str, OpenAI] = {}
+        self._async_by_loop = weakref.WeakKeyDictionary()
+
+    def _api_key(self) -> str:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY não definida no ambiente")
+        return api_key
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._sync_base = None
+            self._sync_by_model = {}
+            self._async_by_loop = weakref.WeakKeyDictionary()
+
+    # -----------------------------
+    # Sync (Celery)
+    # -----------------------------
+    def get_sync(self, model: str) -> OpenAI:
+        with self._lock:
+            self._check_fork()
+
+            client = self._sync_by_model.get(model)
+            if client is not None:
+                return client
+
+            if self._sync_base is None:
+                self._sync_base = OpenAI(
+                    api_key=self._api_key(),
+                    http_client=httpx.Client(
+                        limits=LLM_POOL_LIMITS,
+                        timeout=_timeout(LLM_DEFAULT_CONFIG),
+                    ),
+                )
+                logger.info("🔌 Cliente LLM sync criado", extra={"pid": self._pid})
+
+            config = model_config(model)
+            client = self._sync_base.with_options(
+                timeout=_timeout(config),
+                max_retries=config["max_retries"],
+            )
+            self._sync_by_model[model] = client
+            return client
+
+    # -----------------------------
+    # Async (API / event loop)
+    # -----------------------------
+    def get_async(self, model: str) -> AsyncOpenAI:
+        # conexões do httpx.AsyncClient ficam presas ao loop que as criou
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._check_fork()
+
+            entry = self._async_by_loop.get(loop)
+            if entry is None:
+                base = AsyncOpenAI(
+                    api_key=self._api_key(),
+                    http_client=httpx.AsyncClient(
+                        limits=LLM_POOL_LIMITS,
+                        timeout=_timeout(LLM_DEFAULT_CONFIG),
+                    ),
+                )
+                entry = {"base": base, "by_model": {}}
+                self._async_by_loop[loop] = entry
+
+            client = entry["by_model"].get(model)
+            if client is None:
+                config = model_config(model)
+                client = entry["base"].with_options(
+                    timeout=_timeout(config),
+                    max_retries=config["max_retries"],
+                )
+                entry["by_model"][model] = client
+            return client
+
+    # -----------------------------
+    # Encerramento
+    # -----------------------------
+    def close(self) -> None:
+        with self._lock:
+            if self._sync_base is not None:
+                self._sync_base.close()
+            self._sync_base = None
+            self._sync_by_model = {}
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_by_loop.pop(loop, None)
+        if entry is not None:
+            await entry["base"].close()
+
+
+llm_clients = LLMClientRegistry()
+
+
+# =====================================================
+# Uso de tokens (prompt caching do provedor)
+# =====================================================
+class LLMUsage:
+    """
+    Acumula o `usage` das respostas de um agente. `cached_tokens` é a parte
+    do prompt servida do cache de prefixo do provedor (cobrada com desconto);
+    só aparece quando o prefixo estático do prompt se repete entre chamadas.
+    Seguro entre threads (geração de casos em seções paralelas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, usage) -> None:
+        if usage is None:
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    @property
+    def cache_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "llm_prompt_tokens": self.prompt_tokens,
+            "llm_cached_tokens": self.cached_tokens,
+            "llm_completion_tokens": self.completion_tokens,
+        }
+
+    def log(self, job: str, **extra) -> None:
+        context = " | ".join(f"{k}={v}" for k, v in extra.items())
+        logger.info(
+            f"[LLMUsage] job={job} | chamadas={self.calls} | prompt={self.prompt_tokens} | "
+            f"cached={self.cached_tokens} ({self.cache_ratio:.0%}) | completion={self.completion_tokens}"
+            + (f" | {context}" if context else "")
+        )
@@ -1,102 +1,206 @@
 import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from browser_use import Agent, Browser
 from browser_use.llm import ChatOpenAI
+from app.modules.ai.schemas.generated_output import ExplorerDescriptions, strict_response_format
 from app.modules.ai.utils.ai_utils import AiUtils
+from app.modules.ai.utils.json_repair import extract_json_object
+from app.modules.ai.utils.token_budget import TokenBudget
+from app.modules.ai.service.browser_pool_service import chromium_pool, url_origin
+from app.modules.ai.service.explorer_cache_service import explorer_cache
+from app.modules.ai.service.llm_client_service import LLM_STRUCTURED_OUTPUT, LLMUsage, llm_clients
 import os
 
 logger = logging.getLogger(__name__)
 
-_BROWSER_EXECUTABLE = os.getenv("BROWSER_EXECUTABLE_PATH", "/root/.cache/ms-playwright/chromium-1200/chrome-linux64/chrome")
 _BROWSERUSE_MODEL = os.getenv("BROWSERUSE_MODEL", "gpt-4.1-mini")
 _RETRY_DELAY_SECONDS = 5
+_EXPLORER_MAX_CONCURRENCY = int(os.getenv("EXPLORER_MAX_CONCURRENCY", "2"))
+# Retry sem navegar: modelo da reformatação e mínimo de material coletado para tentá-la
+_EXPLORER_REFORMAT_MODEL = os.getenv("EXPLORER_REFORMAT_MODEL", _BROWSERUSE_MODEL)
+_EXPLORER_MIN_OBSERVATION_CHARS = int(os.getenv("EXPLORER_MIN_OBSERVATION_CHARS", "400"))
 
-_CHROMIUM_ARGS = [
-    "--no-sandbox",
-    "--disable-dev-shm-usage",
-    "--disable-gpu",
-    "--disable-setuid-sandbox",
-    "--disable-blink-features=AutomationControlled",
-    "--disable-extensions",
-    "--disable-background-networking",
-    "--disable-default-apps",
-]
+
+_REQUIRED_FIELDS = (
+    "tests_description",
+    "playwright_description",
+    "documentation_description",
+    "uiux_description",
+)
+
+
+def _history_observations(history) -> str:
+    """
+    Texto do que o agente viu durante a navegação: conteúdo extraído pelas
+    ações e a memória de cada passo. Serve de matéria-prima para refazer o
+    JSON sem navegar de novo.
+    """
+    parts: list[str] = []
+    seen: set[str] = set()
+
+    def _add(value) -> None:
+        text = str(value or "").strip()
+        if text and text not in seen:
+            seen.add(text)
+            parts.append(text)
+
+    try:
+        for content in history.extracted_content() or []:
+            _add(content)
+    except Exception:
+        pass
+    try:
+        for thought in history.model_thoughts() or []:
+            _add(getattr(thought, "memory", None))
+    except Exception:
+        pass
+
+    return "\n\n".join(parts)
 
 
 class ScreenExplorerService:
-    def generate_screen_descriptions(self, *, analysis: dict) -> dict:
-        credentials_block = AiUtils.build_credentials_block(
-            analysis.get("access_credentials") or [],
-            target_url=analysis.get("target_url", ""),
-        )
+    @staticmethod
+    def _validate(data: dict) -> dict:
+        if not isinstance(data, dict):
+            raise ValueError(f"BrowserUse retornou tipo inválido: {type(data)}")
 
-        llm = ChatOpenAI(model=_BROWSERUSE_MODEL)
+        missing = set(_REQUIRED_FIELDS) - set(data.keys())
+        if missing:
+            raise ValueError(f"BrowserUse retornou JSON sem chaves obrigatórias: {missing}")
 
-        required = {
-            "tests_description",
-            "playwright_description",
-            "documentation_description",
-            "uiux_description",
-        }
+        for k in _REQUIRED_FIELDS:
+            if not isinstance(data.get(k), str) or not data[k].strip():
+                raise ValueError(f"Campo '{k}' vazio ou inválido no retorno do BrowserUse")
 
-        def _validate(data: dict) -> dict:
-            if not isinstance(data, dict):
-                raise ValueError(f"BrowserUse retornou tipo inválido: {type(data)}")
+        return {k: data[k].strip() for k in _REQUIRED_FIELDS}
 
-            missing = required - set(data.keys())
-            if missing:
-                raise ValueError(f"BrowserUse retornou JSON sem chaves obrigatórias: {missing}")
+    def _reformat(self, *, analysis: dict, raw_result: str, observations: str, error: Exception, screen_id) -> dict:
+        """
+        Passo barato (só texto, segundos) antes de navegar de novo: primeiro
+        o parse tolerante do retorno bruto, aceitando JSON truncado; depois
+        uma chamada ao LLM que reformata retorno + histórico no schema.
+        """
+        try:
+            descriptions = self._validate(extract_json_object(raw_result, allow_truncated=True))
+            logger.info(f"[ScreenExplorer] Retorno bruto recuperado sem nova navegação (screen_id={screen_id})")
+            return descriptions
+        except Exception:
+            pass
 
-            data = {k: data.get(k) for k in required}
+        if len(raw_result) + len(observations) < _EXPLORER_MIN_OBSERVATION_CHARS:
+            raise ValueError("observações insuficientes para reformatar")
 
-            for k in required:
-                if not isinstance(data.get(k), str) or not data[k].strip():
-                    raise ValueError(f"Campo '{k}' vazio ou inválido no retorno do BrowserUse")
+        budget = TokenBudget(model=_EXPLORER_REFORMAT_MODEL, job="explorer_reformat")
+        prompt = AiUtils.build_explorer_reformat_prompt(
+            analysis=analysis,
+            raw_result=raw_result,
+            observations=observations,
+            error=str(error)[:500],
+            budget=budget,
+        )
+        budget.log(screen_id=screen_id)
 
-            return {
-                "tests_description": data["tests_description"].strip(),
-                "playwright_description": data["playwright_description"].strip(),
-                "documentation_description": data["documentation_description"].strip(),
-                "uiux_description": data["uiux_description"].strip(),
-            }
+        usage = LLMUsage()
+        response = llm_clients.get_sync(_EXPLORER_REFORMAT_MODEL).chat.completions.create(
+            model=_EXPLORER_REFORMAT_MODEL,
+            temperature=0,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=(
+                strict_response_format(ExplorerDescriptions, "explorer_descriptions")
+                if LLM_STRUCTURED_OUTPUT
+                else {"type": "json_object"}
+            ),
+        )
+        usage.record(response.usage)
+        usage.log("explorer_reformat", screen_id=screen_id)
 
-        def _run_agent(task: str) -> str:
-            # Cria um browser novo a cada tentativa para evitar estado corrompido
-            browser = Browser(
-                headless=True,
-                executable_path=_BROWSER_EXECUTABLE,
-                args=_CHROMIUM_ARGS,
-                minimum_wait_page_load_time=2.0,
-                wait_for_network_idle_page_load_time=3.0,
-            )
-            try:
-                agent = Agent(
-                    task=task,
-                    browser=browser,
-                    llm=llm,
-                    vision_detail_level="low",
-                    max_history_items=12,
-                    llm_screenshot_size=(1280, 800),
-                    use_thinking=False,
+        descriptions = self._validate(extract_json_object(response.choices[0].message.content or ""))
+        logger.info(f"[ScreenExplorer] JSON refeito a partir do histórico, sem nova navegação (screen_id={screen_id})")
+        return descriptions
+
+    def generate_screen_descriptions(
+        self,
+        *,
+        analysis: dict,
+        screen_id: int | None = None,
+        use_cache: bool = True,
+    ) -> dict:
+        if use_cache:
+            cached = explorer_cache.get(analysis, screen_id=screen_id)
+            if cached:
+                logger.info(f"[ScreenExplorer] Reutilizando exploração em cache (screen_id={screen_id})")
+                return cached
+
+        credentials_block = AiUtils.build_credentials_block(
+            analysis.get("access_credentials") or [],
+            target_url=analysis.get("target_url", ""),
+        )
+
+        llm = ChatOpenAI(model=_BROWSERUSE_MODEL)
+
+        def _run_agent(task: str) -> tuple[str, str]:
+            # Usa um Chromium já aquecido do pool; o browser_use só conecta via CDP
+            with chromium_pool.lease() as chromium:
+                chromium.visited_origins.update(
+                    filter(None, (url_origin(analysis.get("target_url")),))
                 )
-                history = asyncio.run(agent.run())
-                result = (history.final_result() or "").strip()
-            finally:
-                try:
-                    asyncio.run(browser.close())
-                except Exception:
-                    pass
+                browser = Browser(
+                    cdp_url=chromium.cdp_url,
+                    keep_alive=True,
+                    minimum_wait_page_load_time=2.0,
+                    wait_for_network_idle_page_load_time=3.0,
+                )
+
+                def _record_origins(urls) -> None:
+                    # o pool apaga o armazenamento dessas origens na devolução
+                    chromium.visited_origins.update(filter(None, (url_origin(u) for u in urls)))
 
-            if not result:
-                raise ValueError("Não foi possível obter retorno do BrowserUse")
+                async def _run() -> tuple[str, str]:
+                    agent = None
+                    try:
+                        agent = Agent(
+                            task=task,
+                            browser=browser,
+                            llm=llm,
+                            vision_detail_level="low",
+                            max_history_items=12,
+                            llm_screenshot_size=(1280, 800),
+                            use_thinking=False,
+                        )
+                        history = await agent.run()
+                        usage = getattr(history, "usage", None)
+                        if usage is not None:
+                            logger.info(
+                                f"[LLMUsage] job=explorer | screen_id={screen_id} | "
+                                f"prompt={getattr(usage, 'total_prompt_tokens', 0)} | "
+                                f"cached={getattr(usage, 'total_prompt_cached_tokens', 0)} | "
+                                f"completion={getattr(usage, 'total_completion_tokens', 0)}"
+                            )
+                        return (history.final_result() or "").strip(), _history_observations(history)
+                    finally:
+                        # mesmo se a execução falhou no meio, o histórico tem as URLs visitadas
+                        try:
+                            if agent is not None:
+                                _record_origins(agent.history.urls() or [])
+                        except Exception:
+                            pass
+                        # solta a sessão CDP; a limpeza do armazenamento fica com o pool
+                        try:
+                            await browser.stop()
+                        except Exception:
+                            pass
 
-            return result
+                return asyncio.run(_run())
 
+        budget = TokenBudget(model=_BROWSERUSE_MODEL, job="explorer")
         base_task = AiUtils.build_explorer_prompt(
             analysis=analysis,
             credentials_block=credentials_block,
+            budget=budget,
         )
+        budget.log(screen_id=screen_id)
 
         compact_task = (
             base_task
@@ -113,8 +217,11 @@ IMPORTANTE (ANTI-TRUNCAMENTO):
         last_error = None
 
         for attempt, task in enumerate([base_task, compact_task, compact_task], start=1):
+            result, observations = "", ""
             try:
-                result = _run_agent(task)
+                result, observations = _run_agent(task)
+                if not result:
+                    raise ValueError("Não foi possível obter retorno do BrowserUse")
 
                 try:
                     data = AiUtils.parse_browseruse_json(result)
@@ -123,15 +230,103 @@ IMPORTANTE (ANTI-TRUNCAMENTO):
                         f"BrowserUse retornou JSON inválido: {e} | result={result[:800]}"
                     )
 
-                return _validate(data)
+                descriptions = self._validate(data)
 
             except Exception as e:
                 last_error = e
-                logger.warning(
-                    f"[ScreenExplorer] Tentativa {attempt}/3 falhou: {e}"
-                    + (f" — aguardando {_RETRY_DELAY_SECONDS}s antes de nova tentativa" if attempt < 3 else "")
-                )
-                if attempt < 3:
-                    time.sleep(_RETRY_DELAY_SECONDS)
+                logger.warning(f"[ScreenExplorer] Tentativa {attempt}/3 falhou: {e}")
+
+                # a navegação já aconteceu: tenta aproveitar o que foi coletado
+                descriptions = None
+                if result or observations:
+                    try:
+                        descriptions = self._reformat(
+                            analysis=analysis,
+                            raw_result=result,
+                            observations=observations,
+                            error=e,
+                            screen_id=screen_id,
+                        )
+                    except Exception as reformat_error:
+                        logger.warning(
+                            f"[ScreenExplorer] Reformatação sem navegar falhou: {reformat_error}"
+                            + (" — navegando de novo" if attempt < 3 else "")
+                        )
+
+                if descriptions is None:
+                    if attempt < 3:
+                        logger.info(f"[ScreenExplorer] Aguardando {_RETRY_DELAY_SECONDS}s antes de nova navegação")
+                        time.sleep(_RETRY_DELAY_SECONDS)
+                    continue
+
+            if use_cache:
+                explorer_cache.set(analysis, descriptions, screen_id=screen_id)
+            return descriptions
 
         raise ValueError(f"Falha ao obter descrições válidas do BrowserUse: {last_error}")
+
+    def explore_screens(
+        self,
+        *,
+        analyses: list[dict],
+        screen_ids: list[int],
+        max_concurrency: int = _EXPLORER_MAX_CONCURRENCY,
+    ) -> list[dict]:
+        """
+        Explora várias telas em paralelo (threads; cada uma com seu próprio
+        event loop e um Chromium do pool). Retorna na mesma ordem de `analyses`.
+        Se alguma tela falhar, levanta ValueError — as que deram certo já
+        ficaram no cache e são reaproveitadas no retry do job.
+        """
+        if len(analyses) == 1:
+            return [self.generate_screen_descriptions(analysis=analyses[0], screen_id=screen_ids[0])]
+
+        workers = max(1, min(max_concurrency, len(analyses)))
+        results: list[dict | None] = [None] * len(analyses)
+        errors: list[str] = []
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="explorer") as executor:
+            futures = {
+                executor.submit(
+                    self.generate_screen_descriptions,
+                    analysis=analysis,
+                    screen_id=screen_id,
+                ): index
+                for index, (analysis, screen_id) in enumerate(zip(analyses, screen_ids))
+            }
+
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    errors.append(f"screen_id={screen_ids[index]}: {e}")
+
+        if errors:
+            raise ValueError(
+                f"Falha ao explorar {len(errors)}/{len(analyses)} telas: " + " | ".join(errors)
+            )
+
+        return results
+
+    @staticmethod
+    def merge_target_descriptions(screens: list[dict], results: list[dict]) -> dict:
+        """
+        Junta as descrições de execução de cada tela numa descrição única do
+        Target, na ordem das telas. Com uma tela só, mantém o texto original.
+        """
+        if len(results) == 1:
+            return {
+                "tests_description": results[0]["tests_description"],
+                "playwright_description": results[0]["playwright_description"],
+            }
+
+        merged = {}
+        for field in ("tests_description", "playwright_description"):
+            blocks = []
+            for position, (screen, result) in enumerate(zip(screens, results), start=1):
+                header = f"### Tela {position}: {screen.get('name') or 'Sem nome'} ({screen.get('url') or 'N/A'})"
+                blocks.append(f"{header}\n{result[field]}")
+            merged[field] = "\n\n".join(blocks)
+
+        return merged
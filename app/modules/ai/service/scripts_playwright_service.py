@@ -1,14 +1,19 @@
-import os
-import json
 import logging
-import re
-import ast
+import os
 from typing import Any, Dict
 
-from openai import OpenAI
+from pydantic import ValidationError
+
+from app.modules.ai.schemas.generated_output import GeneratedPlaywrightScript, strict_response_format
+from app.modules.ai.service.llm_client_service import LLM_STRUCTURED_OUTPUT, LLMUsage, llm_clients
+from app.modules.ai.service.llm_cache_service import llm_cache, prompt_hash
+from app.modules.ai.utils.json_repair import JsonRepairError, extract_json_object
 
 logger = logging.getLogger("uvicorn.error")
 
+# pede uma correção quando o script volta inválido (false = falha direto)
+PLAYWRIGHT_CORRECTION = os.getenv("PLAYWRIGHT_CORRECTION", "true").strip().lower() in {"1", "true", "yes", "on"}
+
 
 class ScriptsPlaywrightAgentError(Exception):
     """Erro genérico do agente de geração de scripts Playwright."""
@@ -34,13 +39,19 @@ class ScriptsPlaywrightAgent:
       }
     """
 
-    def __init__(self, model: str = "gpt-4.1-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY não definida no ambiente")
+    SYSTEM_PROMPT = (
+        "Você é um Engenheiro de QA Automation Sênior especialista em Playwright.\n"
+        "RETORNE APENAS JSON válido.\n"
+        "NUNCA retorne markdown.\n"
+        "NUNCA retorne texto fora do JSON.\n"
+        "A raiz do JSON deve ser um OBJETO.\n"
+    )
+    TEMPERATURE = 0.2
 
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, model: str = "gpt-4.1-mini"):
+        self.client = llm_clients.get_sync(model)
         self.model = model
+        self.usage = LLMUsage()
 
     # -----------------------------
     # Parsing robusto do JSON
@@ -49,44 +60,11 @@ class ScriptsPlaywrightAgent:
         if not content or not content.strip():
             raise ScriptsPlaywrightParseError("Modelo retornou resposta vazia")
 
-        raw = content.strip()
-
-        # 1) tenta capturar primeiro objeto {...} (remove lixo tipo "Final Result:")
-        m = re.search(r"\{.*\}", raw, flags=re.DOTALL)
-        if m:
-            raw = m.group(0).strip()
-
-        # 2) json.loads direto
-        try:
-            obj = json.loads(raw)
-            if isinstance(obj, dict):
-                return obj
-        except Exception:
-            pass
-
-        # 3) JSON escapado (ex: {\"a\":1})
-        try:
-            unescaped = raw.replace('\\"', '"')
-            obj = json.loads(unescaped)
-            if isinstance(obj, dict):
-                return obj
-        except Exception:
-            pass
-
-        # 4) literal_eval fallback
         try:
-            evaluated = ast.literal_eval(raw)
-            if isinstance(evaluated, dict):
-                return evaluated
-            if isinstance(evaluated, str):
-                obj = json.loads(evaluated)
-                if isinstance(obj, dict):
-                    return obj
-        except Exception:
-            pass
-
-        logger.error("[IA][PLAYWRIGHT_AGENT] JSON inválido retornado:\n%s", content[:2500])
-        raise ScriptsPlaywrightParseError("Não foi possível parsear JSON retornado pelo modelo")
+            return extract_json_object(content)
+        except JsonRepairError as e:
+            logger.error("[IA][PLAYWRIGHT_AGENT] JSON inválido retornado (%s):\n%s", e, content[:2500])
+            raise ScriptsPlaywrightParseError("Não foi possível parsear JSON retornado pelo modelo") from e
 
     # -----------------------------
     # Validação do schema
@@ -95,23 +73,16 @@ class ScriptsPlaywrightAgent:
         if not isinstance(data, dict):
             raise ScriptsPlaywrightValidationError("Retorno não é um objeto JSON")
 
-        required_keys = {"language", "framework", "title", "script"}
-        missing = required_keys - set(data.keys())
-        if missing:
-            raise ScriptsPlaywrightValidationError(f"Faltando chaves obrigatórias: {sorted(missing)}")
-
-        language = str(data.get("language") or "").strip().lower()
-        framework = str(data.get("framework") or "").strip().lower()
-        title = str(data.get("title") or "").strip()
-        script = str(data.get("script") or "").strip()
-
-        if framework != "playwright":
-            raise ScriptsPlaywrightValidationError(f"framework inválido: {framework!r} (esperado 'playwright')")
-
-        if language not in {"typescript", "javascript"}:
-            raise ScriptsPlaywrightValidationError(
-                f"language inválido: {language!r} (esperado 'typescript' ou 'javascript')"
+        try:
+            parsed = GeneratedPlaywrightScript.model_validate(data)
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
             )
+            raise ScriptsPlaywrightValidationError(f"Formato inválido: {errors}") from e
+
+        language, framework = parsed.language, parsed.framework
+        title, script = parsed.title, parsed.script
 
         if not title:
             raise ScriptsPlaywrightValidationError("title vazio")
@@ -140,35 +111,86 @@ class ScriptsPlaywrightAgent:
     # -----------------------------
     # Geração
     # -----------------------------
-    def generate(self, full_prompt: str) -> Dict[str, Any]:
+    def prompt_hash(self, full_prompt: str) -> str:
+        return prompt_hash(full_prompt, self.SYSTEM_PROMPT)
+
+    def _response_format(self) -> dict:
+        if LLM_STRUCTURED_OUTPUT:
+            return strict_response_format(GeneratedPlaywrightScript, "playwright_script")
+        return {"type": "json_object"}
+
+    def _correct(self, full_prompt: str, content: str, error: Exception) -> tuple[str, Dict[str, Any]]:
+        """
+        Uma rodada de correção com o motivo da falha, reaproveitando o prompt
+        original (prefixo em cache), em vez de gerar do zero no retry do job.
+        """
+        logger.warning("[IA][PLAYWRIGHT_AGENT] Resposta inválida (%s) — pedindo correção", error)
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=self.TEMPERATURE,
+            top_p=0.9,
+            max_tokens=20000,
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": full_prompt},
+                {"role": "assistant", "content": content},
+                {
+                    "role": "user",
+                    "content": (
+                        f"A resposta acima não passou na validação: {error}\n"
+                        "Corrija e reenvie o JSON completo no mesmo formato."
+                    ),
+                },
+            ],
+            response_format=self._response_format(),
+        )
+        self.usage.record(response.usage)
+
+        corrected = (response.choices[0].message.content or "").strip()
+        return corrected, self._validate(self._parse_json_object(corrected))
+
+    def generate(self, full_prompt: str, use_cache: bool = True) -> Dict[str, Any]:
         if not full_prompt or not full_prompt.strip():
             raise ScriptsPlaywrightAgentError("full_prompt está vazio")
 
-        system_prompt = (
-            "Você é um Engenheiro de QA Automation Sênior especialista em Playwright.\n"
-            "RETORNE APENAS JSON válido.\n"
-            "NUNCA retorne markdown.\n"
-            "NUNCA retorne texto fora do JSON.\n"
-            "A raiz do JSON deve ser um OBJETO.\n"
-        )
+        digest = self.prompt_hash(full_prompt)
+
+        if use_cache:
+            cached = llm_cache.get(self.model, digest, self.TEMPERATURE)
+            if cached:
+                try:
+                    result = self._validate(self._parse_json_object(cached))
+                    logger.info("[IA][PLAYWRIGHT_AGENT] Resposta reaproveitada do cache (prompt_hash=%s)", digest[:12])
+                    return result
+                except (ScriptsPlaywrightParseError, ScriptsPlaywrightValidationError):
+                    logger.warning("[IA][PLAYWRIGHT_AGENT] Resposta em cache inválida — chamando o modelo")
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                temperature=0.2,
+                temperature=self.TEMPERATURE,
                 top_p=0.9,
                 max_tokens=20000,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": full_prompt},
                 ],
-                # Força JSON object
-                response_format={"type": "json_object"},
+                response_format=self._response_format(),
             )
+            self.usage.record(response.usage)
 
             content = (response.choices[0].message.content or "").strip()
-            obj = self._parse_json_object(content)
-            return self._validate(obj)
+            try:
+                result = self._validate(self._parse_json_object(content))
+            except (ScriptsPlaywrightParseError, ScriptsPlaywrightValidationError) as e:
+                if not PLAYWRIGHT_CORRECTION:
+                    raise
+                content, result = self._correct(full_prompt, content, e)
+
+            if use_cache:
+                llm_cache.set(self.model, digest, self.TEMPERATURE, content)
+            return result
 
         except (ScriptsPlaywrightParseError, ScriptsPlaywrightValidationError):
             logger.exception("[IA][PLAYWRIGHT_AGENT] Erro ao parsear/validar JSON do modelo")
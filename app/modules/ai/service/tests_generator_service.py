@@ -1,12 +1,33 @@
-import os
 import json
 import logging
-from typing import Any, Dict, List
+import os
+import queue
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+from pydantic import ValidationError
 
-from openai import OpenAI
+from app.modules.ai.schemas.generated_output import (
+    GeneratedTestCase,
+    GeneratedTestCaseList,
+    strict_response_format,
+)
+from app.modules.ai.service.llm_client_service import LLM_STRUCTURED_OUTPUT, LLMUsage, llm_clients
+from app.modules.ai.service.llm_cache_service import llm_cache, prompt_hash
+from app.modules.ai.utils.json_repair import JsonRepairError, extract_json
+from app.modules.ai.utils.json_stream import JsonArrayItemStream
 
 logger = logging.getLogger("uvicorn.error")
 
+TEST_CASE_SHARD_CONCURRENCY = int(os.getenv("TEST_CASE_SHARD_CONCURRENCY", "4"))
+# rodadas de correção só dos casos inválidos (0 = descarta sem pedir correção)
+TEST_CASE_SALVAGE_ROUNDS = int(os.getenv("TEST_CASE_SALVAGE_ROUNDS", "1"))
+# casos por chamada de correção (~4000 tokens de saída cada, teto de 20000)
+_SALVAGE_CHUNK_CASES = 5
+
 
 class TestCaseAgentError(Exception):
     """Erro genérico do agente de casos de teste."""
@@ -17,112 +38,203 @@ class TestCaseAgentParseError(TestCaseAgentError):
 
 
 class TestCaseAgent:
-    def __init__(self, model: str = "gpt-4.1-mini"):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY não definida no ambiente")
+    SYSTEM_PROMPT = (
+        "Você é um QA Sênior altamente experiente, especializado em testes "
+        "funcionais, regressão e prevenção de bugs críticos em sistemas web.\n"
+        "RETORNE APENAS JSON válido.\n"
+        "NUNCA retorne markdown.\n"
+        "NUNCA retorne texto fora do JSON.\n"
+        "O JSON deve ser um OBJETO com a chave \"items\": {\"items\": [ {...}, {...} ]}"
+    )
+    TEMPERATURE = 0.2
 
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, model: str = "gpt-4.1-mini"):
+        self.client = llm_clients.get_sync(model)
         self.model = model
+        self.usage = LLMUsage()
+        self.salvaged = 0
+        self.dropped = 0
+        self._counters_lock = threading.Lock()
+
+    def _response_format(self) -> dict:
+        if LLM_STRUCTURED_OUTPUT:
+            return strict_response_format(GeneratedTestCaseList, "test_cases")
+        return {"type": "json_object"}
+
+    def _validate_case(self, tc: Any, i: int) -> Dict[str, Any]:
+        try:
+            case = GeneratedTestCase.model_validate(tc).model_dump()
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'caso'}: {err['msg']}" for err in e.errors()
+            )
+            raise TestCaseAgentParseError(f"Caso #{i} inválido: {errors}") from e
+
+        # ordena steps
+        case["steps"] = sorted(case["steps"], key=lambda s: s["order"])
+        return case
+
+    def _split_valid(self, items: List[Any]) -> tuple[List[Dict[str, Any]], List[tuple[Any, str]]]:
+        """Separa os casos válidos dos inválidos (caso bruto, motivo)."""
+        valid: List[Dict[str, Any]] = []
+        invalid: List[tuple[Any, str]] = []
+        for i, tc in enumerate(items, start=1):
+            try:
+                valid.append(self._validate_case(tc, i))
+            except TestCaseAgentParseError as e:
+                invalid.append((tc, str(e)))
+        return valid, invalid
 
     def _validate(self, data: Any) -> List[Dict[str, Any]]:
         if not isinstance(data, list) or not data:
             raise TestCaseAgentParseError("Retorno não é uma lista de casos de teste")
 
-        required_case_keys = {
-            "title",
-            "description",
-            "objective",
-            "test_type",
-            "scenario_type",
-            "priority",
-            "risk_level",
-            "preconditions",
-            "expected_result",
-            "steps",
-        }
+        return [self._validate_case(tc, i) for i, tc in enumerate(data, start=1)]
 
-        required_step_keys = {"order", "action", "expected_result"}
+    def prompt_hash(self, full_prompt: str) -> str:
+        return prompt_hash(full_prompt, self.SYSTEM_PROMPT)
 
-        for i, tc in enumerate(data, start=1):
-            if not isinstance(tc, dict):
-                raise TestCaseAgentParseError(f"Caso #{i} não é um objeto")
+    def _parse_items(self, content: str) -> List[Any]:
+        if not content:
+            raise TestCaseAgentParseError("Modelo retornou resposta vazia")
 
-            missing = required_case_keys - set(tc.keys())
-            if missing:
-                raise TestCaseAgentParseError(f"Caso #{i} faltando campos: {sorted(missing)}")
+        try:
+            obj = extract_json(content)
+        except JsonRepairError as e:
+            logger.error("[IA][TEST_CASE_AGENT] JSON inválido retornado:\n%s", content[:2000])
+            raise TestCaseAgentParseError(f"Falha ao parsear JSON: {e}") from e
 
-            if not isinstance(tc["steps"], list) or not tc["steps"]:
-                raise TestCaseAgentParseError(f"Caso #{i} veio sem steps")
+        if isinstance(obj, dict):
+            for key in ("items", "test_cases", "data"):
+                if isinstance(obj.get(key), list):
+                    return obj[key]
 
-            for j, step in enumerate(tc["steps"], start=1):
-                if not isinstance(step, dict):
-                    raise TestCaseAgentParseError(f"Caso #{i} step #{j} não é objeto")
+        raise TestCaseAgentParseError(
+            "Modelo não retornou no formato esperado. Esperado: {'items': [ ... ]}"
+        )
 
-                missing_step = required_step_keys - set(step.keys())
-                if missing_step:
-                    raise TestCaseAgentParseError(
-                        f"Caso #{i} step #{j} faltando campos: {sorted(missing_step)}"
-                    )
+    def _parse_content(self, content: str) -> List[Dict[str, Any]]:
+        return self._validate(self._parse_items(content))
+
+    def _cache_result(self, digest: str, cases: List[Dict[str, Any]]) -> None:
+        # guarda o resultado já validado/corrigido: um hit não repete o salvamento
+        llm_cache.set(
+            self.model,
+            digest,
+            self.TEMPERATURE,
+            json.dumps({"items": cases}, ensure_ascii=False),
+        )
+
+    def _salvage_chunk(self, full_prompt: str, chunk: List[tuple[Any, str]]) -> List[Any]:
+        reasons = "\n".join(f"- {reason}" for _, reason in chunk)
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=self.TEMPERATURE,
+            top_p=0.9,
+            max_tokens=min(20000, 4000 * len(chunk)),
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": full_prompt},
+                {
+                    "role": "assistant",
+                    "content": json.dumps({"items": [tc for tc, _ in chunk]}, ensure_ascii=False, default=str),
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        "Os casos acima não passaram na validação:\n"
+                        f"{reasons}\n\n"
+                        "Reenvie SOMENTE esses casos, corrigidos, no mesmo formato {\"items\": [...]}. "
+                        "Não repita os demais casos nem crie casos novos."
+                    ),
+                },
+            ],
+            response_format=self._response_format(),
+        )
+        self.usage.record(response.usage)
+        return self._parse_items((response.choices[0].message.content or "").strip())
 
-            # ordena steps
-            tc["steps"] = sorted(tc["steps"], key=lambda s: int(s.get("order", 0)))
+    def salvage(self, full_prompt: str, invalid: List[tuple[Any, str]]) -> List[Dict[str, Any]]:
+        """
+        Pede ao modelo só a correção dos casos inválidos (com o motivo de
+        cada um), em vez de gerar tudo de novo. O prompt original vai na
+        frente, então o prefixo sai do cache de prompt do provedor.
+        Retorna os casos corrigidos que passaram na validação.
+        """
+        recovered: List[Dict[str, Any]] = []
+        pending = invalid
 
-        return data
+        for round_ in range(1, TEST_CASE_SALVAGE_ROUNDS + 1):
+            if not pending:
+                break
 
-    def generate(self, full_prompt: str) -> List[Dict[str, Any]]:
+            # em lotes: a saída de cada chamada fica dentro do limite do modelo
+            still_invalid: List[tuple[Any, str]] = []
+            for start in range(0, len(pending), _SALVAGE_CHUNK_CASES):
+                chunk = pending[start:start + _SALVAGE_CHUNK_CASES]
+                try:
+                    items = self._salvage_chunk(full_prompt, chunk)
+                except Exception as e:
+                    logger.warning("[IA][TEST_CASE_AGENT] Correção de casos falhou (rodada %s): %s", round_, e)
+                    still_invalid.extend(chunk)
+                    continue
+
+                valid, invalid_again = self._split_valid(items)
+                recovered.extend(valid)
+                still_invalid.extend(invalid_again)
+            pending = still_invalid
+
+        with self._counters_lock:
+            self.salvaged += len(recovered)
+            self.dropped += max(0, len(invalid) - len(recovered))
+        logger.info(
+            "[IA][TEST_CASE_AGENT] Casos inválidos: %s | corrigidos: %s",
+            len(invalid),
+            len(recovered),
+        )
+        return recovered
+
+    def generate(self, full_prompt: str, use_cache: bool = True) -> List[Dict[str, Any]]:
         if not full_prompt or not full_prompt.strip():
             raise TestCaseAgentError("full_prompt está vazio")
 
-        system_prompt = (
-            "Você é um QA Sênior altamente experiente, especializado em testes "
-            "funcionais, regressão e prevenção de bugs críticos em sistemas web.\n"
-            "RETORNE APENAS JSON válido.\n"
-            "NUNCA retorne markdown.\n"
-            "NUNCA retorne texto fora do JSON.\n"
-            "O JSON deve ser um ARRAY na raiz: [ {...}, {...} ]"
-        )
+        digest = self.prompt_hash(full_prompt)
+
+        if use_cache:
+            cached = llm_cache.get(self.model, digest, self.TEMPERATURE)
+            if cached:
+                try:
+                    items = self._parse_content(cached)
+                    logger.info("[IA][TEST_CASE_AGENT] Resposta reaproveitada do cache (prompt_hash=%s)", digest[:12])
+                    return items
+                except TestCaseAgentParseError:
+                    logger.warning("[IA][TEST_CASE_AGENT] Resposta em cache inválida — chamando o modelo")
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                temperature=0.2,
+                temperature=self.TEMPERATURE,
                 top_p=0.9,
                 max_tokens=20000,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": full_prompt},
                 ],
-                response_format={"type": "json_object"},
+                response_format=self._response_format(),
             )
+            self.usage.record(response.usage)
 
             content = (response.choices[0].message.content or "").strip()
-            if not content:
-                raise TestCaseAgentParseError("Modelo retornou resposta vazia")
+            cases, invalid = self._split_valid(self._parse_items(content))
+            if invalid:
+                cases.extend(self.salvage(full_prompt, invalid))
 
-           
-            try:
-                obj = json.loads(content)
-            except Exception as e:
-                logger.error("[IA][TEST_CASE_AGENT] JSON inválido retornado:\n%s", content[:2000])
-                raise TestCaseAgentParseError(f"Falha ao json.loads: {e}") from e
-
-            
-            items = None
-            if isinstance(obj, dict):
-                if isinstance(obj.get("items"), list):
-                    items = obj["items"]
-                elif isinstance(obj.get("test_cases"), list):
-                    items = obj["test_cases"]
-                elif isinstance(obj.get("data"), list):
-                    items = obj["data"]
-
-            if items is None:
-                raise TestCaseAgentParseError(
-                    "Modelo não retornou no formato esperado. Esperado: {'items': [ ... ]}"
-                )
-
-            return self._validate(items)
+            if not cases:
+                raise TestCaseAgentParseError("Nenhum caso de teste válido retornado pelo modelo")
+
+            if use_cache:
+                self._cache_result(digest, cases)
+            return cases
 
         except TestCaseAgentParseError:
             logger.exception("[IA][TEST_CASE_AGENT] Erro ao parsear JSON do modelo")
@@ -130,3 +242,176 @@ class TestCaseAgent:
         except Exception as e:
             logger.exception("[IA][TEST_CASE_AGENT] Falha ao gerar casos de teste")
             raise TestCaseAgentError(f"Falha ao gerar casos de teste: {e}") from e
+
+    def stream(self, full_prompt: str, use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os casos em streaming: cada item de `items[]` é parseado e
+        validado assim que fecha no texto recebido. Casos inválidos são
+        separados e, no fim do stream, corrigidos numa chamada só com eles
+        (salvage). Se o stream cair no meio, os casos já devolvidos
+        continuam válidos.
+        """
+        if not full_prompt or not full_prompt.strip():
+            raise TestCaseAgentError("full_prompt está vazio")
+
+        digest = self.prompt_hash(full_prompt)
+
+        if use_cache:
+            cached = llm_cache.get(self.model, digest, self.TEMPERATURE)
+            if cached:
+                try:
+                    items = self._parse_content(cached)
+                except TestCaseAgentParseError:
+                    logger.warning("[IA][TEST_CASE_AGENT] Resposta em cache inválida — chamando o modelo")
+                else:
+                    logger.info("[IA][TEST_CASE_AGENT] Resposta reaproveitada do cache (prompt_hash=%s)", digest[:12])
+                    yield from items
+                    return
+
+        parser = JsonArrayItemStream()
+        parts: list[str] = []
+        cases: List[Dict[str, Any]] = []
+        invalid: List[tuple[Any, str]] = []
+
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                temperature=self.TEMPERATURE,
+                top_p=0.9,
+                max_tokens=20000,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": full_prompt},
+                ],
+                response_format=self._response_format(),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except Exception as e:
+            logger.exception("[IA][TEST_CASE_AGENT] Falha ao gerar casos de teste")
+            raise TestCaseAgentError(f"Falha ao gerar casos de teste: {e}") from e
+
+        try:
+            for chunk in stream:
+                # o uso vem num último chunk, sem choices
+                if chunk.usage is not None:
+                    self.usage.record(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+
+                parts.append(delta)
+                for tc in parser.feed(delta):
+                    try:
+                        case = self._validate_case(tc, len(cases) + len(invalid) + 1)
+                    except TestCaseAgentParseError as e:
+                        invalid.append((tc, str(e)))
+                        logger.warning("[IA][TEST_CASE_AGENT] Caso separado para correção: %s", e)
+                        continue
+                    cases.append(case)
+                    yield case
+        except Exception as e:
+            logger.exception("[IA][TEST_CASE_AGENT] Stream interrompido após %s casos", len(cases))
+            raise TestCaseAgentError(f"Stream interrompido após {len(cases)} casos: {e}") from e
+        finally:
+            stream.close()
+
+        if invalid:
+            for case in self.salvage(full_prompt, invalid):
+                cases.append(case)
+                yield case
+
+        if not cases:
+            logger.error("[IA][TEST_CASE_AGENT] Nenhum caso válido no stream:\n%s", "".join(parts)[:2000])
+            raise TestCaseAgentParseError(
+                "Modelo não retornou no formato esperado. Esperado: {'items': [ ... ]}"
+            )
+
+        if use_cache and parser.done and parser.skipped == 0:
+            self._cache_result(digest, cases)
+
+
+def test_case_fingerprint(tc: Dict[str, Any]) -> str:
+    """Título normalizado (sem acentos, caixa e pontuação) para deduplicação."""
+    title = unicodedata.normalize("NFKD", str(tc.get("title") or ""))
+    title = "".join(ch for ch in title if not unicodedata.combining(ch)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", title).strip()
+
+
+class ShardedTestCaseGenerator:
+    """
+    Map-reduce da geração de casos: um prompt por seção da interface,
+    executados em paralelo (threads, limite TEST_CASE_SHARD_CONCURRENCY), com
+    os casos unidos e deduplicados conforme chegam. A latência passa a
+    acompanhar a maior seção, não a tela inteira.
+    """
+
+    def __init__(self, agent: TestCaseAgent, max_concurrency: int = TEST_CASE_SHARD_CONCURRENCY):
+        self.agent = agent
+        self.max_concurrency = max(1, max_concurrency)
+        self.duplicates = 0
+        self.failed_shards: list[int] = []
+
+    def stream(self, prompts: List[str], use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        if not prompts:
+            raise TestCaseAgentError("Nenhum prompt para gerar casos de teste")
+
+        events: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def _run_shard(index: int, prompt: str) -> None:
+            if stop.is_set():
+                # o consumidor já parou: não abre a chamada ao modelo
+                return
+            try:
+                for case in self.agent.stream(prompt, use_cache=use_cache):
+                    if stop.is_set():
+                        break
+                    events.put(("case", index, case))
+                events.put(("done", index, None))
+            except Exception as e:
+                events.put(("error", index, e))
+
+        seen: set[str] = set()
+        produced = 0
+        errors: list[Exception] = []
+        pending = len(prompts)
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(prompts)),
+            thread_name_prefix="testcase-shard",
+        )
+        try:
+            for index, prompt in enumerate(prompts, start=1):
+                executor.submit(_run_shard, index, prompt)
+
+            while pending:
+                kind, index, payload = events.get()
+
+                if kind == "case":
+                    fingerprint = test_case_fingerprint(payload)
+                    if fingerprint in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(fingerprint)
+                    produced += 1
+                    yield payload
+                    continue
+
+                pending -= 1
+                if kind == "error":
+                    self.failed_shards.append(index)
+                    errors.append(payload)
+                    logger.warning("[IA][TEST_CASE_AGENT] Seção %s/%s falhou: %s", index, len(prompts), payload)
+        finally:
+            stop.set()
+            # seções ainda na fila não chegam a chamar o modelo
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if self.duplicates:
+            logger.info("[IA][TEST_CASE_AGENT] %s casos duplicados descartados entre seções", self.duplicates)
+
+        if errors and (produced == 0 or len(errors) == len(prompts)):
+            raise errors[0]
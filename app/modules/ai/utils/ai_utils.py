@@ -1,40 +1,21 @@
 from __future__ import annotations
 from pathlib import Path
-import json
 import re
-import ast
 from typing import Any, Dict, Optional
-from docling.document_converter import DocumentConverter
 import textwrap
 
+from app.modules.ai.utils.document_extraction import extract_document as route_extraction, extract_documents
+from app.modules.ai.utils.document_retrieval import join_chunks, select_chunks
+from app.modules.ai.utils.json_repair import JsonRepairError, extract_json_object
+from app.modules.ai.utils.token_budget import PromptSection, TokenBudget
+from app.modules.screen.service.screen_document_service import ScreenDocumentService
 
-def _sanitize_json_strings(s: str) -> str:
-    """
-    Percorre o JSON char a char e escapa newlines/tabs/CR literais que aparecem
-    dentro de valores de string. LLMs às vezes emitem \n real em vez de \\n.
-    """
-    result = []
-    in_string = False
-    escaped = False
-    for ch in s:
-        if escaped:
-            result.append(ch)
-            escaped = False
-        elif ch == "\\":
-            result.append(ch)
-            escaped = True
-        elif ch == '"':
-            in_string = not in_string
-            result.append(ch)
-        elif in_string and ch == "\n":
-            result.append("\\n")
-        elif in_string and ch == "\r":
-            result.append("\\r")
-        elif in_string and ch == "\t":
-            result.append("\\t")
-        else:
-            result.append(ch)
-    return "".join(result)
+
+_LANGUAGE_STOPWORDS = {
+    "pt": frozenset({"de", "que", "não", "para", "com", "uma", "os", "no", "se", "na", "por", "mais", "as", "dos", "como", "mas", "ao", "das", "à", "seu", "sua", "ou", "quando", "muito", "nos", "já", "também", "pelo", "pela", "até", "isso", "ele", "entre", "depois", "sem", "mesmo", "aos", "ter", "são", "do", "da", "em", "um", "é", "o", "a", "e"}),
+    "en": frozenset({"the", "and", "of", "to", "in", "is", "that", "for", "it", "with", "as", "was", "on", "be", "at", "by", "this", "have", "from", "or", "an", "are", "not", "but", "which", "you", "all", "will", "can", "should", "must", "when", "if", "user", "click"}),
+    "es": frozenset({"el", "la", "que", "de", "y", "en", "los", "del", "se", "las", "por", "un", "para", "con", "no", "una", "su", "al", "lo", "como", "más", "pero", "sus", "le", "ya", "o", "este", "sí", "porque", "esta", "entre", "cuando", "muy", "sin", "sobre", "también", "usuario"}),
+}
 
 
 class AiUtils:
@@ -75,23 +56,19 @@ class AiUtils:
         *,
         analysis: dict,
         credentials_block: str,
+        budget: TokenBudget | None = None,
     ) -> str:
         """
         Prompt usado pelo agente BrowserUse para explorar a tela.
         Agora retorna JSON com 4 descrições em UMA explorada.
-        """
-
-        return f"""
-Acesse a URL alvo:
-{analysis["target_url"]}
-
-{credentials_block}
 
-==================================================
-CONTEXTO ADICIONAL FORNECIDO PELO QA
-==================================================
+        Instruções fixas primeiro e dados da tela (URL, credenciais, contexto)
+        no fim: o prefixo igual entre chamadas aproveita o cache do provedor.
+        """
 
-{analysis.get("screen_context") or "Nenhum contexto adicional fornecido."}
+        def _render(credentials_block: str, screen_context: str) -> str:
+            return f"""
+Acesse a URL alvo informada em "DADOS DESTA EXPLORAÇÃO", no fim destas instruções.
 
 ==================================================
 PASSO 1 — MAPEAMENTO OBRIGATÓRIO (FAÇA ANTES DE QUALQUER OUTRA COISA)
@@ -181,23 +158,129 @@ PROIBIDO:
 - Após gerar o JSON, finalize imediatamente
 
 NÃO inclua nenhum texto fora do JSON.
+
+==================================================
+DADOS DESTA EXPLORAÇÃO
+==================================================
+
+URL alvo:
+{analysis["target_url"]}
+
+{credentials_block}
+
+CONTEXTO ADICIONAL FORNECIDO PELO QA:
+
+{screen_context or "Nenhum contexto adicional fornecido."}
+""".strip()
+
+        budget = budget or TokenBudget()
+        return budget.render(
+            _render,
+            [
+                PromptSection("credentials_block", credentials_block, trimmable=False),
+                PromptSection("screen_context", str(analysis.get("screen_context") or ""), priority=50, min_tokens=500),
+            ],
+        )
+
+    @staticmethod
+    def build_explorer_reformat_prompt(
+        *,
+        analysis: dict,
+        raw_result: str,
+        observations: str,
+        error: str,
+        budget: TokenBudget | None = None,
+    ) -> str:
+        """
+        Prompt só de texto que refaz o JSON do explorador a partir do que o
+        agente BrowserUse já coletou (retorno bruto + histórico), sem abrir
+        o navegador de novo. Prefixo fixo, dados da tentativa no fim.
+        """
+
+        def _render(raw_result: str, observations: str) -> str:
+            return f"""
+Um agente navegou por uma tela web e registrou observações, mas o retorno final
+dele não pôde ser usado. Sua tarefa é montar o JSON final SOMENTE a partir do
+material coletado abaixo, sem navegar e sem inventar nada.
+
+==================================================
+REGRAS
+==================================================
+
+- Use APENAS fatos presentes no retorno bruto ou nas observações.
+- Preserve o TEXTO EXATO de títulos, botões, labels e placeholders.
+- Se o retorno bruto já tiver o conteúdo de um campo, reaproveite-o.
+- Nenhum campo pode ficar vazio: se o material não tiver informação para um campo, escreva uma frase curta dizendo o que não foi observado na tela.
+- SEM markdown dentro dos campos.
+
+CAMPOS:
+
+- tests_description: cada seção da tela, na ordem; elementos interativos,
+  fluxos, validações, estados e edge cases observados.
+- playwright_description: inventário de elementos interativos por seção, com
+  tipo, texto/label/placeholder exato e id/name/aria quando observados.
+- documentation_description: seções pelo título exato, conteúdo, público e
+  fluxos de uso observados.
+- uiux_description: avaliação crítica (acessibilidade, hierarquia, consistência,
+  feedback, estados vazios/loading) citando elementos específicos.
+
+RETORNE APENAS UM OBJETO JSON com exatamente as chaves:
+tests_description, playwright_description, documentation_description, uiux_description.
+
+==================================================
+DADOS DESTA TENTATIVA
+==================================================
+
+URL explorada: {analysis.get("target_url")}
+
+Motivo da falha do retorno original:
+{error}
+
+RETORNO BRUTO DO AGENTE:
+\"\"\"
+{raw_result or "(vazio)"}
+\"\"\"
+
+OBSERVAÇÕES REGISTRADAS DURANTE A NAVEGAÇÃO:
+\"\"\"
+{observations or "(nenhuma)"}
+\"\"\"
 """.strip()
 
+        budget = budget or TokenBudget()
+        return budget.render(
+            _render,
+            [
+                PromptSection("raw_result", raw_result or "", priority=80, min_tokens=1000),
+                PromptSection("observations", observations or "", priority=60, min_tokens=1000),
+            ],
+        )
+
     @staticmethod
     def build_test_case_prompt(
         ui_description: str,
         analysis: dict,
         documents_block: str,
+        section: tuple[int, int] | None = None,
+        budget: TokenBudget | None = None,
     ) -> str:
         """
         Prompt usado pelo agente gerador de casos de teste.
         Retorno obrigatório: JSON OBJECT com chave "items" (lista de casos).
+
+        `section` = (parte, total) quando a interface foi dividida em seções
+        geradas em paralelo; o prompt passa a cobrir só aquela parte.
+        As seções variáveis passam pelo `budget` (orçamento de tokens).
+
+        Regras e formato vêm primeiro e não dependem do alvo; objetivo, recorte
+        e descrições ficam no fim. Assim o prefixo é idêntico entre alvos e
+        seções e é servido do cache de prompt do provedor.
         """
 
         objective = (analysis.get("description") or "").strip()
         objective_block = f"""
     ==================================================
-    ESCOPO RESTRITO — LEIA ANTES DE QUALQUER COISA
+    ESCOPO RESTRITO — PRIORIDADE MÁXIMA
     ==================================================
 
     O QA definiu um objetivo específico para esta análise:
@@ -207,36 +290,37 @@ NÃO inclua nenhum texto fora do JSON.
     - Gere casos de teste SOMENTE para o que está descrito no objetivo acima.
     - Se o objetivo citar uma aba, funcionalidade, fluxo ou elemento específico,
       ignore completamente todos os outros elementos da interface.
-    - Esta restrição tem PRIORIDADE MÁXIMA sobre qualquer outra instrução deste prompt.
+    - Esta restrição tem PRIORIDADE MÁXIMA sobre qualquer outra instrução deste prompt,
+      inclusive as regras de cobertura acima.
     - NÃO amplie o escopo, mesmo que a interface tenha outras funcionalidades relevantes.
 """ if objective else ""
 
-        return f"""
-    Você é um QA Sênior altamente experiente, especializado em testes funcionais,
-    regressão e prevenção de bugs críticos em sistemas web.
-    {objective_block}
-    Você está executando uma ANÁLISE DE QA com o seguinte contexto:
+        section_block = f"""
+    ==================================================
+    RECORTE DESTA GERAÇÃO — PARTE {section[0]} DE {section[1]}
+    ==================================================
 
-    Nome da análise:
-    "{analysis.get("name")}"
+    A interface foi dividida em {section[1]} partes, geradas separadamente.
+    A descrição abaixo contém SOMENTE a parte {section[0]}.
+    - Gere casos apenas para os elementos desta parte.
+    - NÃO crie casos para seções que não aparecem na descrição abaixo.
+    - Fluxos que atravessam partes podem ser citados só a partir desta parte.
+""" if section and section[1] > 1 else ""
 
-    URL do sistema:
-    {analysis.get("target_url")}
-
-    Objetivo da análise (fornecido pelo QA):
-    "{objective or "Não informado — cubra toda a interface descrita abaixo."}"
-
-    Contexto adicional da tela:
-    "{analysis.get("screen_context")}"
+        def _render(ui_description: str, documents_block: str, screen_context: str) -> str:
+            return f"""
+    Você é um QA Sênior altamente experiente, especializado em testes funcionais,
+    regressão e prevenção de bugs críticos em sistemas web.
 
-    "{documents_block}"
+    Você está executando uma ANÁLISE DE QA. Os dados da análise (objetivo definido
+    pelo QA, contexto, documentos e a descrição da interface) estão no fim deste prompt.
 
     ==================================================
     TAREFA PRINCIPAL
     ==================================================
 
     Gerar CASOS DE TESTE FUNCIONAIS com base EXCLUSIVAMENTE na interface analisada,
-    respeitando o escopo definido no objetivo acima.
+    respeitando o escopo definido no objetivo da análise.
 
     Os testes devem cobrir (dentro do escopo):
     - Fluxos principais
@@ -251,7 +335,7 @@ NÃO inclua nenhum texto fora do JSON.
     ==================================================
 
     1. NÃO invente funcionalidades — cada teste deve referenciar explicitamente um elemento,
-       ação ou comportamento DESCRITO na interface abaixo.
+       ação ou comportamento DESCRITO na interface analisada.
     2. NÃO assuma integrações externas não mencionadas.
     3. NÃO descreva testes genéricos sem ancoragem na interface real.
        ERRADO: "Verificar que a página carrega corretamente."
@@ -348,6 +432,24 @@ NÃO inclua nenhum texto fora do JSON.
     ]
     }}
 
+    ==================================================
+    DADOS DESTA ANÁLISE
+    ==================================================
+    {objective_block}{section_block}
+    Nome da análise:
+    "{analysis.get("name")}"
+
+    URL do sistema:
+    {analysis.get("target_url")}
+
+    Objetivo da análise (fornecido pelo QA):
+    "{objective or "Não informado — cubra toda a interface descrita abaixo."}"
+
+    Contexto adicional da tela:
+    "{screen_context}"
+
+    "{documents_block}"
+
     ==================================================
     DESCRIÇÃO DA INTERFACE ANALISADA
     ==================================================
@@ -357,13 +459,103 @@ NÃO inclua nenhum texto fora do JSON.
     \"\"\"
     """.strip()
 
+        budget = budget or TokenBudget()
+        return budget.render(
+            _render,
+            [
+                PromptSection("ui_description", ui_description or "", priority=100, min_tokens=1500),
+                PromptSection("screen_context", str(analysis.get("screen_context") or ""), priority=60, min_tokens=200),
+                PromptSection("documents_block", documents_block or "", priority=30),
+            ],
+        )
+
 
     @staticmethod
-    def read_documents_with_docling(documents: list) -> str:
+    def split_test_sections(
+        tests_description: str,
+        max_chars: int = 3000,
+        max_sections: int = 6,
+    ) -> list[str]:
+        """
+        Divide a tests_description em seções para geração em paralelo.
+
+        Respeita os cabeçalhos "### Tela N" (alvos com várias telas) e, dentro
+        deles, os parágrafos; parágrafos vizinhos são agrupados até max_chars.
+        Se passar de max_sections, as seções menores vizinhas são unidas.
+        """
+        text = (tests_description or "").strip()
+        if not text:
+            return []
+
+        screens = [b.strip() for b in re.split(r"(?m)^(?=### Tela \d+)", text) if b.strip()]
+
+        sections: list[str] = []
+        for block in screens:
+            # continuações da mesma tela repetem o cabeçalho dela
+            header = block.splitlines()[0] if block.startswith("### Tela") else ""
+            current = ""
+            for paragraph in (p.strip() for p in re.split(r"\n\s*\n", block)):
+                if not paragraph:
+                    continue
+                if current and len(current) + len(paragraph) + 2 > max_chars:
+                    sections.append(current)
+                    current = f"{header} (continuação)" if header else ""
+                current = f"{current}\n\n{paragraph}" if current else paragraph
+            if current:
+                sections.append(current)
+
+        while len(sections) > max(1, max_sections):
+            # une o par vizinho de menor tamanho combinado
+            i = min(range(len(sections) - 1), key=lambda k: len(sections[k]) + len(sections[k + 1]))
+            sections[i:i + 2] = [f"{sections[i]}\n\n{sections[i + 1]}"]
+
+        return sections
+
+    @staticmethod
+    def extract_document(file_path: str, content_type: str | None = None) -> dict:
+        """
+        Extrai texto e número de páginas pelo caminho mais barato para o
+        formato (texto direto, camada de texto do PDF ou Docling/OCR).
+        """
+        return route_extraction(file_path, content_type=content_type)
+
+    @staticmethod
+    def detect_language_hint(text: str) -> str | None:
+        """
+        Palpite barato de idioma (pt/en/es) pela frequência de stopwords.
+        Serve só como dica para o prompt; retorna None se não houver sinal.
+        """
+        if not text:
+            return None
+
+        words = re.findall(r"[a-zà-ÿ]+", text[:20000].lower())
+        if not words:
+            return None
+
+        scores = {
+            lang: sum(1 for w in words if w in stopwords)
+            for lang, stopwords in _LANGUAGE_STOPWORDS.items()
+        }
+        lang, score = max(scores.items(), key=lambda item: item[1])
+
+        if score < 3 or score / len(words) < 0.02:
+            return None
+        return lang
+
+    @staticmethod
+    def read_documents_with_docling(documents: list, query: str = "") -> str:
         """
         Lê documentos da qa_documents usando Docling
         e retorna um texto unificado para RAG no prompt.
 
+        O texto extraído é cacheado em screen_documents pelo hash do conteúdo,
+        então gerações repetidas não reprocessam o mesmo arquivo. Os que não
+        estão em cache são extraídos em paralelo, mantendo a ordem do bloco.
+
+        Em vez de truncar, os textos são divididos em trechos e só os mais
+        relevantes para `query` (descrição do alvo) entram, dentro de
+        DOCUMENTS_TOKEN_BUDGET.
+
         Robusto contra:
         - path inexistente
         - doc vazio/malformado
@@ -374,72 +566,109 @@ NÃO inclua nenhum texto fora do JSON.
         if not documents:
             return ""
 
-        converter = DocumentConverter()
-        extracted_contents: list[str] = []
+        document_service = ScreenDocumentService()
+
+        # 1) resolve cada documento: mensagem fixa, texto em cache ou extração pendente
+        entries: list[dict] = []
+        to_extract: list[dict] = []
 
         for i, doc in enumerate(documents, start=1):
             # suporta doc como dict ou objeto
             file_path = None
             doc_type = None
+            doc_id = None
 
             try:
                 if isinstance(doc, dict):
                     file_path = doc.get("path")
                     doc_type = doc.get("type") or "Documento"
+                    doc_id = doc.get("id")
                 else:
                     file_path = getattr(doc, "path", None)
                     doc_type = getattr(doc, "type", None) or "Documento"
+                    doc_id = getattr(doc, "id", None)
             except Exception:
-                extracted_contents.append(
-                    f"--- DOCUMENTO {i} ---\nDocumento inválido (estrutura inesperada)."
-                )
+                entries.append({"content": f"--- DOCUMENTO {i} ---\nDocumento inválido (estrutura inesperada)."})
                 continue
 
+            label = str(doc_type).upper()
+
             if not file_path:
-                extracted_contents.append(
-                    f"--- {str(doc_type).upper()} ---\nDocumento sem caminho (path vazio)."
-                )
+                entries.append({"content": f"--- {label} ---\nDocumento sem caminho (path vazio)."})
                 continue
 
             path = Path(file_path)
 
             if not path.exists():
-                extracted_contents.append(
-                    f"--- {str(doc_type).upper()} ---\nArquivo não encontrado: {file_path}"
-                )
+                entries.append({"content": f"--- {label} ---\nArquivo não encontrado: {file_path}"})
                 continue
 
             if not path.is_file():
-                extracted_contents.append(
-                    f"--- {str(doc_type).upper()} ---\nPath não é arquivo: {file_path}"
-                )
+                entries.append({"content": f"--- {label} ---\nPath não é arquivo: {file_path}"})
                 continue
 
+            entry = {"label": label, "path": path, "doc_type": doc_type, "doc_id": doc_id}
             try:
-                result = converter.convert(str(path))
-                text = (result.document.export_to_text() or "").strip()
-
-                if not text:
-                    extracted_contents.append(
-                        f"--- {str(doc_type).upper()} ---\n"
-                        f"Não foi possível extrair texto (arquivo pode ser imagem/escaneado). "
-                        f"Arquivo: {path.name}"
-                    )
+                # cache persistente por conteúdo: evita reprocessar o arquivo
+                entry["content_hash"] = ScreenDocumentService.hash_file(str(path))
+                entry["text"] = document_service.get_cached_text(entry["content_hash"])
+            except Exception as e:
+                entry["error"] = e
+
+            if "error" not in entry and entry["text"] is None:
+                to_extract.append(entry)
+            entries.append(entry)
+
+        # 2) extrai os que faltam em paralelo (timeout/limite de memória por documento)
+        if to_extract:
+            results = extract_documents([(str(e["path"]), e["doc_type"]) for e in to_extract])
+            for entry, result in zip(to_extract, results):
+                if isinstance(result, Exception):
+                    entry["error"] = result
                     continue
+                entry["text"] = result["text"]
+                document_service.save_extraction(entry["doc_id"], entry["content_hash"], entry["text"])
 
-                # (opcional) limitar tamanho para não explodir o prompt
-                MAX_CHARS = 12000
-                if len(text) > MAX_CHARS:
-                    text = text[:MAX_CHARS] + "\n\n[...texto truncado...]"
+        # 3) seleciona os trechos mais relevantes entre todos os documentos
+        with_text = [e for e in entries if "content" not in e and "error" not in e and e["text"]]
+        selected = select_chunks([e["text"] for e in with_text], query)
+        for index, entry in enumerate(with_text):
+            entry["selected"] = selected.get(index, [])
+
+        # 4) monta o bloco na ordem original dos documentos
+        extracted_contents: list[str] = []
 
+        for entry in entries:
+            if "content" in entry:
+                extracted_contents.append(entry["content"])
+                continue
+
+            label, path = entry["label"], entry["path"]
+
+            if "error" in entry:
                 extracted_contents.append(
-                    f"--- {str(doc_type).upper()} ({path.suffix.lower()}) ---\n{text}"
+                    f"--- {label} ---\nErro ao processar documento: {type(entry['error']).__name__}"
                 )
+                continue
 
-            except Exception as e:
+            if not entry["text"]:
                 extracted_contents.append(
-                    f"--- {str(doc_type).upper()} ---\nErro ao processar documento: {type(e).__name__}"
+                    f"--- {label} ---\n"
+                    f"Não foi possível extrair texto (arquivo pode ser imagem/escaneado). "
+                    f"Arquivo: {path.name}"
                 )
+                continue
+
+            if not entry["selected"]:
+                extracted_contents.append(
+                    f"--- {label} ({path.suffix.lower()}) ---\n"
+                    f"Nenhum trecho relevante para esta análise."
+                )
+                continue
+
+            extracted_contents.append(
+                f"--- {label} ({path.suffix.lower()}) ---\n{join_chunks(entry['selected'])}"
+            )
 
         return "\n\n".join(extracted_contents)
     @staticmethod
@@ -482,54 +711,25 @@ REGRAS IMPORTANTES:
         - JSON escapado: {\"a\": 1}
         - string com prefixo "Final Result:" + JSON
         - JSON dentro de texto/log
+        - newlines literais dentro de strings e vírgulas sobrando
         """
         if not result:
             raise ValueError("Resultado vazio do BrowserUse")
 
-        raw = result.strip()
-
-        # 1) tenta pegar o primeiro bloco JSON {...}
-        m = re.search(r"\{.*\}", raw, flags=re.DOTALL)
-        if m:
-            raw = m.group(0).strip()
-
-        # 2) tenta JSON direto
-        try:
-            return json.loads(raw)
-        except json.JSONDecodeError:
-            pass
-
-        # 3) sanitiza newlines/tabs literais dentro de strings JSON e tenta novamente
-        # (LLMs às vezes emitem \n real em vez de \\n dentro dos valores)
-        try:
-            return json.loads(_sanitize_json_strings(raw))
-        except json.JSONDecodeError:
-            pass
-
-        # 4) se estiver escapado tipo {\"a\":1}, desfaz e tenta
-        try:
-            unescaped = raw.replace('\\"', '"')
-            return json.loads(unescaped)
-        except json.JSONDecodeError:
-            pass
-
         try:
-            evaluated = ast.literal_eval(raw)
-            if isinstance(evaluated, str):
-                return json.loads(evaluated)
-            if isinstance(evaluated, dict):
-                return evaluated
-        except Exception:
-            pass
-
-        raise ValueError(f"Não foi possível parsear JSON do BrowserUse. raw={raw[:500]}")
+            return extract_json_object(result)
+        except JsonRepairError as e:
+            raise ValueError(f"Não foi possível parsear JSON do BrowserUse: {e}") from e
 
 
-    def build_playwright_script_prompt(analysis: Dict[str, Any]) -> str:
+    def build_playwright_script_prompt(analysis: Dict[str, Any], budget: TokenBudget | None = None) -> str:
         """
         Monta um prompt robusto para um agente gerar scripts Playwright
         usando os dados de uma QaAnalysis (1 objeto).
 
+        Instruções fixas primeiro, dados da análise no fim (prefixo
+        reaproveitado pelo cache de prompt do provedor).
+
         Espera chaves como:
         - id
         - name
@@ -572,7 +772,7 @@ REGRAS IMPORTANTES:
 
         objective_block_pw = f"""
     ==================================================
-    ESCOPO RESTRITO — LEIA ANTES DE QUALQUER COISA
+    ESCOPO RESTRITO — PRIORIDADE MÁXIMA
     ==================================================
 
     O QA definiu um objetivo específico para esta análise:
@@ -582,66 +782,23 @@ REGRAS IMPORTANTES:
     - Automatize SOMENTE o que está descrito no objetivo acima.
     - Se o objetivo citar uma aba, funcionalidade, fluxo ou elemento específico,
       ignore completamente todos os outros elementos da interface.
-    - Esta restrição tem PRIORIDADE MÁXIMA sobre qualquer outra instrução deste prompt.
+    - Esta restrição tem PRIORIDADE MÁXIMA sobre qualquer outra instrução deste prompt,
+      inclusive o objetivo do script e as regras acima.
     - NÃO amplie o escopo, mesmo que a interface tenha outras funcionalidades.
 """ if description else ""
 
-        prompt = f"""
+        def _render(
+            screen_context: str,
+            playwright_description: str,
+            tests_description: str,
+            documentation_description: str,
+            uiux_description: str,
+        ) -> str:
+            prompt = f"""
     Você é um Engenheiro de QA Automation Sênior especialista em Playwright.
 
     Você deve gerar um script Playwright COMPLETO e EXECUTÁVEL para automatizar testes E2E
-    da tela descrita abaixo, seguindo fielmente o contexto fornecido.
-    {objective_block_pw}
-    ==================================================
-    DADOS DA ANÁLISE
-    ==================================================
-
-    analysis_id: {analysis_id}
-    name: {name}
-    target_url: {target_url}
-
-    Credenciais de acesso:
-    {credentials_block}
-
-    Objetivo definido pelo QA:
-    "{description or "Não informado — cubra os fluxos principais da interface."}"
-
-    Contexto da tela:
-    "{screen_context or "Não informado."}"
-
-    ==================================================
-    DESCRIÇÃO PARA AUTOMAÇÃO (FONTE PRINCIPAL)
-    ==================================================
-
-    Use esta descrição como BASE para seletores e fluxos:
-
-    \"\"\"
-    {playwright_description or "Não informado."}
-    \"\"\"
-
-    ==================================================
-    DESCRIÇÃO FUNCIONAL (APOIO)
-    ==================================================
-
-    \"\"\"
-    {tests_description or "Não informado."}
-    \"\"\"
-
-    ==================================================
-    DOCUMENTAÇÃO (APOIO)
-    ==================================================
-
-    \"\"\"
-    {documentation_description or "Não informado."}
-    \"\"\"
-
-    ==================================================
-    OBSERVAÇÕES UI/UX (APOIO)
-    ==================================================
-
-    \"\"\"
-    {uiux_description or "Não informado."}
-    \"\"\"
+    da tela descrita nos dados da análise (no fim deste prompt), seguindo fielmente o contexto fornecido.
 
     ==================================================
     OBJETIVO DO SCRIPT
@@ -649,8 +806,8 @@ REGRAS IMPORTANTES:
 
     Gerar um arquivo de teste Playwright que:
 
-    1) Acesse a URL {target_url}
-    2) Execute SOMENTE os fluxos cobertos pelo objetivo do QA acima
+    1) Acesse a target_url informada nos dados da análise
+    2) Execute SOMENTE os fluxos cobertos pelo objetivo definido pelo QA
     3) Valide listagem, filtros e paginação APENAS se estiverem no escopo do objetivo
     4) Valide criação e edição/atualização APENAS se estiverem no escopo do objetivo
     5) Cubra validações de campos obrigatórios e entradas inválidas dentro do escopo
@@ -722,16 +879,81 @@ REGRAS IMPORTANTES:
     - o script não tem placeholders do tipo TODO
     - os testes têm asserts (expect)
     - os testes são resilientes a loading e estados iniciais
-    """.strip()
 
-        return textwrap.dedent(prompt).strip()
+    ==================================================
+    DADOS DA ANÁLISE
+    ==================================================
+    {objective_block_pw}
+    analysis_id: {analysis_id}
+    name: {name}
+    target_url: {target_url}
+
+    Credenciais de acesso:
+    {credentials_block}
+
+    Objetivo definido pelo QA:
+    "{description or "Não informado — cubra os fluxos principais da interface."}"
+
+    Contexto da tela:
+    "{screen_context or "Não informado."}"
+
+    ==================================================
+    DESCRIÇÃO PARA AUTOMAÇÃO (FONTE PRINCIPAL)
+    ==================================================
+
+    Use esta descrição como BASE para seletores e fluxos:
+
+    \"\"\"
+    {playwright_description or "Não informado."}
+    \"\"\"
+
+    ==================================================
+    DESCRIÇÃO FUNCIONAL (APOIO)
+    ==================================================
+
+    \"\"\"
+    {tests_description or "Não informado."}
+    \"\"\"
+
+    ==================================================
+    DOCUMENTAÇÃO (APOIO)
+    ==================================================
+
+    \"\"\"
+    {documentation_description or "Não informado."}
+    \"\"\"
+
+    ==================================================
+    OBSERVAÇÕES UI/UX (APOIO)
+    ==================================================
+
+    \"\"\"
+    {uiux_description or "Não informado."}
+    \"\"\"
+    """.strip()
+            return textwrap.dedent(prompt).strip()
+
+        budget = budget or TokenBudget()
+        return budget.render(
+            _render,
+            [
+                PromptSection("playwright_description", playwright_description, priority=100, min_tokens=1500),
+                PromptSection("tests_description", tests_description, priority=70, min_tokens=500),
+                PromptSection("screen_context", screen_context, priority=60, min_tokens=200),
+                PromptSection("documentation_description", documentation_description, priority=40),
+                PromptSection("uiux_description", uiux_description, priority=10),
+            ],
+        )
 
 
-    def build_docs_prompt(analysis: Dict[str, Any]) -> str:
+    def build_docs_prompt(analysis: Dict[str, Any], budget: TokenBudget | None = None) -> str:
         """
         Monta um prompt para gerar documentação funcional
         estruturada em Markdown, pronta para exportação
         para Word / Pages / Google Docs.
+
+        Regras e estrutura formam um prefixo fixo; os dados da tela vêm no
+        fim, para o prefixo ser servido do cache de prompt do provedor.
         """
 
         def s(value: Optional[Any], fallback: str = "") -> str:
@@ -746,12 +968,13 @@ REGRAS IMPORTANTES:
         screen_context = s(analysis.get("screen_context"), "")
         documentation_description = s(analysis.get("documentation_description"), "")
 
-        prompt = f"""
+        def _render(description: str, screen_context: str, documentation_description: str) -> str:
+            prompt = f"""
     Você é um **Analista de Sistemas Sênior / QA Funcional** especializado em
     documentação funcional de sistemas web.
 
     Seu objetivo é gerar uma **DOCUMENTAÇÃO FUNCIONAL PRECISA, COMPLETA E BEM ESTRUTURADA**
-    para a tela descrita abaixo.
+    para a tela descrita no CONTEXTO DA ANÁLISE, no fim deste prompt.
 
     REGRA ABSOLUTA: Documente SOMENTE o que está descrito nas informações fornecidas.
     NUNCA invente seções, funcionalidades, fluxos ou elementos que não apareçam na descrição.
@@ -770,22 +993,6 @@ REGRAS IMPORTANTES:
     - NÃO use formatação decorativa excessiva
     - Clareza e precisão são prioridade absoluta
 
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    CONTEXTO DA ANÁLISE
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-    - Nome da tela / feature: {name}
-    - URL da tela: {target_url}
-
-    Descrição geral fornecida pelo QA:
-    {description}
-
-    Contexto de negócio:
-    {screen_context}
-
-    DESCRIÇÃO DETALHADA DA TELA (sua fonte primária — use 100% do que está aqui):
-    {documentation_description}
-
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     REGRAS DE GERAÇÃO
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -804,7 +1011,7 @@ REGRAS IMPORTANTES:
     ESTRUTURA OBRIGATÓRIA
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-    # Documentação Funcional – {name}
+    # Documentação Funcional – [Nome da tela / feature]
 
     ## 1. Visão Geral
     - Objetivo principal da tela
@@ -862,7 +1069,32 @@ REGRAS IMPORTANTES:
     - Limitações observadas na interface
     - Ambiguidades ou lacunas de informação
 
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    CONTEXTO DA ANÁLISE
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    - Nome da tela / feature: {name}
+    - URL da tela: {target_url}
+
+    Descrição geral fornecida pelo QA:
+    {description}
+
+    Contexto de negócio:
+    {screen_context}
+
+    DESCRIÇÃO DETALHADA DA TELA (sua fonte primária — use 100% do que está aqui):
+    {documentation_description}
+
     Gere a documentação agora.
     """
-
-        return prompt.strip()
+            return prompt.strip()
+
+        budget = budget or TokenBudget()
+        return budget.render(
+            _render,
+            [
+                PromptSection("documentation_description", documentation_description, priority=100, min_tokens=1500),
+                PromptSection("description", description, priority=90, trimmable=False),
+                PromptSection("screen_context", screen_context, priority=50, min_tokens=200),
+            ],
+        )
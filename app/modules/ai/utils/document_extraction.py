@@ -0,0 +1,354 @@
+"""
+Roteador de extração de texto dos documentos de tela.
+
+- txt/md        → leitura direta em streaming
+- PDF com texto → pypdfium2 (pypdf como fallback)
+- PDF escaneado → Docling com OCR
+- outros        → Docling
+
+O Docling só é importado quando realmente necessário. Vários documentos podem
+ser extraídos em paralelo num pool de processos (extract_documents).
+"""
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import billiard
+
+logger = logging.getLogger(__name__)
+
+TEXT_SUFFIXES = {".txt", ".md", ".markdown"}
+TEXT_CONTENT_TYPES = {"text/plain", "text/markdown"}
+PDF_CONTENT_TYPE = "application/pdf"
+
+# Abaixo disso (média de caracteres por página) o PDF é tratado como escaneado
+MIN_CHARS_PER_PAGE = 32
+# ...ou quando mais da metade das páginas não tem camada de texto
+MAX_EMPTY_PAGE_RATIO = 0.5
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+_docling_converter = None
+_docling_lock = threading.Lock()
+
+
+def get_docling_converter():
+    """
+    Converter do Docling compartilhado pelo processo. A criação carrega os
+    modelos de layout/OCR, então é feita uma única vez e sob demanda (depois
+    do fork do worker).
+    """
+    global _docling_converter
+    if _docling_converter is None:
+        with _docling_lock:
+            if _docling_converter is None:
+                from docling.document_converter import DocumentConverter
+                _docling_converter = DocumentConverter()
+    return _docling_converter
+
+
+def _decode_stream(path: Path, encoding: str, errors: str = "strict") -> str:
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    parts: list[str] = []
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def extract_text_file(path: Path) -> dict:
+    try:
+        text = _decode_stream(path, "utf-8-sig")
+    except UnicodeDecodeError:
+        # arquivos salvos em Windows-1252/Latin-1
+        text = _decode_stream(path, "cp1252", errors="replace")
+
+    return {"text": text.strip(), "page_count": None, "method": "text"}
+
+
+def _pdf_pages_pdfium(path: Path) -> list[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            try:
+                pages.append(textpage.get_text_bounded() or "")
+            finally:
+                textpage.close()
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def _pdf_pages_pypdf(path: Path) -> list[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    return [(page.extract_text() or "") for page in reader.pages]
+
+
+def is_scanned(pages: list[str]) -> bool:
+    if not pages:
+        return True
+
+    lengths = [len(p.strip()) for p in pages]
+    empty_ratio = sum(1 for n in lengths if n == 0) / len(lengths)
+    avg_chars = sum(lengths) / len(lengths)
+
+    return avg_chars < MIN_CHARS_PER_PAGE or empty_ratio > MAX_EMPTY_PAGE_RATIO
+
+
+def extract_with_docling(path: Path) -> dict:
+    result = get_docling_converter().convert(str(path))
+    document = result.document
+    pages = getattr(document, "pages", None) or {}
+
+    return {
+        "text": (document.export_to_text() or "").strip(),
+        "page_count": len(pages) or None,
+        "method": "docling",
+    }
+
+
+def extract_pdf(path: Path) -> dict:
+    try:
+        pages = _pdf_pages_pdfium(path)
+        method = "pdfium"
+    except Exception as e:
+        logger.warning(f"[Extraction] pypdfium2 falhou em {path.name}: {e} — tentando pypdf")
+        pages = _pdf_pages_pypdf(path)
+        method = "pypdf"
+
+    if is_scanned(pages):
+        extraction = extract_with_docling(path)
+        extraction["page_count"] = extraction["page_count"] or len(pages) or None
+        extraction["method"] = "docling_ocr"
+        return extraction
+
+    return {
+        "text": "\n\n".join(p.strip() for p in pages if p.strip()),
+        "page_count": len(pages),
+        "method": method,
+    }
+
+
+def extract_document(file_path: str, content_type: str | None = None) -> dict:
+    """
+    Extrai texto de um arquivo escolhendo o caminho mais barato para o formato.
+    Retorna {"text", "page_count", "method"}.
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+
+    if content_type in TEXT_CONTENT_TYPES or suffix in TEXT_SUFFIXES:
+        return extract_text_file(path)
+
+    if content_type == PDF_CONTENT_TYPE or suffix == ".pdf":
+        return extract_pdf(path)
+
+    return extract_with_docling(path)
+
+
+# =====================================================
+# Extração paralela (pool de processos)
+# =====================================================
+# 0 → min(4, CPUs). 1 desativa o pool e extrai em sequência no próprio processo.
+EXTRACTION_WORKERS = int(os.getenv("DOC_EXTRACTION_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("DOC_EXTRACTION_TIMEOUT", "180"))
+EXTRACTION_MEMORY_MB = int(os.getenv("DOC_EXTRACTION_MEMORY_MB", "4096"))
+# recicla o processo filho para devolver memória de PDFs grandes
+EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv("DOC_EXTRACTION_MAX_TASKS_PER_CHILD", "50"))
+
+_POLL_SECONDS = 0.2
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid: int | None = None
+_pool_unavailable = False
+
+
+class ExtractionTimeoutError(Exception):
+    """Documento excedeu DOC_EXTRACTION_TIMEOUT."""
+
+
+def _limit_child_memory(memory_mb: int) -> None:
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+
+        # RLIMIT_DATA (heap + mmap anônimo) em vez de RLIMIT_AS: bibliotecas
+        # como torch reservam muito espaço virtual sem usá-lo
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _mark_pool_unavailable(reason: object) -> None:
+    global _pool_unavailable
+
+    # uma vez por processo: a partir daqui tudo vai em sequência
+    if not _pool_unavailable:
+        logger.warning(
+            f"[Extraction] Pool de processos indisponível ({reason}) — extraindo em sequência, "
+            f"com timeout mas sem limite de memória por documento"
+        )
+    _pool_unavailable = True
+
+
+def _get_pool():
+    """
+    Pool persistente por processo: os filhos mantêm o converter do Docling
+    carregado entre chamadas. Usa o pool do billiard (o mesmo do Celery) com
+    spawn: o multiprocessing da stdlib recusa filhos em processos daemônicos,
+    que é o caso dos workers prefork. Se o pool não puder ser criado, retorna None.
+    """
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        if _pool_unavailable:
+            return None
+
+        try:
+            _pool = billiard.get_context("spawn").Pool(
+                processes=EXTRACTION_WORKERS,
+                initializer=_limit_child_memory,
+                initargs=(EXTRACTION_MEMORY_MB,),
+                maxtasksperchild=EXTRACTION_MAX_TASKS_PER_CHILD,
+            )
+            _pool_pid = os.getpid()
+        except (AssertionError, OSError, ValueError) as e:
+            _mark_pool_unavailable(e)
+            _pool = None
+
+        return _pool
+
+
+def _discard_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is None:
+        return
+
+    # processos travados não respondem a cancelamento: encerra na força
+    try:
+        pool.terminate()
+        pool.join()
+    except Exception as e:
+        logger.warning(f"[Extraction] Falha ao encerrar pool de processos: {e}")
+
+
+def _extract_with_timeout(file_path: str, content_type: str | None, timeout: float) -> dict:
+    """
+    Extração no próprio processo, limitada por `timeout`. Uma thread travada
+    não pode ser interrompida: ela é abandonada (daemon) e o job segue.
+    """
+    done = threading.Event()
+    outcome: dict = {}
+
+    def _run() -> None:
+        try:
+            outcome["result"] = extract_document(file_path, content_type)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=_run, name="doc-extraction", daemon=True).start()
+    if not done.wait(timeout):
+        raise ExtractionTimeoutError(f"Extração excedeu {timeout:.0f}s: {Path(file_path).name}")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _extract_sequential(
+    items: list[tuple[str, str | None]],
+    timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+) -> list[dict | Exception]:
+    results: list[dict | Exception] = []
+    for file_path, content_type in items:
+        try:
+            results.append(_extract_with_timeout(file_path, content_type, timeout))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def extract_documents(
+    items: list[tuple[str, str | None]],
+    *,
+    timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+) -> list[dict | Exception]:
+    """
+    Extrai vários documentos em paralelo, com timeout e limite de memória por
+    documento. O resultado mantém a ordem de `items`; documentos que falham
+    (erro, timeout, MemoryError, filho morto) aparecem como a exceção
+    correspondente.
+    """
+    if len(items) <= 1 or EXTRACTION_WORKERS <= 1:
+        return _extract_sequential(items, timeout)
+
+    results: list[dict | Exception | None] = [None] * len(items)
+    pending = deque(range(len(items)))
+
+    while pending:
+        pool = _get_pool()
+        if pool is None:
+            for index, result in zip(pending, _extract_sequential([items[i] for i in pending], timeout)):
+                results[index] = result
+            break
+
+        running: dict = {}
+        restart = False
+
+        try:
+            while (pending or running) and not restart:
+                while pending and len(running) < EXTRACTION_WORKERS:
+                    index = pending.popleft()
+                    running[index] = (pool.apply_async(extract_document, items[index]), time.monotonic())
+
+                time.sleep(_POLL_SECONDS)
+
+                now = time.monotonic()
+                for index, (async_result, started) in list(running.items()):
+                    if async_result.ready():
+                        running.pop(index)
+                        try:
+                            results[index] = async_result.get()
+                        except Exception as e:
+                            # inclui WorkerLostError (OOM/segfault): o billiard repõe o filho
+                            results[index] = e
+                    elif now - started > timeout:
+                        running.pop(index)
+                        results[index] = ExtractionTimeoutError(
+                            f"Extração excedeu {timeout:.0f}s: {Path(items[index][0]).name}"
+                        )
+                        restart = True
+
+        finally:
+            if restart or running:
+                # os demais documentos em andamento voltam para a fila
+                for index in running:
+                    if results[index] is None:
+                        pending.appendleft(index)
+                _discard_pool()
+
+    return results
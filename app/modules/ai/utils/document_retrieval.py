@@ -0,0 +1,158 @@
+"""
+Recuperação local de trechos relevantes dos documentos da tela.
+
+Em vez de truncar cada documento, o texto é dividido em chunks (semchunk) e
+ranqueado por BM25 contra a descrição do alvo; os melhores trechos entram no
+prompt até o orçamento de tokens. O índice é montado em memória, por chamada.
+"""
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import semchunk
+
+from app.modules.ai.utils.token_budget import count_tokens
+
+DOCUMENTS_TOKEN_BUDGET = int(os.getenv("DOCUMENTS_TOKEN_BUDGET", "6000"))
+DOCUMENTS_CHUNK_TOKENS = int(os.getenv("DOCUMENTS_CHUNK_TOKENS", "200"))
+DOCUMENTS_TOP_K = int(os.getenv("DOCUMENTS_TOP_K", "30"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_STOPWORDS = frozenset({
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "é", "em", "no", "na", "nos", "nas",
+    "um", "uma", "uns", "umas", "para", "por", "com", "sem", "que", "se", "ao", "aos", "à", "às",
+    "ou", "como", "mais", "mas", "ser", "são", "foi", "seu", "sua", "pelo", "pela", "the", "and",
+    "of", "to", "in", "is", "for", "on", "with", "be", "or", "an", "it", "this", "that",
+})
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class Chunk:
+    doc_index: int
+    position: int
+    text: str
+    tokens: int
+
+
+def chunk_documents(texts: list[str], chunk_tokens: int = DOCUMENTS_CHUNK_TOKENS) -> list[Chunk]:
+    chunks: list[Chunk] = []
+    for doc_index, text in enumerate(texts):
+        if not text:
+            continue
+        for position, piece in enumerate(semchunk.chunk(text, chunk_tokens, count_tokens)):
+            piece = piece.strip()
+            if piece:
+                chunks.append(Chunk(doc_index, position, piece, count_tokens(piece)))
+    return chunks
+
+
+class BM25Index:
+    """
+    BM25 vetorizado em NumPy. As ocorrências ficam em formato COO (linha,
+    termo); no score só as colunas dos termos da consulta são materializadas,
+    então a memória não cresce com o vocabulário inteiro.
+    """
+
+    def __init__(self, documents: list[list[str]]):
+        self.vocab: dict[str, int] = {}
+        rows, cols = [], []
+
+        for row, terms in enumerate(documents):
+            for term in terms:
+                rows.append(row)
+                cols.append(self.vocab.setdefault(term, len(self.vocab)))
+
+        self.n_docs = len(documents)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+
+        self.doc_len = np.bincount(self.rows, minlength=self.n_docs).astype(np.float32)
+        self.avg_len = float(self.doc_len.mean()) if self.n_docs and self.doc_len.any() else 1.0
+
+        # df: número de chunks distintos em que cada termo aparece
+        pairs = np.unique(self.rows * max(1, len(self.vocab)) + self.cols)
+        df = np.bincount(pairs % max(1, len(self.vocab)), minlength=len(self.vocab)).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, query_terms: list[str]) -> np.ndarray:
+        query_cols = np.array(sorted({self.vocab[t] for t in query_terms if t in self.vocab}), dtype=np.int64)
+        if query_cols.size == 0:
+            return np.zeros(self.n_docs, dtype=np.float32)
+
+        mask = np.isin(self.cols, query_cols)
+        tf = np.zeros((self.n_docs, query_cols.size), dtype=np.float32)
+        np.add.at(tf, (self.rows[mask], np.searchsorted(query_cols, self.cols[mask])), 1.0)
+
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * (self.doc_len / self.avg_len))
+        weights = tf * (BM25_K1 + 1.0) / (tf + norm[:, None])
+        return weights @ self.idf[query_cols]
+
+
+def select_chunks(
+    texts: list[str],
+    query: str,
+    *,
+    token_budget: int = DOCUMENTS_TOKEN_BUDGET,
+    top_k: int = DOCUMENTS_TOP_K,
+    chunk_tokens: int = DOCUMENTS_CHUNK_TOKENS,
+) -> dict[int, list[Chunk]]:
+    """
+    Retorna, por índice de documento, os chunks escolhidos (na ordem original
+    do documento). Com consulta, só entram chunks com score BM25 > 0, do mais
+    relevante para o menos, até top_k/orçamento. Sem sinal de relevância
+    (consulta vazia ou sem termos em comum), cai para os primeiros chunks de
+    cada documento, alternando entre eles, até o orçamento.
+    """
+    chunks = chunk_documents(texts, chunk_tokens)
+    if not chunks:
+        return {}
+
+    scores = BM25Index([tokenize(c.text) for c in chunks]).score(tokenize(query or ""))
+
+    if float(scores.max()) > 0:
+        # só entram trechos com algum termo da consulta
+        order = [i for i in np.argsort(-scores, kind="stable") if scores[i] > 0]
+    else:
+        # round-robin pela posição: começo de cada documento primeiro
+        order = sorted(range(len(chunks)), key=lambda i: (chunks[i].position, chunks[i].doc_index))
+
+    selected: list[Chunk] = []
+    used = 0
+    for i in order:
+        chunk = chunks[int(i)]
+        if len(selected) >= top_k:
+            break
+        if used + chunk.tokens > token_budget:
+            continue
+        selected.append(chunk)
+        used += chunk.tokens
+
+    by_doc: dict[int, list[Chunk]] = {}
+    for chunk in sorted(selected, key=lambda c: (c.doc_index, c.position)):
+        by_doc.setdefault(chunk.doc_index, []).append(chunk)
+    return by_doc
+
+
+def join_chunks(chunks: list[Chunk]) -> str:
+    """Junta os trechos marcando lacunas entre chunks não contíguos."""
+    parts: list[str] = []
+    previous = None
+    for chunk in chunks:
+        if previous is not None and chunk.position != previous + 1:
+            parts.append("[...]")
+        elif previous is None and chunk.position > 0:
+            parts.append("[...]")
+        parts.append(chunk.text)
+        previous = chunk.position
+    return "\n\n".join(parts)
@@ -0,0 +1,177 @@
+"""
+Extração tolerante de JSON em respostas de LLM.
+
+As respostas chegam com lixo em volta ("Final Result:", cercas ```json,
+texto depois do objeto), newlines/tabs literais dentro de strings, vírgulas
+sobrando antes de } ou ], JSON escapado ({\\"a\\": 1}) ou truncado no fim.
+
+Caminho rápido: json.loads / raw_decode a partir do primeiro "{" (C puro).
+Se falhar, uma única varredura tokenizada por regex (strings inteiras e
+delimitadores, não caractere a caractere) casa os colchetes, recorta o
+primeiro objeto balanceado e repara o texto no mesmo passo.
+"""
+from __future__ import annotations
+
+import ast
+import json
+import re
+from typing import Any
+
+# string JSON (fechada ou até o fim do texto) | delimitador | trecho sem aspas/delimitadores
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)|[{}\[\]]|[^"{}\[\]]+', re.DOTALL)
+_CONTROL_RE = re.compile(r"[\n\r\t]")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+_decoder = json.JSONDecoder()
+
+
+class JsonRepairError(ValueError):
+    """Não foi possível extrair um objeto JSON do texto."""
+
+
+def _escape_controls(token: str) -> str:
+    if "\n" in token or "\r" in token or "\t" in token:
+        return _CONTROL_RE.sub(lambda m: _CONTROL_ESCAPES[m.group(0)], token)
+    return token
+
+
+def _odd_backslashes(token: str) -> bool:
+    """True se a aspa final está escapada (número ímpar de barras antes dela)."""
+    count = len(token) - 1 - len(token[:-1].rstrip("\\"))
+    return count % 2 == 1
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    if out and out[-1][:1] != '"':
+        stripped = out[-1].rstrip()
+        if stripped.endswith(","):
+            out[-1] = stripped[:-1]
+
+
+def repair_json(text: str, start: int = 0) -> tuple[str, bool]:
+    """
+    Recorta e repara o primeiro valor balanceado ({...} ou [...]) a partir de
+    `start`. Retorna (json_reparado, completo); completo=False quando o texto
+    acabou antes de fechar e os delimitadores foram fechados artificialmente.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+
+    for match in _TOKEN_RE.finditer(text, start):
+        token = match.group(0)
+        head = token[0]
+
+        if head == '"':
+            if len(token) == 1 or token[-1] != '"' or (token.endswith('\\"') and _odd_backslashes(token)):
+                # string truncada no fim do texto
+                token = token.rstrip("\\") + '"'
+            out.append(_escape_controls(token))
+        elif head in "{[":
+            stack.append(_CLOSERS[head])
+            out.append(head)
+        elif head in "}]":
+            if head not in stack:
+                continue
+            _drop_trailing_comma(out)
+            # fecha também o que ficou aberto dentro (ex.: "]" faltando antes de "}")
+            while stack and stack[-1] != head:
+                out.append(stack.pop())
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                return "".join(out), True
+        elif stack:
+            out.append(token)
+
+    _drop_trailing_comma(out)
+    if out and out[-1].rstrip().endswith(":"):
+        out.append("null")
+    out.extend(reversed(stack))
+    return "".join(out), False
+
+
+def _unescape(raw: str) -> str:
+    """Desfaz um nível de escape ({\\"a\\": 1} -> {"a": 1})."""
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw.replace('\\"', '"')
+
+
+def _last_brace(text: str) -> int:
+    end = text.rfind("}")
+    return end if end >= 0 else len(text) - 1
+
+
+def _literal(raw: str, allow_truncated: bool) -> Any:
+    evaluated = ast.literal_eval(raw)
+    if isinstance(evaluated, str):
+        return extract_json(evaluated, allow_truncated)
+    return evaluated
+
+
+def extract_json(text: str, allow_truncated: bool = False) -> Any:
+    """
+    Retorna o primeiro objeto JSON encontrado no texto, reparando as falhas
+    comuns de LLM. Com allow_truncated, um objeto cortado no fim do texto é
+    fechado e aceito; sem ele, resposta truncada é erro (o chamador refaz).
+    Levanta JsonRepairError se não houver objeto recuperável.
+    """
+    if not text or not text.strip():
+        raise JsonRepairError("texto vazio")
+
+    start = text.find("{")
+    if start < 0:
+        raise JsonRepairError("nenhum objeto JSON no texto")
+
+    # 1) objeto válido, com ou sem lixo depois (C puro)
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except ValueError:
+        pass
+
+    # o primeiro caractere depois do "{" já indica JSON escapado ou literal Python
+    lead = text[start + 1:start + 64].lstrip()[:1]
+    if lead == "\\":
+        text, start = _unescape(text[start:]), 0
+    elif lead == "'":
+        try:
+            return _literal(text[start:_last_brace(text) + 1], allow_truncated)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+
+    # 2) uma varredura: recorte balanceado + reparo
+    candidate, complete = repair_json(text, start)
+    if complete or allow_truncated:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+
+    # 3) JSON escapado dentro de string/log (se ainda não foi desfeito acima)
+    if lead != "\\" and '\\"' in candidate:
+        unescaped, unescaped_complete = repair_json(_unescape(text[start:]))
+        if unescaped_complete or allow_truncated:
+            try:
+                return json.loads(unescaped)
+            except ValueError:
+                pass
+
+    # 4) literal Python (aspas simples, True/None) — raro e caro, fica por último
+    if complete or allow_truncated:
+        try:
+            return _literal(candidate, allow_truncated)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+
+    if not complete:
+        raise JsonRepairError(f"JSON truncado (termina sem fechar): ...{text[-200:]}")
+    raise JsonRepairError(f"JSON irrecuperável: {candidate[:200]}")
+
+
+def extract_json_object(text: str, allow_truncated: bool = False) -> dict:
+    obj = extract_json(text, allow_truncated)
+    if not isinstance(obj, dict):
+        raise JsonRepairError(f"esperado objeto JSON, veio {type(obj).__name__}")
+    return obj
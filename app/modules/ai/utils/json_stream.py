@@ -0,0 +1,108 @@
+"""
+Parser incremental de arrays JSON vindos de uma resposta em streaming.
+
+Recebe o texto em pedaços (feed) e devolve cada elemento objeto do array
+alvo assim que ele fecha, sem esperar o JSON inteiro. O array alvo é o da
+raiz ou o valor de uma das chaves informadas no objeto raiz
+(ex.: {"items": [ {...}, {...} ]}).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Iterable
+
+from app.modules.ai.utils.json_repair import JsonRepairError, extract_json
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayItemStream:
+    def __init__(self, keys: Iterable[str] = ("items", "test_cases", "data")):
+        self.keys = set(keys)
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._array_depth: int | None = None
+        self._item_start: int | None = None
+        self.done = False
+        self.skipped = 0
+
+    def feed(self, text: str) -> list[Any]:
+        """Acrescenta texto e retorna os objetos do array que completaram."""
+        if self.done or not text:
+            return []
+
+        self._buf += text
+        items: list[Any] = []
+        buf = self._buf
+        i = self._pos
+
+        while i < len(buf):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = buf[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._array_depth is None
+                    and (self._depth == 0 or (self._depth == 1 and self._last_key in self.keys))
+                ):
+                    self._array_depth = self._depth + 1
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._item_start = i
+                self._depth += 1
+
+            elif ch in "}]":
+                self._depth -= 1
+                if self._array_depth is not None:
+                    if ch == "}" and self._depth == self._array_depth and self._item_start is not None:
+                        raw = buf[self._item_start:i + 1]
+                        self._item_start = None
+                        try:
+                            items.append(json.loads(raw))
+                        except ValueError:
+                            # newline literal, vírgula sobrando etc.
+                            try:
+                                items.append(extract_json(raw))
+                            except JsonRepairError as e:
+                                self.skipped += 1
+                                logger.warning(f"[JsonStream] Elemento ignorado (JSON inválido): {e}")
+                    elif ch == "]" and self._depth == self._array_depth - 1:
+                        self.done = True
+                        i += 1
+                        break
+
+            i += 1
+
+        # descarta o que já foi consumido, exceto o elemento em aberto
+        keep_from = self._item_start if self._item_start is not None else i
+        if self._in_string and self._string_start < keep_from:
+            keep_from = self._string_start
+        self._buf = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._item_start is not None:
+            self._item_start -= keep_from
+        if self._in_string:
+            self._string_start -= keep_from
+
+        return items
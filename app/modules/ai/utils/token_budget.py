@@ -0,0 +1,201 @@
+"""
+Contabilidade de tokens dos prompts.
+
+Cada builder do AiUtils declara as seções variáveis do prompt (descrições,
+documentos, contexto) com uma prioridade. O TokenBudget mede o template e as
+seções com o tokenizer (biblioteca `tokenizers`) e, se o total passar do
+orçamento do modelo, corta primeiro as seções de menor prioridade, até o
+mínimo de cada uma. O detalhamento fica em `breakdown` para log por job.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# tokenizer.json local (preferido) ou id no Hugging Face Hub
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", "")
+TOKENIZER_NAME = os.getenv("TOKENIZER_NAME", "Xenova/gpt-4o")
+
+# Orçamento de entrada por modelo; PROMPT_TOKEN_BUDGET vale para os demais
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "24000"))
+PROMPT_TOKEN_BUDGETS = {
+    "gpt-4.1-mini": 32000,
+    "gpt-4.1": 32000,
+    "gpt-4o-mini": 24000,
+    "gpt-4o": 24000,
+}
+
+TRIM_MARKER = "\n[...trecho omitido por limite de tokens...]"
+
+_tokenizer = None
+_tokenizer_failed = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """
+    Tokenizer compartilhado pelo processo, carregado sob demanda. Se a
+    biblioteca ou o arquivo não estiverem disponíveis, retorna None e a
+    contagem cai para a estimativa por caracteres.
+    """
+    global _tokenizer, _tokenizer_failed
+
+    if _tokenizer is not None or _tokenizer_failed:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_failed:
+            try:
+                from tokenizers import Tokenizer
+
+                if TOKENIZER_PATH:
+                    _tokenizer = Tokenizer.from_file(TOKENIZER_PATH)
+                else:
+                    _tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+            except Exception as e:
+                _tokenizer_failed = True
+                logger.warning(f"[TokenBudget] Tokenizer indisponível ({e}) — usando estimativa de ~4 caracteres/token")
+
+    return _tokenizer
+
+
+def approx_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token)."""
+    return math.ceil(len(text) / 4)
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return approx_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Corta o texto em até max_tokens (incluindo o marcador), preferindo
+    terminar numa quebra de parágrafo/linha próxima do limite.
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    keep = max(0, max_tokens - count_tokens(TRIM_MARKER))
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        cut = keep * 4
+    else:
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        cut = offsets[keep - 1][1] if keep else 0
+
+    head = text[:cut]
+    for separator in ("\n\n", "\n", ". "):
+        boundary = head.rfind(separator)
+        if boundary >= cut * 0.8:
+            head = head[:boundary]
+            break
+
+    return head.rstrip() + TRIM_MARKER if head.strip() else ""
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    # maior prioridade = cortada por último
+    priority: int = 50
+    # abaixo disso a seção não é cortada (0 permite remover inteira)
+    min_tokens: int = 0
+    trimmable: bool = True
+
+
+class TokenBudget:
+    def __init__(self, model: str | None = None, max_tokens: int | None = None, job: str | None = None):
+        self.model = model
+        self.job = job
+        self.max_tokens = max_tokens or PROMPT_TOKEN_BUDGETS.get(model or "", PROMPT_TOKEN_BUDGET)
+        self.breakdown: list[dict] = []
+
+    def fit(self, sections: list[PromptSection], reserved: int = 0) -> dict[str, str]:
+        """
+        Ajusta as seções para caber em max_tokens - reserved. Retorna o texto
+        final de cada seção e registra o detalhamento.
+        """
+        tokens = {s.name: count_tokens(s.text) for s in sections}
+        texts = {s.name: s.text for s in sections}
+        excess = reserved + sum(tokens.values()) - self.max_tokens
+
+        for section in sorted(sections, key=lambda s: s.priority):
+            if excess <= 0:
+                break
+            if not section.trimmable:
+                continue
+
+            current = tokens[section.name]
+            target = max(section.min_tokens, current - excess)
+            if target >= current:
+                continue
+
+            texts[section.name] = truncate_tokens(section.text, target)
+            tokens[section.name] = count_tokens(texts[section.name])
+            excess -= current - tokens[section.name]
+
+        self.breakdown.append({
+            "template": reserved,
+            "sections": {
+                s.name: {
+                    "tokens": tokens[s.name],
+                    "original": count_tokens(s.text),
+                    "priority": s.priority,
+                }
+                for s in sections
+            },
+            "total": reserved + sum(tokens.values()),
+            "budget": self.max_tokens,
+            "over_budget": excess > 0,
+        })
+        return texts
+
+    def render(self, template: Callable[..., str], sections: list[PromptSection]) -> str:
+        """
+        Monta o prompt com `template(**seções)`. O custo fixo do template é
+        medido na primeira renderização; só renderiza de novo se precisar
+        cortar alguma seção.
+        """
+        full = template(**{s.name: s.text for s in sections})
+        total = count_tokens(full)
+        template_tokens = max(0, total - sum(count_tokens(s.text) for s in sections))
+
+        if total <= self.max_tokens:
+            self.fit(sections, reserved=template_tokens)
+            return full
+
+        return template(**self.fit(sections, reserved=template_tokens))
+
+    def log(self, **extra) -> None:
+        for entry in self.breakdown:
+            sections = ", ".join(
+                f"{name}={info['tokens']}"
+                + (f"/{info['original']}" if info["tokens"] != info["original"] else "")
+                for name, info in entry["sections"].items()
+            )
+            context = " | ".join(f"{k}={v}" for k, v in extra.items())
+            logger.info(
+                f"[TokenBudget] job={self.job or '-'} | model={self.model or '-'} | "
+                f"total={entry['total']}/{entry['budget']} | template={entry['template']} | {sections}"
+                + (f" | {context}" if context else "")
+            )
+            if entry["over_budget"]:
+                logger.warning(
+                    f"[TokenBudget] Prompt acima do orçamento mesmo após cortes | job={self.job or '-'} | "
+                    f"total={entry['total']}/{entry['budget']}"
+                )
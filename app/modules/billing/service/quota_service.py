@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.billing.model.billing_account_model import BillingAccount
+from app.modules.plans.model.plan_model import Plan
+
+
+BILLING_CYCLE = timedelta(days=30)
+
+
+class QuotaService:
+    """
+    Consumo de análises da billing account.
+
+    O consumo é feito num único UPDATE condicional com RETURNING: a checagem
+    do limite, a virada de ciclo e o incremento acontecem no banco, sob o lock
+    de linha do próprio UPDATE. Criações concorrentes para a mesma conta não
+    perdem incrementos e não passam do limite.
+    """
+
+    def _billing_filter(self, user_id: int, owner_type: str, owner_id: int | None):
+        if owner_type == "organization" and owner_id:
+            return (
+                BillingAccount.organization_id == owner_id,
+                BillingAccount.is_active == True,
+            )
+        return (
+            BillingAccount.owner_user_id == user_id,
+            BillingAccount.is_active == True,
+        )
+
+    async def consume(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        owner_type: str = "user",
+        owner_id: int | None = None,
+        amount: int = 1,
+    ) -> dict:
+        billing_filter = self._billing_filter(user_id, owner_type, owner_id)
+        now = datetime.utcnow()
+
+        plan_limit = (
+            select(Plan.analyses_per_month)
+            .where(Plan.id == BillingAccount.plan_id)
+            .scalar_subquery()
+        )
+        used = func.coalesce(BillingAccount.analyses_used_current_cycle, 0)
+        allowance = plan_limit + func.coalesce(BillingAccount.extra_credits, 0)
+        rollover = and_(
+            BillingAccount.current_period_end.isnot(None),
+            BillingAccount.current_period_end < now,
+        )
+
+        stmt = (
+            update(BillingAccount)
+            .where(
+                *billing_filter,
+                BillingAccount.subscription_status == "active",
+                or_(
+                    and_(rollover, allowance >= amount),
+                    used + amount <= allowance,
+                ),
+            )
+            .values(
+                analyses_used_current_cycle=case((rollover, amount), else_=used + amount),
+                current_period_start=case((rollover, now), else_=BillingAccount.current_period_start),
+                current_period_end=case((rollover, now + BILLING_CYCLE), else_=BillingAccount.current_period_end),
+            )
+            .returning(
+                BillingAccount.id,
+                BillingAccount.analyses_used_current_cycle,
+                BillingAccount.current_period_end,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        row = (await db.execute(stmt)).first()
+        if row:
+            return {
+                "billing_account_id": row.id,
+                "analyses_used_current_cycle": row.analyses_used_current_cycle,
+                "current_period_end": row.current_period_end,
+            }
+
+        # Nenhuma linha atualizada: só aqui vale a pena descobrir o motivo
+        await self._raise_rejection(db, billing_filter, owner_type)
+
+    async def _raise_rejection(self, db: AsyncSession, billing_filter, owner_type: str):
+        result = await db.execute(
+            select(BillingAccount.subscription_status).where(*billing_filter).limit(1)
+        )
+        row = result.first()
+
+        if not row:
+            owner_label = "Organização" if owner_type == "organization" else "Usuário"
+            raise ValueError(f"{owner_label} sem billing account ativa")
+
+        if row.subscription_status != "active":
+            raise ValueError("Assinatura inativa")
+
+        raise ValueError("Limite mensal de análises atingido")
@@ -1,124 +1,72 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.shared.controller import BaseController
-from app.modules.documentation.model.documentation_model import Documentation
+from app.modules.documentation.service.documentation_service import UNFINISHED_STATUSES, DocumentationService
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sse_starlette.sse import EventSourceResponse
 import io
+import json
 from app.modules.export.service.pdf_service import PDFService
 
 
 class DocumentationsController(BaseController):
 
+    def __init__(self):
+        self.service = DocumentationService()
+
     # ============================
     # GETs
     # ============================
 
-    def get_by_screen(self, db: Session, screen_id: int):
-        docs = (
-            db.query(Documentation)
-            .filter(Documentation.screen_id == screen_id)
-            .order_by(Documentation.version.desc())
-            .all()
-        )
-
+    async def get_by_screen(self, db: AsyncSession, screen_id: int):
         return {
             "status": True,
-            "data": [
-                {
-                    "id": d.id,
-                    "screen_id": d.screen_id,
-                    "title": d.title,
-                    "version": d.version,
-                    "status": d.status,
-                    "content_format": d.content_format,
-                    "generated_by": d.generated_by,
-                    "generator_model": d.generator_model,
-                    "created_at": d.created_at,
-                }
-                for d in docs
-            ],
+            "data": await self.service.list_by_screen(db, screen_id),
         }
 
-    def get_latest_by_screen(self, db: Session, screen_id: int):
-        doc = (
-            db.query(Documentation)
-            .filter(Documentation.screen_id == screen_id)
-            .order_by(Documentation.version.desc())
-            .first()
-        )
+    async def get_latest_by_screen(self, db: AsyncSession, screen_id: int):
+        doc = await self.service.get_latest_by_screen(db, screen_id)
 
         if not doc:
             return None
 
         return {
             "status": True,
-            "data": {
-                "id": doc.id,
-                "screen_id": doc.screen_id,
-                "title": doc.title,
-                "version": doc.version,
-                "status": doc.status,
-                "content": doc.content,
-                "content_format": doc.content_format,
-                "generated_by": doc.generated_by,
-                "generator_model": doc.generator_model,
-                "created_at": doc.created_at,
-            },
+            "data": doc,
         }
 
+    async def stream_by_screen(self, screen_id: int):
+        async def _events():
+            async for event in self.service.stream_by_screen(screen_id):
+                yield {
+                    "event": event["event"],
+                    "data": json.dumps(event["data"], ensure_ascii=False, default=str),
+                }
+
+        return EventSourceResponse(_events(), ping=15)
+
     # ============================
     # PUT – atualizar documentação
     # ============================
 
-    def update(self, db: Session, documentation_id: int, payload: dict):
-        documentation = (
-            db.query(Documentation)
-            .filter(Documentation.id == documentation_id)
-            .first()
-        )
-
-        if not documentation:
+    async def update(self, db: AsyncSession, documentation_id: int, payload: dict):
+        try:
+            data = await self.service.update(db, documentation_id, payload)
+        except ValueError as e:
             return {
                 "status": False,
-                "message": "Documentação não encontrada",
+                "message": str(e),
             }
 
-        editable_fields = [
-            "title",
-            "content",
-            "status",
-            "content_format",
-        ]
-
-        for field in editable_fields:
-            if field in payload:
-                setattr(documentation, field, payload[field])
-
-        documentation.version += 1
-        documentation.generated_by = "user"
-
-        db.commit()
-        db.refresh(documentation)
-
         return {
             "status": True,
             "message": "Documentação atualizada com sucesso",
-            "data": {
-                "id": documentation.id,
-                "screen_id": documentation.screen_id,
-                "version": documentation.version,
-                "status": documentation.status,
-                "content": documentation.content,
-            },
+            "data": data,
         }
 
-    def export(self, db: Session, documentation_id: int):
-        documentation = (
-            db.query(Documentation)
-            .filter(Documentation.id == documentation_id)
-            .first()
-        )
+    async def export(self, db: AsyncSession, documentation_id: int):
+        documentation = await self.service.get(db, documentation_id)
 
         if not documentation:
             return {
@@ -126,8 +74,16 @@ class DocumentationsController(BaseController):
                 "message": "Documentação não encontrada",
             }
 
+        if documentation.status in UNFINISHED_STATUSES:
+            return {
+                "status": False,
+                "message": "Documentação ainda não concluída",
+            }
+
+        # weasyprint é CPU-bound — roda fora do event loop
         pdf_service = PDFService()
-        pdf_bytes = pdf_service.generate_pdf(
+        pdf_bytes = await run_in_threadpool(
+            pdf_service.generate_pdf,
             content=documentation.content,
             format_type="md",
         )
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.sync_db import SessionLocal
+from app.core.database.async_db import get_db
 from app.modules.documentation.controller.documentations_controller import (
     DocumentationsController,
 )
@@ -14,32 +14,24 @@ router = APIRouter(
 controller = DocumentationsController()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ============================
 # GETs por tela (Screen)
 # ============================
 
 @router.get("/screen/{screen_id}")
-def list_by_screen(
+async def list_by_screen(
     screen_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    return controller.get_by_screen(db, screen_id)
+    return await controller.get_by_screen(db, screen_id)
 
 
 @router.get("/screen/{screen_id}/latest")
-def get_latest(
+async def get_latest(
     screen_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    doc = controller.get_latest_by_screen(db, screen_id)
+    doc = await controller.get_latest_by_screen(db, screen_id)
 
     if not doc:
         raise HTTPException(
@@ -50,17 +42,23 @@ def get_latest(
     return doc
 
 
+@router.get("/screen/{screen_id}/stream")
+async def stream_by_screen(screen_id: int):
+    """SSE com o conteúdo parcial da documentação enquanto é gerada."""
+    return await controller.stream_by_screen(screen_id)
+
+
 # ============================
 # PUT – update manual
 # ============================
 
 @router.put("/{documentation_id}")
-def update_documentation(
+async def update_documentation(
     documentation_id: int,
     payload: dict = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    result = controller.update(db, documentation_id, payload)
+    result = await controller.update(db, documentation_id, payload)
 
     if not result["status"]:
         raise HTTPException(
@@ -76,8 +74,8 @@ def update_documentation(
 # ============================
 
 @router.get("/export/{documentation_id}")
-def export_documentation(
+async def export_documentation(
     documentation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    return controller.export(db, documentation_id)
+    return await controller.export(db, documentation_id)
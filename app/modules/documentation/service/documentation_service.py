@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database.async_db import AsyncSessionLocal
+from app.modules.documentation.model.documentation_model import Documentation
+from app.modules.screen.model.screen_job_model import ScreenJob
+
+DOCS_SSE_POLL_SECONDS = float(os.getenv("DOCS_SSE_POLL_SECONDS", "0.5"))
+DOCS_SSE_MAX_SECONDS = float(os.getenv("DOCS_SSE_MAX_SECONDS", "900"))
+
+
+# Rascunhos do stream (em andamento ou interrompidos) não são servidos nem exportados
+UNFINISHED_STATUSES = ("generating", "failed")
+
+
+EDITABLE_FIELDS = [
+    "title",
+    "content",
+    "status",
+    "content_format",
+]
+
+
+class DocumentationService:
+
+    def _serialize_summary(self, d: Documentation) -> Dict[str, Any]:
+        return {
+            "id": d.id,
+            "screen_id": d.screen_id,
+            "title": d.title,
+            "version": d.version,
+            "status": d.status,
+            "content_format": d.content_format,
+            "generated_by": d.generated_by,
+            "generator_model": d.generator_model,
+            "created_at": d.created_at,
+        }
+
+    async def list_by_screen(self, db: AsyncSession, screen_id: int) -> List[Dict[str, Any]]:
+        result = await db.execute(
+            select(Documentation)
+            .where(
+                Documentation.screen_id == screen_id,
+                Documentation.status.notin_(UNFINISHED_STATUSES),
+            )
+            .order_by(Documentation.version.desc())
+        )
+        return [self._serialize_summary(d) for d in result.scalars().all()]
+
+    async def get_latest_by_screen(self, db: AsyncSession, screen_id: int) -> Optional[Dict[str, Any]]:
+        """Última versão concluída; rascunhos do stream ficam só no SSE."""
+        result = await db.execute(
+            select(Documentation)
+            .where(
+                Documentation.screen_id == screen_id,
+                Documentation.status.notin_(UNFINISHED_STATUSES),
+            )
+            .order_by(Documentation.version.desc())
+            .limit(1)
+        )
+        doc = result.scalar_one_or_none()
+
+        if not doc:
+            return None
+
+        return {
+            **self._serialize_summary(doc),
+            "content": doc.content,
+        }
+
+    async def get(self, db: AsyncSession, documentation_id: int) -> Optional[Documentation]:
+        result = await db.execute(
+            select(Documentation).where(Documentation.id == documentation_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def _poll_latest(self, db: AsyncSession, screen_id: int, offset: int) -> tuple:
+        # só o trecho novo do content trafega a cada consulta
+        doc_result = await db.execute(
+            select(
+                Documentation.id,
+                Documentation.version,
+                Documentation.title,
+                Documentation.status,
+                Documentation.error_message,
+                func.length(Documentation.content).label("length"),
+                func.substr(Documentation.content, offset + 1).label("delta"),
+            )
+            .where(Documentation.screen_id == screen_id)
+            .order_by(Documentation.version.desc())
+            .limit(1)
+        )
+        job_result = await db.execute(
+            select(ScreenJob.status, ScreenJob.error_message).where(
+                ScreenJob.screen_id == screen_id,
+                ScreenJob.job_type == "documentation",
+            )
+        )
+        return doc_result.first(), job_result.first()
+
+    async def stream_by_screen(self, screen_id: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Acompanha a geração da documentação da tela, lendo o rascunho
+        (status "generating") que o job vai preenchendo em lotes.
+
+        Eventos: "start" (novo rascunho), "content" (texto novo desde o último
+        evento) e "done" (conteúdo final e status). Cada consulta usa uma
+        sessão curta, para não prender conexão do pool durante o stream.
+        """
+        tracking_id = None
+        offset = 0
+        deadline = time.monotonic() + DOCS_SSE_MAX_SECONDS
+
+        while time.monotonic() < deadline:
+            async with AsyncSessionLocal() as db:
+                doc, job = await self._poll_latest(db, screen_id, offset if tracking_id else 0)
+
+            if doc is not None and doc.id != tracking_id and doc.status == "generating":
+                tracking_id, offset = doc.id, 0
+                yield {
+                    "event": "start",
+                    "data": {"id": doc.id, "version": doc.version, "title": doc.title},
+                }
+                continue
+
+            if doc is not None and doc.id == tracking_id:
+                if doc.length > offset and doc.delta:
+                    yield {"event": "content", "data": {"id": doc.id, "delta": doc.delta}}
+                    offset = doc.length
+
+                if doc.status != "generating":
+                    async with AsyncSessionLocal() as db:
+                        final = await self.get(db, doc.id)
+                    yield {
+                        "event": "done",
+                        "data": {
+                            "id": doc.id,
+                            "version": doc.version,
+                            "status": doc.status,
+                            "content": final.content if final else None,
+                            "error_message": doc.error_message,
+                        },
+                    }
+                    return
+
+            elif job is None or job.status not in ("pending", "running"):
+                # nada sendo gerado: devolve o estado atual e encerra
+                if doc is None:
+                    data = {"id": None, "status": job.status if job else "not_requested"}
+                    if job is not None:
+                        data["error_message"] = job.error_message
+                else:
+                    async with AsyncSessionLocal() as db:
+                        final = await self.get(db, doc.id)
+                    data = {
+                        "id": doc.id,
+                        "version": doc.version,
+                        "status": doc.status,
+                        "content": final.content if final else None,
+                        "error_message": doc.error_message or (job.error_message if job else None),
+                    }
+                yield {"event": "done", "data": data}
+                return
+
+            await asyncio.sleep(DOCS_SSE_POLL_SECONDS)
+
+        yield {"event": "timeout", "data": {"id": tracking_id}}
+
+    async def update(self, db: AsyncSession, documentation_id: int, payload: dict) -> Dict[str, Any]:
+        documentation = await self.get(db, documentation_id)
+
+        if not documentation:
+            raise ValueError("Documentação não encontrada")
+
+        try:
+            for field in EDITABLE_FIELDS:
+                if field in payload:
+                    setattr(documentation, field, payload[field])
+
+            documentation.version += 1
+            documentation.generated_by = "user"
+
+            await db.commit()
+            await db.refresh(documentation)
+
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(str(e))
+
+        return {
+            "id": documentation.id,
+            "screen_id": documentation.screen_id,
+            "version": documentation.version,
+            "status": documentation.status,
+            "content": documentation.content,
+        }
@@ -1,160 +1,54 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.sync_db import SessionLocal
-from app.modules.playwright.model.playwright_script_model import PlaywrightScript
+from app.modules.playwright.service.playwright_script_service import PlaywrightScriptService
 from app.shared.controller import BaseController
 
 
 class PlaywrightController(BaseController):
 
-    # =========================
-    # Serialização
-    # =========================
-
-    def _serialize(self, script: PlaywrightScript) -> Dict[str, Any]:
-        return {
-            "id": script.id,
-            "target_id": script.target_id,
-            "title": script.title,
-            "version": script.version,
-            "language": script.language,
-            "status": script.status,
-            "script": script.script,
-            "generator_model": script.generator_model,
-            "meta": script.meta,
-            "error_message": script.error_message,
-        }
+    def __init__(self):
+        self.service = PlaywrightScriptService()
 
     # =========================
     # GET
     # =========================
 
-    async def index(self, target_id: int):
-        db: Session = SessionLocal()
+    async def index(self, db: AsyncSession, target_id: int):
         try:
-            scripts: List[PlaywrightScript] = (
-                db.query(PlaywrightScript)
-                .filter(PlaywrightScript.target_id == target_id)
-                .order_by(PlaywrightScript.version.desc())
-                .all()
-            )
-
             return {
                 "status": True,
                 "message": "scripts playwright retornados com sucesso",
-                "data": [self._serialize(s) for s in scripts],
+                "data": await self.service.list_by_target(db, target_id),
             }
-
-        except Exception as e:
-            return {
-                "status": False,
-                "message": f"erro ao buscar scripts: {e}",
-                "data": None,
-            }
-        finally:
-            db.close()
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
     # =========================
     # POST (create)
     # =========================
 
-    async def store(self, target_id: int, payload: Dict[str, Any]):
-        db: Session = SessionLocal()
+    async def store(self, db: AsyncSession, target_id: int, payload: Dict[str, Any]):
         try:
-            script_code = payload.get("script")
-            if not script_code:
-                return {
-                    "status": False,
-                    "message": "script é obrigatório",
-                    "data": None,
-                }
-
-            last_version = (
-                db.query(func.max(PlaywrightScript.version))
-                .filter(PlaywrightScript.target_id == target_id)
-                .scalar()
-            ) or 0
-
-            script = PlaywrightScript(
-                target_id=target_id,
-                title=payload.get("title", "Playwright Script"),
-                language=payload.get("language", "typescript"),
-                script=script_code,
-                version=last_version + 1,
-                generator_model=payload.get("generator_model"),
-                meta=payload.get("meta"),
-                status="generated",
-            )
-
-            db.add(script)
-            db.commit()
-            db.refresh(script)
-
             return {
                 "status": True,
                 "message": "script playwright criado com sucesso",
-                "data": self._serialize(script),
+                "data": await self.service.create(db, target_id, payload),
             }
-
-        except Exception as e:
-            db.rollback()
-            return {
-                "status": False,
-                "message": f"erro ao criar script: {e}",
-                "data": None,
-            }
-        finally:
-            db.close()
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
     # =========================
     # PUT (update)
     # =========================
 
-    async def update(self, target_id: int, version: int, payload: Dict[str, Any]):
-        db: Session = SessionLocal()
+    async def update(self, db: AsyncSession, target_id: int, version: int, payload: Dict[str, Any]):
         try:
-            script: Optional[PlaywrightScript] = (
-                db.query(PlaywrightScript)
-                .filter(
-                    PlaywrightScript.target_id == target_id,
-                    PlaywrightScript.version == version,
-                )
-                .first()
-            )
-
-            if not script:
-                return {
-                    "status": False,
-                    "message": "script não encontrado",
-                    "data": None,
-                }
-
-            updatable_fields = [
-                "title", "language", "status", "script", "generator_model", "error_message", "meta",
-            ]
-
-            for f in updatable_fields:
-                if f in payload:
-                    setattr(script, f, payload.get(f))
-
-            db.commit()
-            db.refresh(script)
-
             return {
                 "status": True,
                 "message": "script playwright atualizado com sucesso",
-                "data": self._serialize(script),
-            }
-
-        except Exception as e:
-            db.rollback()
-            return {
-                "status": False,
-                "message": f"erro ao atualizar script: {e}",
-                "data": None,
+                "data": await self.service.update(db, target_id, version, payload),
             }
-        finally:
-            db.close()
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
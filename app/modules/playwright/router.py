@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
+from app.core.database.async_db import get_db
 from app.modules.playwright.controller.playwright_controller import PlaywrightController
 from app.modules.playwright.schemas.playwright_scripts_schema import (
     PlaywrightScriptCreate,
@@ -19,8 +20,8 @@ controller = PlaywrightController()
     "/target/{target_id}",
     response_model=dict,
 )
-async def get_scripts_by_target(target_id: int):
-    return await controller.index(target_id)
+async def get_scripts_by_target(target_id: int, db=Depends(get_db)):
+    return await controller.index(db, target_id)
 
 
 @router.post(
@@ -30,6 +31,7 @@ async def get_scripts_by_target(target_id: int):
 async def create_script(
     target_id: int,
     payload: PlaywrightScriptCreate,
+    db=Depends(get_db),
 ):
     if payload.target_id != target_id:
         return {
@@ -38,7 +40,7 @@ async def create_script(
             "data": None,
         }
 
-    return await controller.store(target_id, payload.dict())
+    return await controller.store(db, target_id, payload.dict())
 
 
 @router.put(
@@ -49,8 +51,10 @@ async def update_script(
     target_id: int,
     version: int,
     payload: PlaywrightScriptUpdate,
+    db=Depends(get_db),
 ):
     return await controller.update(
+        db,
         target_id=target_id,
         version=version,
         payload=payload.dict(exclude_unset=True),
@@ -0,0 +1,105 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.playwright.model.playwright_script_model import PlaywrightScript
+
+
+UPDATABLE_FIELDS = [
+    "title", "language", "status", "script", "generator_model", "error_message", "meta",
+]
+
+
+class PlaywrightScriptService:
+
+    def serialize(self, script: PlaywrightScript) -> Dict[str, Any]:
+        return {
+            "id": script.id,
+            "target_id": script.target_id,
+            "title": script.title,
+            "version": script.version,
+            "language": script.language,
+            "status": script.status,
+            "script": script.script,
+            "generator_model": script.generator_model,
+            "meta": script.meta,
+            "error_message": script.error_message,
+        }
+
+    async def list_by_target(self, db: AsyncSession, target_id: int) -> List[Dict[str, Any]]:
+        try:
+            result = await db.execute(
+                select(PlaywrightScript)
+                .where(PlaywrightScript.target_id == target_id)
+                .order_by(PlaywrightScript.version.desc())
+            )
+            return [self.serialize(s) for s in result.scalars().all()]
+
+        except Exception as e:
+            raise ValueError(f"erro ao buscar scripts: {e}")
+
+    async def create(self, db: AsyncSession, target_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            script_code = payload.get("script")
+            if not script_code:
+                raise ValueError("script é obrigatório")
+
+            result = await db.execute(
+                select(func.max(PlaywrightScript.version))
+                .where(PlaywrightScript.target_id == target_id)
+            )
+            last_version = result.scalar() or 0
+
+            script = PlaywrightScript(
+                target_id=target_id,
+                title=payload.get("title", "Playwright Script"),
+                language=payload.get("language", "typescript"),
+                script=script_code,
+                version=last_version + 1,
+                generator_model=payload.get("generator_model"),
+                meta=payload.get("meta"),
+                status="generated",
+            )
+
+            db.add(script)
+            await db.commit()
+            await db.refresh(script)
+
+            return self.serialize(script)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao criar script: {e}")
+
+    async def update(self, db: AsyncSession, target_id: int, version: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            result = await db.execute(
+                select(PlaywrightScript).where(
+                    PlaywrightScript.target_id == target_id,
+                    PlaywrightScript.version == version,
+                )
+            )
+            script = result.scalar_one_or_none()
+
+            if not script:
+                raise ValueError("script não encontrado")
+
+            for f in UPDATABLE_FIELDS:
+                if f in payload:
+                    setattr(script, f, payload.get(f))
+
+            await db.commit()
+            await db.refresh(script)
+
+            return self.serialize(script)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao atualizar script: {e}")
@@ -6,8 +6,8 @@ class ScreenController:
     def __init__(self):
         self.service = ScreenService()
 
-    async def list_screens(self, db, user_id: int, owner_type: str, owner_id: int):
-        return await self.service.list_by_owner(db, user_id, owner_type, owner_id)
+    async def list_screens(self, db, user_id: int, owner_type: str, owner_id: int, **filters):
+        return await self.service.list_by_owner(db, user_id, owner_type, owner_id, **filters)
 
     async def get_screen(self, db, screen_id: int, user_id: int):
         return await self.service.get_or_fail(db, screen_id, user_id)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.orm import relationship, deferred
 from app.core.base import Base
 
 
@@ -13,4 +13,16 @@ class ScreenDocument(Base):
     type = Column(String(50), nullable=False)
     path = Column(Text, nullable=False)
 
+    # ---- Cache de extração (chaveado pelo sha256 do conteúdo do arquivo) ----
+    content_hash = Column(String(64), nullable=True, index=True)
+    extracted_text = deferred(Column(Text, nullable=True), group="extraction")
+    extracted_at = Column(DateTime, nullable=True)
+
+    # ---- Ingestão (jobs.screen.ingest_documents) ----
+    ingestion_status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    # pending | processing | completed | error
+    ingestion_error = Column(Text, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    language = Column(String(10), nullable=True)
+
     screen = relationship("Screen", back_populates="documents")
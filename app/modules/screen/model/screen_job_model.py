@@ -24,4 +24,9 @@ class ScreenJob(Base):
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
+    # uso de tokens do LLM no job (cached = prefixo servido do cache do provedor)
+    llm_prompt_tokens = Column(Integer, nullable=True)
+    llm_cached_tokens = Column(Integer, nullable=True)
+    llm_completion_tokens = Column(Integer, nullable=True)
+
     screen = relationship("Screen", back_populates="jobs")
@@ -1,11 +1,24 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import relationship, deferred
 from app.core.base import Base
 
 
 class Screen(Base):
     __tablename__ = "screens"
 
+    __table_args__ = (
+        # Listagem paginada por dono (keyset em created_at, id) — só linhas ativas
+        Index(
+            "ix_screens_owner_active_created",
+            "owner_type",
+            "owner_id",
+            "created_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_screens_owner_deleted", "owner_type", "owner_id", "deleted_at"),
+    )
+
     id = Column(Integer, primary_key=True)
 
     # ----------------------
@@ -29,8 +42,9 @@ class Screen(Base):
     screen_context = Column(Text, nullable=True)
 
     # Descrições geradas pelo BrowserUse (conhecimento da tela)
-    documentation_description = Column(Text, nullable=True)
-    uiux_description = Column(Text, nullable=True)
+    # Deferred: só carregam com undefer_group("descriptions")
+    documentation_description = deferred(Column(Text, nullable=True), group="descriptions")
+    uiux_description = deferred(Column(Text, nullable=True), group="descriptions")
 
     # draft | active | archived
     status = Column(String(50), nullable=False, default="draft")
@@ -65,7 +79,8 @@ class Screen(Base):
         "AccessCredential",
         back_populates="screen",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
 
     jobs = relationship(
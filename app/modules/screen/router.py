@@ -1,8 +1,10 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
 from typing import List
 
 from app.core.database.async_db import get_db
 from app.core.dependencies import get_current_user_id
+from app.shared.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.modules.screen.controller.screen_controller import ScreenController
 from app.modules.screen.schemas.screen_schema import ScreenUpdate
 
@@ -18,11 +20,31 @@ controller = ScreenController()
 async def list_screens(
     owner_type: str = Query("user", pattern="^(user|organization)$"),
     owner_id: int | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    status: str | None = Query(None),
+    name_prefix: str | None = Query(None, min_length=1),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
     user_id: int = Depends(get_current_user_id),
     db=Depends(get_db),
 ):
     resolved_owner_id = owner_id if owner_id is not None else user_id
-    return await controller.list_screens(db, user_id, owner_type, resolved_owner_id)
+    try:
+        return await controller.list_screens(
+            db,
+            user_id,
+            owner_type,
+            resolved_owner_id,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            name_prefix=name_prefix,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{screen_id}")
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+from datetime import datetime
+
+from sqlalchemy.orm import undefer
+
+from app.modules.screen.model.screen_document_model import ScreenDocument
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ScreenDocumentService:
+    """
+    Cache persistente do texto extraído dos documentos de tela.
+
+    O texto fica na própria linha de screen_documents, chaveado pelo sha256 do
+    conteúdo do arquivo; qualquer documento com o mesmo conteúdo reaproveita
+    a extração. Usa sessão própria para que o cache sobreviva mesmo se o job
+    que o consultou falhar depois.
+    """
+
+    @staticmethod
+    def hash_bytes(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _session(self):
+        # import tardio: a API só usa hash_bytes e não deve abrir o engine dos workers
+        from app.core.database.sync_db import SessionLocal
+        return SessionLocal()
+
+    def get_cached_text(self, content_hash: str) -> str | None:
+        db = self._session()
+        try:
+            doc = (
+                db.query(ScreenDocument)
+                .options(undefer(ScreenDocument.extracted_text))
+                .filter(
+                    ScreenDocument.content_hash == content_hash,
+                    ScreenDocument.extracted_text.isnot(None),
+                )
+                .first()
+            )
+            return doc.extracted_text if doc else None
+        except Exception as e:
+            logger.warning(f"[ScreenDocument] Falha ao consultar cache de extração: {e}")
+            return None
+        finally:
+            db.close()
+
+    def save_extraction(self, document_id: int | None, content_hash: str, text: str) -> None:
+        if not document_id:
+            return
+
+        db = self._session()
+        try:
+            db.query(ScreenDocument).filter(ScreenDocument.id == document_id).update(
+                {
+                    "content_hash": content_hash,
+                    "extracted_text": text,
+                    "extracted_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[ScreenDocument] Falha ao salvar extração do documento {document_id}: {e}")
+        finally:
+            db.close()
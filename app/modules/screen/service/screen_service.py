@@ -1,15 +1,22 @@
+import logging
 import os
 import uuid
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload, undefer_group
 
 from app.modules.screen.model.screen_model import Screen
 from app.modules.screen.model.screen_document_model import ScreenDocument
+from app.modules.screen.service.screen_document_service import ScreenDocumentService
 from app.modules.screen.model.access_credential_model import AccessCredential
 from app.modules.user.model.user_model import User
+from app.modules.ai.service.explorer_cache_service import explorer_cache
+from app.core.celery_app import celery_app
+from app.shared.pagination import DEFAULT_PAGE_SIZE, apply_listing_filters, build_page, keyset_page
+
+logger = logging.getLogger(__name__)
 
 BASE_PATH = "storage/screens"
 
@@ -22,34 +29,91 @@ ALLOWED_TYPES = {
 
 class ScreenService:
 
+    # colunas da projeção de listagem (sem textos longos nem relacionamentos)
+    _SUMMARY_COLUMNS = (
+        "id",
+        "user_id",
+        "owner_type",
+        "owner_id",
+        "name",
+        "url",
+        "description",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+
+    def _serialize_summary(self, screen: Screen) -> dict:
+        """
+        Projeção leve para listagens: só identificação e estado da tela,
+        sem descrições da IA, contexto, documentos ou credenciais.
+        """
+        return {column: getattr(screen, column) for column in self._SUMMARY_COLUMNS}
+
     def _serialize(self, screen: Screen, include_docs: bool = False) -> dict:
         data = screen.to_dict()
         data["access_credentials"] = screen.access_credentials or []
         
         if include_docs:
             data["documents"] = [
-                {"id": doc.id, "type": doc.type, "path": doc.path}
+                {
+                    "id": doc.id,
+                    "type": doc.type,
+                    "path": doc.path,
+                    "ingestion_status": doc.ingestion_status,
+                    "page_count": doc.page_count,
+                    "language": doc.language,
+                }
                 for doc in (screen.documents or [])
             ]
         return data
 
-    async def list_by_owner(self, db: AsyncSession, user_id: int, owner_type: str, owner_id: int):
+    async def _get_full(self, db: AsyncSession, screen_id: int) -> Screen:
+        result = await db.execute(
+            select(Screen)
+            .options(undefer_group("descriptions"))
+            .where(Screen.id == screen_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    async def list_by_owner(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        owner_type: str,
+        owner_id: int,
+        *,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        status: str | None = None,
+        name_prefix: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ):
         try:
-            result = await db.execute(
+            query = (
                 select(Screen)
-                .options(
-                    selectinload(Screen.documents),
-                    selectinload(Screen.access_credentials),
-                )
+                .options(load_only(*(getattr(Screen, c) for c in self._SUMMARY_COLUMNS)))
                 .where(
                     Screen.owner_type == owner_type,
                     Screen.owner_id == owner_id,
                     Screen.deleted_at.is_(None),
                 )
             )
-            screens = result.scalars().unique().all()
+            query = apply_listing_filters(
+                query,
+                Screen,
+                status=status,
+                name_prefix=name_prefix,
+                created_from=created_from,
+                created_to=created_to,
+            )
 
-            return [self._serialize(s, include_docs=True) for s in screens]
+            result = await db.execute(keyset_page(query, Screen, cursor=cursor, limit=limit))
+            screens = result.scalars().all()
+
+            return build_page(screens, [self._serialize_summary(s) for s in screens[:limit]], limit)
 
         except Exception as e:
             raise ValueError(f"Erro ao listar telas: {str(e)}")
@@ -59,6 +123,7 @@ class ScreenService:
             result = await db.execute(
                 select(Screen)
                 .options(
+                    undefer_group("descriptions"),
                     selectinload(Screen.documents),
                     selectinload(Screen.access_credentials),
                 )
@@ -84,6 +149,7 @@ class ScreenService:
         screen = (
             db.query(Screen)
             .options(
+                undefer_group("descriptions"),
                 sync_selectinload(Screen.documents),
                 sync_selectinload(Screen.access_credentials),
             )
@@ -96,6 +162,17 @@ class ScreenService:
 
         return self._serialize(screen, include_docs=True)
 
+    def _dispatch_ingestion(self, screen_id: int, document_ids: list[int]) -> None:
+        # a tela já foi salva: falha no broker não deve desfazer o cadastro,
+        # o job de casos de teste ainda extrai o texto sob demanda
+        try:
+            celery_app.send_task(
+                "jobs.screen.ingest_documents",
+                kwargs={"screen_id": screen_id, "document_ids": document_ids},
+            )
+        except Exception:
+            logger.exception("❌ Falha ao enfileirar ingestão de documentos", extra={"screen_id": screen_id})
+
     async def create_with_documents(
         self,
         db: AsyncSession,
@@ -124,10 +201,16 @@ class ScreenService:
                 filename = f"{uuid.uuid4()}{ext}"
                 path = os.path.join(folder, filename)
 
+                content = await file.read()
                 with open(path, "wb") as f:
-                    f.write(await file.read())
+                    f.write(content)
 
-                doc = ScreenDocument(screen_id=screen.id, type=file.content_type, path=path)
+                doc = ScreenDocument(
+                    screen_id=screen.id,
+                    type=file.content_type,
+                    path=path,
+                    content_hash=ScreenDocumentService.hash_bytes(content),
+                )
                 db.add(doc)
                 saved_docs.append(doc)
 
@@ -145,12 +228,20 @@ class ScreenService:
                     saved_credentials.append(credential)
 
             await db.commit()
-            await db.refresh(screen)
+            screen = await self._get_full(db, screen.id)
+
+            if saved_docs:
+                self._dispatch_ingestion(screen.id, [doc.id for doc in saved_docs])
 
             return {
                 **screen.to_dict(),
                 "documents": [
-                    {"id": doc.id, "type": doc.type, "path": doc.path}
+                    {
+                        "id": doc.id,
+                        "type": doc.type,
+                        "path": doc.path,
+                        "ingestion_status": doc.ingestion_status,
+                    }
                     for doc in saved_docs
                 ],
                 "access_credentials": [
@@ -171,7 +262,10 @@ class ScreenService:
         try:
             result = await db.execute(
                 select(Screen)
-                .options(selectinload(Screen.access_credentials))
+                .options(
+                    undefer_group("descriptions"),
+                    selectinload(Screen.access_credentials),
+                )
                 .where(Screen.id == screen_id, Screen.user_id == user_id)
             )
             screen = result.scalar_one_or_none()
@@ -197,11 +291,16 @@ class ScreenService:
                     ))
 
             await db.commit()
+            await explorer_cache.ainvalidate_screen(screen_id)
 
             result = await db.execute(
                 select(Screen)
-                .options(selectinload(Screen.access_credentials))
+                .options(
+                    undefer_group("descriptions"),
+                    selectinload(Screen.access_credentials),
+                )
                 .where(Screen.id == screen_id)
+                .execution_options(populate_existing=True)
             )
             screen = result.scalar_one()
 
@@ -227,6 +326,7 @@ class ScreenService:
 
             screen.deleted_at = datetime.utcnow()
             await db.commit()
+            await explorer_cache.ainvalidate_screen(screen_id)
 
         except Exception as e:
             await db.rollback()
@@ -247,7 +347,7 @@ class ScreenService:
 
             screen.deleted_at = None
             await db.commit()
-            await db.refresh(screen)
+            screen = await self._get_full(db, screen.id)
             return screen.to_dict()
 
         except Exception as e:
@@ -6,8 +6,8 @@ class TargetController:
     def __init__(self):
         self.service = TargetService()
 
-    async def list_targets(self, db, user_id: int, owner_type: str, owner_id: int):
-        return await self.service.list_by_owner(db, user_id, owner_type, owner_id)
+    async def list_targets(self, db, user_id: int, owner_type: str, owner_id: int, **filters):
+        return await self.service.list_by_owner(db, user_id, owner_type, owner_id, **filters)
 
     async def get_target(self, db, target_id: int, user_id: int):
         return await self.service.get_or_fail(db, target_id, user_id)
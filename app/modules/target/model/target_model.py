@@ -1,11 +1,24 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import relationship, deferred
 from app.core.base import Base
 
 
 class Target(Base):
     __tablename__ = "targets"
 
+    __table_args__ = (
+        # Listagem paginada por dono (keyset em created_at, id) — só linhas ativas
+        Index(
+            "ix_targets_owner_active_created",
+            "owner_type",
+            "owner_id",
+            "created_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_targets_owner_deleted", "owner_type", "owner_id", "deleted_at"),
+    )
+
     id = Column(Integer, primary_key=True)
 
     # ----------------------
@@ -25,8 +38,9 @@ class Target(Base):
     description = Column(Text, nullable=True)  # objetivo do QA
 
     # Descrições geradas pelo BrowserUse (contexto de execução)
-    tests_description = Column(Text, nullable=True)
-    playwright_description = Column(Text, nullable=True)
+    # Deferred: só carregam com undefer_group("descriptions")
+    tests_description = deferred(Column(Text, nullable=True), group="descriptions")
+    playwright_description = deferred(Column(Text, nullable=True), group="descriptions")
 
     # draft | generating | processing | completed | error
     status = Column(String(50), nullable=False, default="draft")
@@ -36,6 +50,8 @@ class Target(Base):
     # ----------------------
     # RELACIONAMENTOS
     # ----------------------
+    # Coleções usam lazy="raise_on_sql": precisam ser pedidas explicitamente
+    # com selectinload(), nunca carregadas como efeito colateral de select(Target)
     user = relationship("User", back_populates="targets")
 
     organization = relationship(
@@ -50,7 +66,8 @@ class Target(Base):
         "Screen",
         secondary="target_screens",
         back_populates="targets",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
 
     test_cases = relationship(
@@ -63,12 +80,14 @@ class Target(Base):
         "PlaywrightScript",
         back_populates="target",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
 
     jobs = relationship(
         "TargetJob",
         back_populates="target",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
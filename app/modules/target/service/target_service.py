@@ -2,18 +2,21 @@ from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer_group
 
 from app.modules.target.model.target_model import Target
 from app.modules.target.model.target_screens_model import TargetScreen
 from app.modules.screen.model.screen_model import Screen
 from app.modules.user.model.user_model import User
-from app.modules.billing.model.billing_account_model import BillingAccount
-from app.modules.plans.model.plan_model import Plan
+from app.modules.billing.service.quota_service import QuotaService
+from app.shared.pagination import DEFAULT_PAGE_SIZE, apply_listing_filters, build_page, keyset_page
 
 
 class TargetService:
 
+    def __init__(self):
+        self.quota = QuotaService()
+
     async def _validate_and_consume_quota(
         self,
         db: AsyncSession,
@@ -21,56 +24,30 @@ class TargetService:
         owner_type: str = "user",
         owner_id: int | None = None,
     ):
-        if owner_type == "organization" and owner_id:
-            billing_filter = (
-                BillingAccount.organization_id == owner_id,
-                BillingAccount.is_active == True,
-            )
-        else:
-            billing_filter = (
-                BillingAccount.owner_user_id == user_id,
-                BillingAccount.is_active == True,
-            )
-
-        result = await db.execute(
-            select(BillingAccount)
-            .options(selectinload(BillingAccount.plan))
-            .where(*billing_filter)
-        )
-        billing = result.scalar_one_or_none()
-
-        if not billing:
-            owner_label = "Organização" if owner_type == "organization" else "Usuário"
-            raise ValueError(f"{owner_label} sem billing account ativa")
-
-        if billing.subscription_status != "active":
-            raise ValueError("Assinatura inativa")
-
-        now = datetime.utcnow()
-        if billing.current_period_end and now > billing.current_period_end:
-            billing.analyses_used_current_cycle = 0
-            billing.current_period_start = now
-
-        plan = billing.plan
-        allowed = (
-            plan.analyses_per_month
-            + billing.extra_credits
-            - billing.analyses_used_current_cycle
-        )
-
-        if allowed <= 0:
-            raise ValueError("Limite mensal de análises atingido")
-
-        billing.analyses_used_current_cycle += 1
-        await db.flush()
+        await self.quota.consume(db, user_id, owner_type=owner_type, owner_id=owner_id)
         return True
 
-    async def list_by_owner(self, db: AsyncSession, user_id: int, owner_type: str, owner_id: int):
+    async def list_by_owner(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        owner_type: str,
+        owner_id: int,
+        *,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        status: str | None = None,
+        name_prefix: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ):
         try:
-            result = await db.execute(
+            query = (
                 select(Target)
                 .options(
-                    selectinload(Target.screens).selectinload(Screen.access_credentials),
+                    selectinload(Target.screens).load_only(
+                        Screen.id, Screen.name, Screen.url, Screen.status,
+                    ),
                 )
                 .where(
                     Target.owner_type == owner_type,
@@ -78,9 +55,19 @@ class TargetService:
                     Target.deleted_at.is_(None),
                 )
             )
+            query = apply_listing_filters(
+                query,
+                Target,
+                status=status,
+                name_prefix=name_prefix,
+                created_from=created_from,
+                created_to=created_to,
+            )
+
+            result = await db.execute(keyset_page(query, Target, cursor=cursor, limit=limit))
             targets = result.scalars().unique().all()
 
-            return [self._serialize(t) for t in targets]
+            return build_page(targets, [self._serialize_summary(t) for t in targets[:limit]], limit)
 
         except Exception as e:
             raise ValueError(f"Erro ao listar alvos: {str(e)}")
@@ -90,6 +77,8 @@ class TargetService:
             result = await db.execute(
                 select(Target)
                 .options(
+                    undefer_group("descriptions"),
+                    selectinload(Target.screens).undefer_group("descriptions"),
                     selectinload(Target.screens).selectinload(Screen.documents),
                     selectinload(Target.screens).selectinload(Screen.access_credentials),
                 )
@@ -111,6 +100,8 @@ class TargetService:
         target = (
             db.query(Target)
             .options(
+                undefer_group("descriptions"),
+                sync_selectinload(Target.screens).undefer_group("descriptions"),
                 sync_selectinload(Target.screens).selectinload(Screen.documents),
                 sync_selectinload(Target.screens).selectinload(Screen.access_credentials),
             )
@@ -123,6 +114,27 @@ class TargetService:
 
         return self._serialize(target, include_screen_docs=True)
 
+    async def _get_full(self, db: AsyncSession, target_id: int) -> Target:
+        result = await db.execute(
+            select(Target)
+            .options(undefer_group("descriptions"))
+            .where(Target.id == target_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    def _serialize_summary(self, target: Target) -> dict:
+        """
+        Projeção leve para listagens: sem descrições geradas pela IA e
+        com as telas reduzidas a identificação básica.
+        """
+        data = target.to_dict()
+        data["screens"] = [
+            {"id": s.id, "name": s.name, "url": s.url, "status": s.status}
+            for s in (target.screens or [])
+        ]
+        return data
+
     def _serialize(self, target: Target, include_screen_docs: bool = False) -> dict:
         data = target.to_dict()
 
@@ -169,7 +181,7 @@ class TargetService:
                 db.add(TargetScreen(target_id=target.id, screen_id=screen_id))
 
             await db.commit()
-            await db.refresh(target)
+            target = await self._get_full(db, target.id)
 
             result_dict = target.to_dict()
             result_dict["screen_ids"] = screen_ids
@@ -186,7 +198,9 @@ class TargetService:
     async def update(self, db: AsyncSession, target_id: int, data: dict, user_id: int):
         try:
             result = await db.execute(
-                select(Target).where(Target.id == target_id, Target.user_id == user_id)
+                select(Target)
+                .options(undefer_group("descriptions"))
+                .where(Target.id == target_id, Target.user_id == user_id)
             )
             target = result.scalar_one_or_none()
 
@@ -198,7 +212,7 @@ class TargetService:
                     setattr(target, field, value)
 
             await db.commit()
-            await db.refresh(target)
+            target = await self._get_full(db, target.id)
             return target.to_dict()
 
         except Exception as e:
@@ -241,7 +255,7 @@ class TargetService:
 
             target.deleted_at = None
             await db.commit()
-            await db.refresh(target)
+            target = await self._get_full(db, target.id)
             return target.to_dict()
 
         except Exception as e:
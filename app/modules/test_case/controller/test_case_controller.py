@@ -1,451 +1,157 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict
 
-from sqlalchemy.orm import Session, joinedload
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.sync_db import SessionLocal
-from app.modules.test_case.model.test_case_model import TestCase
-from app.modules.test_case.model.test_case_step_model import TestCaseStep
+from app.modules.test_case.service.test_case_service import TestCaseService
 from app.shared.controller import BaseController
-import datetime
 from app.modules.export.service.excel_service import ExcelService
-from fastapi.responses import StreamingResponse
-import io
+
 
 class TestCaseController(BaseController):
     def __init__(self):
+        self.service = TestCaseService()
         self.excel_service = ExcelService()
-        pass
 
     # =========================
-    # Helpers
+    # GET
     # =========================
 
-    def _serialize_step(self, step: TestCaseStep) -> Dict[str, Any]:
-        return {
-            "id": step.id,
-            "test_case_id": step.test_case_id,
-            "order": step.order,
-            "action": step.action,
-            "expected_result": step.expected_result,
-            "step_type": step.step_type,
-            "deleted_at": step.deleted_at
-        }
+    async def index(self, db: AsyncSession, target_id: int):
+        test_cases = await self.service.list_by_target(db, target_id)
 
-    def _serialize_test_case(self, tc: TestCase) -> Dict[str, Any]:
         return {
-            "id": tc.id,
-            "target_id": tc.target_id,
-            "title": tc.title,
-            "description": tc.description,
-            "objective": tc.objective,
-            "test_type": tc.test_type,
-            "scenario_type": tc.scenario_type,
-            "priority": tc.priority,
-            "risk_level": tc.risk_level,
-            "preconditions": tc.preconditions,
-            "postconditions": tc.postconditions,
-            "expected_result": tc.expected_result,
-            "status": tc.status,
-            "has_automation": tc.has_automation,
-            "automation_status": tc.automation_status,
-            "generated_by_ai": tc.generated_by_ai,
-            "ai_model_used": tc.ai_model_used,
-            "ai_confidence_score": tc.ai_confidence_score,
-            "steps": [self._serialize_step(s) for s in (tc.steps or [])],
-            "deleted_at": tc.deleted_at
+            "status": True,
+            "message": "casos de teste retornados com sucesso",
+            "data": test_cases,
         }
 
-    def _validate_steps_payload(self, steps: Any):
-        if steps is None:
-            return
-
-        if not isinstance(steps, list):
-            raise ValueError("steps deve ser uma lista")
-
-        for i, s in enumerate(steps):
-            if not isinstance(s, dict):
-                raise ValueError(f"steps[{i}] deve ser um objeto")
-
-            if "action" not in s or not s["action"]:
-                raise ValueError(f"steps[{i}].action é obrigatório")
-
-            if "expected_result" not in s or not s["expected_result"]:
-                raise ValueError(f"steps[{i}].expected_result é obrigatório")
-
-            if "order" in s and s["order"] is not None:
-                if not isinstance(s["order"], int):
-                    raise ValueError(f"steps[{i}].order deve ser inteiro")
+    async def duplicates(self, db: AsyncSession, target_id: int):
+        clusters = await self.service.find_duplicates(db, target_id)
 
-    # =========================
-    # GET
-    # =========================
-
-    async def index(self, target_id: int):
-        db: Session = SessionLocal()
-        try:
-            test_cases: List[TestCase] = (
-                db.query(TestCase)
-                .options(joinedload(TestCase.steps))
-                .filter(TestCase.target_id == target_id)
-                .order_by(TestCase.id.asc())
-                .all()
-            )
-
-            return {
-                "status": True,
-                "message": "casos de teste retornados com sucesso",
-                "data": [self._serialize_test_case(tc) for tc in test_cases],
-            }
-        finally:
-            db.close()
+        return {
+            "status": True,
+            "message": "grupos de casos duplicados retornados com sucesso",
+            "data": clusters,
+        }
 
     # =========================
     # POST (create)
     # =========================
 
-    async def store(self, target_id: int, payload: Dict[str, Any]):
-        db: Session = SessionLocal()
+    async def store(self, db: AsyncSession, target_id: int, payload: Dict[str, Any]):
         try:
-            title = (payload or {}).get("title")
-            if not title:
-                return {
-                    "status": False,
-                    "message": "title é obrigatório",
-                    "data": None,
-                }
-
-            steps_payload = (payload or {}).get("steps", [])
-            self._validate_steps_payload(steps_payload)
-
-            tc = TestCase(
-                target_id=target_id,
-                title=title,
-                description=payload.get("description"),
-                objective=payload.get("objective"),
-                test_type=payload.get("test_type", "functional"),
-                scenario_type=payload.get("scenario_type", "positive"),
-                priority=payload.get("priority", "medium"),
-                risk_level=payload.get("risk_level", "medium"),
-                preconditions=payload.get("preconditions"),
-                postconditions=payload.get("postconditions"),
-                expected_result=payload.get("expected_result"),
-                status=payload.get("status", "generated"),
-                has_automation=payload.get("has_automation", False),
-                automation_status=payload.get("automation_status", "not_generated"),
-                generated_by_ai=payload.get("generated_by_ai", True),
-                ai_model_used=payload.get("ai_model_used"),
-                ai_confidence_score=payload.get("ai_confidence_score"),
-            )
-
-            db.add(tc)
-            db.flush()
-
-            if steps_payload:
-                for idx, s in enumerate(steps_payload):
-                    step = TestCaseStep(
-                        test_case_id=tc.id,
-                        order=s.get("order", idx + 1),
-                        action=s["action"],
-                        expected_result=s["expected_result"],
-                        step_type=s.get("step_type", "action"),
-                    )
-                    db.add(step)
-
-            db.commit()
-
-            tc = (
-                db.query(TestCase)
-                .options(joinedload(TestCase.steps))
-                .filter(TestCase.id == tc.id)
-                .first()
-            )
-
+            data = await self.service.create(db, target_id, payload)
             return {
                 "status": True,
                 "message": "caso de teste criado com sucesso",
-                "data": self._serialize_test_case(tc),
+                "data": data,
             }
-
         except ValueError as e:
-            db.rollback()
             return {"status": False, "message": str(e), "data": None}
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao criar caso de teste: {e}", "data": None}
-        finally:
-            db.close()
 
     # =========================
     # PUT (update + sync steps)
     # =========================
 
-    async def update(self, target_id: int, test_case_id: int, payload: Dict[str, Any]):
-        db: Session = SessionLocal()
+    async def update(self, db: AsyncSession, target_id: int, test_case_id: int, payload: Dict[str, Any]):
         try:
-            tc: Optional[TestCase] = (
-                db.query(TestCase)
-                .options(joinedload(TestCase.steps))
-                .filter(TestCase.id == test_case_id)
-                .filter(TestCase.target_id == target_id)
-                .first()
-            )
-
-            if not tc:
-                return {
-                    "status": False,
-                    "message": "caso de teste não encontrado",
-                    "data": None,
-                }
-
-            updatable_fields = [
-                "title", "description", "objective", "test_type", "scenario_type",
-                "priority", "risk_level", "preconditions", "postconditions",
-                "expected_result", "status", "has_automation", "automation_status",
-                "generated_by_ai", "ai_model_used", "ai_confidence_score",
-            ]
-
-            for f in updatable_fields:
-                if f in payload:
-                    setattr(tc, f, payload.get(f))
-
-            if "steps" in payload:
-                steps_payload = payload.get("steps")
-                self._validate_steps_payload(steps_payload)
-
-                existing_by_id: Dict[int, TestCaseStep] = {s.id: s for s in (tc.steps or [])}
-                received_ids: set[int] = set()
-
-                for idx, s in enumerate(steps_payload or []):
-                    step_id = s.get("id")
-
-                    if step_id is not None:
-                        received_ids.add(step_id)
-
-                        if step_id not in existing_by_id:
-                            return {
-                                "status": False,
-                                "message": f"step id={step_id} não pertence a esse caso de teste",
-                                "data": None,
-                            }
-
-                        step_obj = existing_by_id[step_id]
-                        if "order" in s:
-                            step_obj.order = s.get("order", step_obj.order)
-                        step_obj.action = s["action"]
-                        step_obj.expected_result = s["expected_result"]
-                        step_obj.step_type = s.get("step_type", step_obj.step_type)
-
-                    else:
-                        new_step = TestCaseStep(
-                            test_case_id=tc.id,
-                            order=s.get("order", idx + 1),
-                            action=s["action"],
-                            expected_result=s["expected_result"],
-                            step_type=s.get("step_type", "action"),
-                        )
-                        db.add(new_step)
-
-                for step in list(tc.steps or []):
-                    if step.id not in received_ids and step.id is not None:
-                        db.delete(step)
-
-            db.commit()
-
-            tc = (
-                db.query(TestCase)
-                .options(joinedload(TestCase.steps))
-                .filter(TestCase.id == tc.id)
-                .first()
-            )
-
+            data = await self.service.update(db, target_id, test_case_id, payload)
             return {
                 "status": True,
                 "message": "caso de teste atualizado com sucesso",
-                "data": self._serialize_test_case(tc),
+                "data": data,
             }
-
         except ValueError as e:
-            db.rollback()
             return {"status": False, "message": str(e), "data": None}
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao atualizar caso de teste: {e}", "data": None}
-        finally:
-            db.close()
 
-    async def soft_delete(self, target_id: int, test_case_id: int):
-        db: Session = SessionLocal()
+    async def soft_delete(self, db: AsyncSession, target_id: int, test_case_id: int):
         try:
-            tc = (
-                db.query(TestCase)
-                .filter(TestCase.id == test_case_id)
-                .filter(TestCase.target_id == target_id)
-                .first()
-            )
-
-            if not tc:
-                return {"status": False, "message": "caso de teste não encontrado", "data": None}
-
-            tc.deleted_at = datetime.datetime.utcnow()
-            db.commit()
-
-            return {"status": True, "message": "caso de teste apagado com sucesso", "data": self._serialize_test_case(tc)}
-
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao apagar caso de teste: {e}", "data": None}
-        finally:
-            db.close()
-
-    async def restore(self, target_id: int, test_case_id: int, restore_status: str = "generated"):
-        db: Session = SessionLocal()
-        try:
-            tc = (
-                db.query(TestCase)
-                .filter(TestCase.id == test_case_id)
-                .filter(TestCase.target_id == target_id)
-                .first()
-            )
-
-            if not tc:
-                return {"status": False, "message": "caso de teste não encontrado", "data": None}
-
-            if not tc.deleted_at:
-                return {"status": False, "message": "caso de teste não está apagado", "data": None}
-
-            tc.deleted_at = None
-            db.commit()
-
-            return {"status": True, "message": "caso de teste recuperado com sucesso", "data": self._serialize_test_case(tc)}
-
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao recuperar caso de teste: {e}", "data": None}
-        finally:
-            db.close()
+            data = await self.service.soft_delete(db, target_id, test_case_id)
+            return {"status": True, "message": "caso de teste apagado com sucesso", "data": data}
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
-    async def step_soft_delete(self, target_id: int, test_case_id: int, step_id: int):
-        db: Session = SessionLocal()
+    async def restore(self, db: AsyncSession, target_id: int, test_case_id: int, restore_status: str = "generated"):
         try:
-            step = (
-                db.query(TestCaseStep)
-                .join(TestCase, TestCase.id == TestCaseStep.test_case_id)
-                .filter(TestCase.target_id == target_id)
-                .filter(TestCase.id == test_case_id)
-                .filter(TestCaseStep.id == step_id)
-                .first()
-            )
-
-            if not step:
-                return {"status": False, "message": "step não encontrado", "data": None}
-
-            step.deleted_at = datetime.datetime.utcnow()
-            db.commit()
-
-            return {"status": True, "message": "step apagado com sucesso", "data": {"id": step.id}}
-
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao apagar step: {e}", "data": None}
-        finally:
-            db.close()
+            data = await self.service.restore(db, target_id, test_case_id)
+            return {"status": True, "message": "caso de teste recuperado com sucesso", "data": data}
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
-    async def step_restore(self, target_id: int, test_case_id: int, step_id: int):
-        db: Session = SessionLocal()
+    async def step_soft_delete(self, db: AsyncSession, target_id: int, test_case_id: int, step_id: int):
         try:
-            step = (
-                db.query(TestCaseStep)
-                .join(TestCase, TestCase.id == TestCaseStep.test_case_id)
-                .filter(TestCase.target_id == target_id)
-                .filter(TestCase.id == test_case_id)
-                .filter(TestCaseStep.id == step_id)
-                .first()
-            )
-
-            if not step:
-                return {"status": False, "message": "step não encontrado", "data": None}
-
-            step.deleted_at = None
-            db.commit()
-
-            return {"status": True, "message": "step recuperado com sucesso", "data": {"id": step.id}}
-
-        except Exception as e:
-            db.rollback()
-            return {"status": False, "message": f"erro ao recuperar step: {e}", "data": None}
-        finally:
-            db.close()
+            data = await self.service.step_soft_delete(db, target_id, test_case_id, step_id)
+            return {"status": True, "message": "step apagado com sucesso", "data": data}
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
-    async def export_test_cases(self, target_id: int):
-        db: Session = SessionLocal()
+    async def step_restore(self, db: AsyncSession, target_id: int, test_case_id: int, step_id: int):
         try:
-            test_cases: List[TestCase] = (
-                db.query(TestCase)
-                .options(joinedload(TestCase.steps))
-                .filter(
-                    TestCase.target_id == target_id,
-                    TestCase.deleted_at.is_(None),
-                )
-                .order_by(TestCase.id.asc())
-                .all()
-            )
-
-            SCENARIO_MAP = {"positive": "Positivo", "negative": "Negativo", "edge": "Caso Limite"}
-            TEST_TYPE_MAP = {"functional": "Funcional", "regression": "Regressão", "smoke": "Smoke", "exploratory": "Exploratório"}
-            PRIORITY_MAP = {"low": "Baixa", "medium": "Média", "high": "Alta", "critical": "Crítica"}
-            RISK_MAP = {"low": "Baixo", "medium": "Médio", "high": "Alto"}
-            STATUS_MAP = {"generated": "Gerado", "reviewed": "Revisado", "approved": "Aprovado", "deprecated": "Obsoleto"}
-            STEP_TYPE_MAP = {"action": "Ação", "assertion": "Validação", "setup": "Preparação"}
-
-            def translate(value: str, mapping: dict) -> str:
-                return mapping.get(value, value) if value else "-"
-
-            def format_bool(value: bool) -> str:
-                return "Sim" if value else "Não"
-
-            def format_text(value: str) -> str:
-                return " ".join(value.strip().split()) if value else "-"
-
-            cases_data = [
-                {
-                    "ID": tc.id,
-                    "Título": format_text(tc.title),
-                    "Tipo": translate(tc.test_type, TEST_TYPE_MAP),
-                    "Cenário": translate(tc.scenario_type, SCENARIO_MAP),
-                    "Prioridade": translate(tc.priority, PRIORITY_MAP),
-                    "Risco": translate(tc.risk_level, RISK_MAP),
-                    "Status": translate(tc.status, STATUS_MAP),
-                    "Automação": format_bool(tc.has_automation),
-                    "Resultado Esperado": format_text(tc.expected_result),
-                }
-                for tc in test_cases
-            ]
-
-            steps_data = [
-                {
-                    "Caso ID": tc.id,
-                    "Caso Título": format_text(tc.title),
-                    "Ordem": step.order,
-                    "Tipo Step": translate(step.step_type, STEP_TYPE_MAP),
-                    "Ação": format_text(step.action),
-                    "Resultado Esperado": format_text(step.expected_result),
-                }
-                for tc in test_cases
-                for step in tc.steps
-                if not step.deleted_at
-            ]
-
-            file = self.excel_service.generate_excel(
-                {"Test Cases": cases_data, "Steps": steps_data}
-            )
-
-            return StreamingResponse(
-                file,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                headers={
-                    "Content-Disposition": f'attachment; filename="test_cases_{target_id}.xlsx"'
-                },
-            )
+            data = await self.service.step_restore(db, target_id, test_case_id, step_id)
+            return {"status": True, "message": "step recuperado com sucesso", "data": data}
+        except ValueError as e:
+            return {"status": False, "message": str(e), "data": None}
 
-        finally:
-            db.close()
+    async def export_test_cases(self, db: AsyncSession, target_id: int):
+        test_cases = await self.service.list_for_export(db, target_id)
+
+        SCENARIO_MAP = {"positive": "Positivo", "negative": "Negativo", "edge": "Caso Limite"}
+        TEST_TYPE_MAP = {"functional": "Funcional", "regression": "Regressão", "smoke": "Smoke", "exploratory": "Exploratório"}
+        PRIORITY_MAP = {"low": "Baixa", "medium": "Média", "high": "Alta", "critical": "Crítica"}
+        RISK_MAP = {"low": "Baixo", "medium": "Médio", "high": "Alto"}
+        STATUS_MAP = {"generated": "Gerado", "reviewed": "Revisado", "approved": "Aprovado", "deprecated": "Obsoleto"}
+        STEP_TYPE_MAP = {"action": "Ação", "assertion": "Validação", "setup": "Preparação"}
+
+        def translate(value: str, mapping: dict) -> str:
+            return mapping.get(value, value) if value else "-"
+
+        def format_bool(value: bool) -> str:
+            return "Sim" if value else "Não"
+
+        def format_text(value: str) -> str:
+            return " ".join(value.strip().split()) if value else "-"
+
+        cases_data = [
+            {
+                "ID": tc.id,
+                "Título": format_text(tc.title),
+                "Tipo": translate(tc.test_type, TEST_TYPE_MAP),
+                "Cenário": translate(tc.scenario_type, SCENARIO_MAP),
+                "Prioridade": translate(tc.priority, PRIORITY_MAP),
+                "Risco": translate(tc.risk_level, RISK_MAP),
+                "Status": translate(tc.status, STATUS_MAP),
+                "Automação": format_bool(tc.has_automation),
+                "Resultado Esperado": format_text(tc.expected_result),
+            }
+            for tc in test_cases
+        ]
+
+        steps_data = [
+            {
+                "Caso ID": tc.id,
+                "Caso Título": format_text(tc.title),
+                "Ordem": step.order,
+                "Tipo Step": translate(step.step_type, STEP_TYPE_MAP),
+                "Ação": format_text(step.action),
+                "Resultado Esperado": format_text(step.expected_result),
+            }
+            for tc in test_cases
+            for step in tc.steps
+            if not step.deleted_at
+        ]
+
+        # openpyxl é CPU-bound — roda fora do event loop
+        file = await run_in_threadpool(
+            self.excel_service.generate_excel,
+            {"Test Cases": cases_data, "Steps": steps_data},
+        )
+
+        return StreamingResponse(
+            file,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={
+                "Content-Disposition": f'attachment; filename="test_cases_{target_id}.xlsx"'
+            },
+        )
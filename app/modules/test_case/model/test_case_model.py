@@ -118,6 +118,14 @@ class TestCase(Base):
     ai_model_used = Column(String(100), nullable=True)
     ai_confidence_score = Column(Float, nullable=True)
 
+    # quase-duplicata de outro caso do mesmo alvo (índice de similaridade)
+    duplicate_of_id = Column(
+        Integer,
+        ForeignKey("test_cases.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
     deleted_at = Column(DateTime, nullable=True, default=None)
 
     # relacionamentos
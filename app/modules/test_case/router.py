@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Depends
+
+from app.core.database.async_db import get_db
 from app.modules.test_case.controller.test_case_controller import TestCaseController
 
 router = APIRouter(
@@ -10,18 +12,29 @@ controller = TestCaseController()
 
 
 @router.get("/")
-async def index(target_id: int):
-    return await controller.index(target_id=target_id)
+async def index(target_id: int, db=Depends(get_db)):
+    return await controller.index(db=db, target_id=target_id)
+
+
+@router.get("/duplicates")
+async def duplicates(target_id: int, db=Depends(get_db)):
+    return await controller.duplicates(db=db, target_id=target_id)
 
 
 @router.post("/")
-async def store(target_id: int, payload: dict = Body(...)):
-    return await controller.store(target_id=target_id, payload=payload)
+async def store(target_id: int, payload: dict = Body(...), db=Depends(get_db)):
+    return await controller.store(db=db, target_id=target_id, payload=payload)
 
 
 @router.put("/{test_case_id}")
-async def update(target_id: int, test_case_id: int, payload: dict = Body(...)):
+async def update(
+    target_id: int,
+    test_case_id: int,
+    payload: dict = Body(...),
+    db=Depends(get_db),
+):
     return await controller.update(
+        db=db,
         target_id=target_id,
         test_case_id=test_case_id,
         payload=payload,
@@ -29,14 +42,20 @@ async def update(target_id: int, test_case_id: int, payload: dict = Body(...)):
 
 
 @router.delete("/{test_case_id}")
-async def soft_delete(target_id: int, test_case_id: int):
-    return await controller.soft_delete(target_id=target_id, test_case_id=test_case_id)
+async def soft_delete(target_id: int, test_case_id: int, db=Depends(get_db)):
+    return await controller.soft_delete(db=db, target_id=target_id, test_case_id=test_case_id)
 
 
 @router.post("/{test_case_id}/restore")
-async def restore(target_id: int, test_case_id: int, payload: dict = Body(default={})):
+async def restore(
+    target_id: int,
+    test_case_id: int,
+    payload: dict = Body(default={}),
+    db=Depends(get_db),
+):
     restore_status = payload.get("restore_status", "generated")
     return await controller.restore(
+        db=db,
         target_id=target_id,
         test_case_id=test_case_id,
         restore_status=restore_status,
@@ -44,8 +63,9 @@ async def restore(target_id: int, test_case_id: int, payload: dict = Body(defaul
 
 
 @router.delete("/{test_case_id}/steps/{step_id}")
-async def step_soft_delete(target_id: int, test_case_id: int, step_id: int):
+async def step_soft_delete(target_id: int, test_case_id: int, step_id: int, db=Depends(get_db)):
     return await controller.step_soft_delete(
+        db=db,
         target_id=target_id,
         test_case_id=test_case_id,
         step_id=step_id,
@@ -53,8 +73,9 @@ async def step_soft_delete(target_id: int, test_case_id: int, step_id: int):
 
 
 @router.post("/{test_case_id}/steps/{step_id}/restore")
-async def step_restore(target_id: int, test_case_id: int, step_id: int):
+async def step_restore(target_id: int, test_case_id: int, step_id: int, db=Depends(get_db)):
     return await controller.step_restore(
+        db=db,
         target_id=target_id,
         test_case_id=test_case_id,
         step_id=step_id,
@@ -62,5 +83,5 @@ async def step_restore(target_id: int, test_case_id: int, step_id: int):
 
 
 @router.get("/export", status_code=200)
-async def export_test_cases(target_id: int):
-    return await controller.export_test_cases(target_id=target_id)
+async def export_test_cases(target_id: int, db=Depends(get_db)):
+    return await controller.export_test_cases(db=db, target_id=target_id)
@@ -0,0 +1,363 @@
+import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.modules.test_case.model.test_case_model import TestCase
+from app.modules.test_case.model.test_case_step_model import TestCaseStep
+from app.modules.test_case.service.test_case_similarity import TestCaseSimilarityIndex, case_text
+
+
+UPDATABLE_FIELDS = [
+    "title", "description", "objective", "test_type", "scenario_type",
+    "priority", "risk_level", "preconditions", "postconditions",
+    "expected_result", "status", "has_automation", "automation_status",
+    "generated_by_ai", "ai_model_used", "ai_confidence_score", "duplicate_of_id",
+]
+
+
+class TestCaseService:
+
+    # =========================
+    # Serialização / validação
+    # =========================
+
+    def serialize_step(self, step: TestCaseStep) -> Dict[str, Any]:
+        return {
+            "id": step.id,
+            "test_case_id": step.test_case_id,
+            "order": step.order,
+            "action": step.action,
+            "expected_result": step.expected_result,
+            "step_type": step.step_type,
+            "deleted_at": step.deleted_at
+        }
+
+    def serialize(self, tc: TestCase) -> Dict[str, Any]:
+        return {
+            "id": tc.id,
+            "target_id": tc.target_id,
+            "title": tc.title,
+            "description": tc.description,
+            "objective": tc.objective,
+            "test_type": tc.test_type,
+            "scenario_type": tc.scenario_type,
+            "priority": tc.priority,
+            "risk_level": tc.risk_level,
+            "preconditions": tc.preconditions,
+            "postconditions": tc.postconditions,
+            "expected_result": tc.expected_result,
+            "status": tc.status,
+            "has_automation": tc.has_automation,
+            "automation_status": tc.automation_status,
+            "generated_by_ai": tc.generated_by_ai,
+            "ai_model_used": tc.ai_model_used,
+            "ai_confidence_score": tc.ai_confidence_score,
+            "duplicate_of_id": tc.duplicate_of_id,
+            "steps": [self.serialize_step(s) for s in (tc.steps or [])],
+            "deleted_at": tc.deleted_at
+        }
+
+    def _validate_steps_payload(self, steps: Any):
+        if steps is None:
+            return
+
+        if not isinstance(steps, list):
+            raise ValueError("steps deve ser uma lista")
+
+        for i, s in enumerate(steps):
+            if not isinstance(s, dict):
+                raise ValueError(f"steps[{i}] deve ser um objeto")
+
+            if "action" not in s or not s["action"]:
+                raise ValueError(f"steps[{i}].action é obrigatório")
+
+            if "expected_result" not in s or not s["expected_result"]:
+                raise ValueError(f"steps[{i}].expected_result é obrigatório")
+
+            if "order" in s and s["order"] is not None:
+                if not isinstance(s["order"], int):
+                    raise ValueError(f"steps[{i}].order deve ser inteiro")
+
+    # =========================
+    # Queries
+    # =========================
+
+    async def _get_with_steps(self, db: AsyncSession, target_id: int, test_case_id: int) -> TestCase:
+        result = await db.execute(
+            select(TestCase)
+            .options(selectinload(TestCase.steps))
+            .where(TestCase.id == test_case_id, TestCase.target_id == target_id)
+            .execution_options(populate_existing=True)
+        )
+        tc = result.scalar_one_or_none()
+
+        if not tc:
+            raise ValueError("caso de teste não encontrado")
+
+        return tc
+
+    async def _get_step(self, db: AsyncSession, target_id: int, test_case_id: int, step_id: int) -> TestCaseStep:
+        result = await db.execute(
+            select(TestCaseStep)
+            .join(TestCase, TestCase.id == TestCaseStep.test_case_id)
+            .where(
+                TestCase.target_id == target_id,
+                TestCase.id == test_case_id,
+                TestCaseStep.id == step_id,
+            )
+        )
+        step = result.scalar_one_or_none()
+
+        if not step:
+            raise ValueError("step não encontrado")
+
+        return step
+
+    async def list_by_target(self, db: AsyncSession, target_id: int) -> List[Dict[str, Any]]:
+        result = await db.execute(
+            select(TestCase)
+            .options(selectinload(TestCase.steps))
+            .where(TestCase.target_id == target_id)
+            .order_by(TestCase.id.asc())
+        )
+        return [self.serialize(tc) for tc in result.scalars().all()]
+
+    async def list_for_export(self, db: AsyncSession, target_id: int) -> List[TestCase]:
+        result = await db.execute(
+            select(TestCase)
+            .options(selectinload(TestCase.steps))
+            .where(
+                TestCase.target_id == target_id,
+                TestCase.deleted_at.is_(None),
+                TestCase.duplicate_of_id.is_(None),
+            )
+            .order_by(TestCase.id.asc())
+        )
+        return list(result.scalars().all())
+
+    async def find_duplicates(self, db: AsyncSession, target_id: int) -> List[Dict[str, Any]]:
+        """Grupos de casos ativos quase idênticos (título, objetivo e steps)."""
+        result = await db.execute(
+            select(TestCase)
+            .options(selectinload(TestCase.steps))
+            .where(
+                TestCase.target_id == target_id,
+                TestCase.deleted_at.is_(None),
+            )
+            .order_by(TestCase.id.asc())
+        )
+        test_cases = {tc.id: tc for tc in result.scalars().all()}
+
+        index = TestCaseSimilarityIndex()
+        for tc in test_cases.values():
+            index.add(tc.id, case_text(tc.title, tc.objective, (s.action for s in tc.steps if not s.deleted_at)))
+
+        clusters = sorted(index.clusters(), key=lambda c: len(c["keys"]), reverse=True)
+
+        return [
+            {
+                "size": len(cluster["keys"]),
+                "max_similarity": cluster["max_similarity"],
+                "min_similarity": cluster["min_similarity"],
+                "test_cases": [
+                    {
+                        "id": test_cases[tc_id].id,
+                        "title": test_cases[tc_id].title,
+                        "status": test_cases[tc_id].status,
+                        "duplicate_of_id": test_cases[tc_id].duplicate_of_id,
+                        "created_at": test_cases[tc_id].created_at,
+                    }
+                    for tc_id in cluster["keys"]
+                ],
+            }
+            for cluster in clusters
+        ]
+
+    # =========================
+    # Escrita
+    # =========================
+
+    async def create(self, db: AsyncSession, target_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            title = (payload or {}).get("title")
+            if not title:
+                raise ValueError("title é obrigatório")
+
+            steps_payload = (payload or {}).get("steps", [])
+            self._validate_steps_payload(steps_payload)
+
+            tc = TestCase(
+                target_id=target_id,
+                title=title,
+                description=payload.get("description"),
+                objective=payload.get("objective"),
+                test_type=payload.get("test_type", "functional"),
+                scenario_type=payload.get("scenario_type", "positive"),
+                priority=payload.get("priority", "medium"),
+                risk_level=payload.get("risk_level", "medium"),
+                preconditions=payload.get("preconditions"),
+                postconditions=payload.get("postconditions"),
+                expected_result=payload.get("expected_result"),
+                status=payload.get("status", "generated"),
+                has_automation=payload.get("has_automation", False),
+                automation_status=payload.get("automation_status", "not_generated"),
+                generated_by_ai=payload.get("generated_by_ai", True),
+                ai_model_used=payload.get("ai_model_used"),
+                ai_confidence_score=payload.get("ai_confidence_score"),
+            )
+
+            db.add(tc)
+            await db.flush()
+
+            for idx, s in enumerate(steps_payload or []):
+                db.add(TestCaseStep(
+                    test_case_id=tc.id,
+                    order=s.get("order", idx + 1),
+                    action=s["action"],
+                    expected_result=s["expected_result"],
+                    step_type=s.get("step_type", "action"),
+                ))
+
+            await db.commit()
+
+            tc = await self._get_with_steps(db, target_id, tc.id)
+            return self.serialize(tc)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao criar caso de teste: {e}")
+
+    async def update(
+        self,
+        db: AsyncSession,
+        target_id: int,
+        test_case_id: int,
+        payload: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        try:
+            tc = await self._get_with_steps(db, target_id, test_case_id)
+
+            for f in UPDATABLE_FIELDS:
+                if f in payload:
+                    setattr(tc, f, payload.get(f))
+
+            if "steps" in payload:
+                steps_payload = payload.get("steps")
+                self._validate_steps_payload(steps_payload)
+
+                existing_by_id: Dict[int, TestCaseStep] = {s.id: s for s in (tc.steps or [])}
+                received_ids: set[int] = set()
+
+                for idx, s in enumerate(steps_payload or []):
+                    step_id = s.get("id")
+
+                    if step_id is not None:
+                        received_ids.add(step_id)
+
+                        if step_id not in existing_by_id:
+                            raise ValueError(f"step id={step_id} não pertence a esse caso de teste")
+
+                        step_obj = existing_by_id[step_id]
+                        if "order" in s:
+                            step_obj.order = s.get("order", step_obj.order)
+                        step_obj.action = s["action"]
+                        step_obj.expected_result = s["expected_result"]
+                        step_obj.step_type = s.get("step_type", step_obj.step_type)
+
+                    else:
+                        db.add(TestCaseStep(
+                            test_case_id=tc.id,
+                            order=s.get("order", idx + 1),
+                            action=s["action"],
+                            expected_result=s["expected_result"],
+                            step_type=s.get("step_type", "action"),
+                        ))
+
+                for step in list(tc.steps or []):
+                    if step.id not in received_ids and step.id is not None:
+                        await db.delete(step)
+
+            await db.commit()
+
+            tc = await self._get_with_steps(db, target_id, tc.id)
+            return self.serialize(tc)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao atualizar caso de teste: {e}")
+
+    async def soft_delete(self, db: AsyncSession, target_id: int, test_case_id: int) -> Dict[str, Any]:
+        try:
+            tc = await self._get_with_steps(db, target_id, test_case_id)
+
+            tc.deleted_at = datetime.datetime.utcnow()
+            await db.commit()
+
+            return self.serialize(tc)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao apagar caso de teste: {e}")
+
+    async def restore(self, db: AsyncSession, target_id: int, test_case_id: int) -> Dict[str, Any]:
+        try:
+            tc = await self._get_with_steps(db, target_id, test_case_id)
+
+            if not tc.deleted_at:
+                raise ValueError("caso de teste não está apagado")
+
+            tc.deleted_at = None
+            await db.commit()
+
+            return self.serialize(tc)
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao recuperar caso de teste: {e}")
+
+    async def step_soft_delete(self, db: AsyncSession, target_id: int, test_case_id: int, step_id: int) -> Dict[str, Any]:
+        try:
+            step = await self._get_step(db, target_id, test_case_id, step_id)
+
+            step.deleted_at = datetime.datetime.utcnow()
+            await db.commit()
+
+            return {"id": step.id}
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao apagar step: {e}")
+
+    async def step_restore(self, db: AsyncSession, target_id: int, test_case_id: int, step_id: int) -> Dict[str, Any]:
+        try:
+            step = await self._get_step(db, target_id, test_case_id, step_id)
+
+            step.deleted_at = None
+            await db.commit()
+
+            return {"id": step.id}
+
+        except ValueError:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"erro ao recuperar step: {e}")
@@ -0,0 +1,133 @@
+"""
+Índice de similaridade entre casos de teste de um mesmo alvo.
+
+Cada caso vira um conjunto de shingles (palavras e pares de palavras de
+título, objetivo e ações dos steps) e uma assinatura MinHash em NumPy. A
+similaridade estimada é a fração de posições iguais entre assinaturas
+(≈ Jaccard dos shingles).
+"""
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+import zlib
+from typing import Any, Iterable
+
+import numpy as np
+
+# Jaccard estimado a partir do qual dois casos são considerados duplicados
+TEST_CASE_DUPLICATE_THRESHOLD = float(os.getenv("TEST_CASE_DUPLICATE_THRESHOLD", "0.8"))
+# skip: não grava a duplicata | flag: grava com duplicate_of_id | off: não consulta
+TEST_CASE_DUPLICATE_POLICY = os.getenv("TEST_CASE_DUPLICATE_POLICY", "skip").lower()
+
+NUM_PERMUTATIONS = 64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def case_text(title: str | None, objective: str | None, step_actions: Iterable[str | None]) -> str:
+    return " \n".join(filter(None, [title, objective, *step_actions]))
+
+
+def _normalize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _WORD_RE.findall(text)
+
+
+def shingles(text: str) -> set[str]:
+    words = _normalize(text)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(text: str) -> np.ndarray:
+    items = shingles(text)
+    if not items:
+        return np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.int64)
+
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in items), dtype=np.int64, count=len(items))
+    hashes %= _PRIME
+    # (a·x + b) mod p para cada permutação; mínimo por coluna
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+class TestCaseSimilarityIndex:
+    """
+    Índice em memória das assinaturas de um alvo. As chaves são ids (casos
+    já gravados) ou os próprios objetos TestCase ainda sem id.
+    """
+
+    def __init__(self, threshold: float = TEST_CASE_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.keys: list[Any] = []
+        # buffer com capacidade dobrada sob demanda; linhas válidas: [:len(keys)]
+        self._buffer = np.empty((64, NUM_PERMUTATIONS), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def _signatures(self) -> np.ndarray:
+        return self._buffer[:len(self.keys)]
+
+    def add(self, key: Any, text: str) -> None:
+        n = len(self.keys)
+        if n == len(self._buffer):
+            self._buffer = np.concatenate([self._buffer, np.empty_like(self._buffer)])
+        self._buffer[n] = minhash(text)
+        self.keys.append(key)
+
+    def match(self, text: str) -> tuple[Any, float] | None:
+        """Retorna (chave, similaridade) do caso mais parecido acima do limiar."""
+        if not self.keys:
+            return None
+
+        scores = (self._signatures == minhash(text)).mean(axis=1)
+        best = int(scores.argmax())
+        if scores[best] >= self.threshold:
+            return self.keys[best], float(scores[best])
+        return None
+
+    def clusters(self) -> list[dict]:
+        """
+        Agrupa as chaves cujas assinaturas passam do limiar (união
+        transitiva). Retorna só grupos com 2+ membros.
+        """
+        n = len(self.keys)
+        parent = list(range(n))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        best: dict[tuple[int, int], float] = {}
+        for i in range(n - 1):
+            scores = (self._signatures[i + 1:] == self._signatures[i]).mean(axis=1)
+            for offset in np.nonzero(scores >= self.threshold)[0]:
+                j = i + 1 + int(offset)
+                best[(i, j)] = float(scores[offset])
+                parent[find(j)] = find(i)
+
+        groups: dict[int, list[int]] = {}
+        for i in range(n):
+            groups.setdefault(find(i), []).append(i)
+
+        result = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            member_set = set(members)
+            pair_scores = [s for (i, j), s in best.items() if i in member_set and j in member_set]
+            result.append({
+                "keys": [self.keys[i] for i in members],
+                "max_similarity": round(max(pair_scores), 3),
+                "min_similarity": round(min(pair_scores), 3),
+            })
+        return result
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import tuple_
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps({"c": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except Exception:
+        raise ValueError("Cursor de paginação inválido")
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def apply_listing_filters(
+    query,
+    model,
+    *,
+    status: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    if status:
+        query = query.where(model.status == status)
+    if name_prefix:
+        query = query.where(model.name.ilike(f"{escape_like(name_prefix)}%", escape="\\"))
+    if created_from:
+        query = query.where(model.created_at >= created_from)
+    if created_to:
+        query = query.where(model.created_at < created_to)
+    return query
+
+
+def keyset_page(query, model, *, cursor: Optional[str], limit: int):
+    """
+    Aplica paginação keyset em (created_at, id) decrescente.
+    Busca limit + 1 linhas para saber se existe próxima página.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    return (
+        query
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+
+
+def build_page(rows: list, items: list[Any], limit: int) -> dict:
+    """
+    Monta o envelope de resposta a partir das linhas retornadas por keyset_page.
+    """
+    has_more = len(rows) > limit
+    next_cursor = None
+    if has_more:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return {
+        "items": items[:limit],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
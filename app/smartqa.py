@@ -512,6 +512,49 @@ def db_seed():
     ])
 
 
+@app.command("docs:ingest-pending")
+def docs_ingest_pending(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Só conta, sem enfileirar"),
+):
+    """
+    Enfileira a ingestão dos documentos de tela ainda pendentes (ex.: enviados antes da ingestão automática)
+    """
+    subprocess.run([
+        "python",
+        "-c",
+        "from app.jobs.screen.ingest_documents import queue_pending_ingestion; "
+        f"print(queue_pending_ingestion(dry_run={dry_run}))"
+    ])
+
+
+# =====================================================
+# Benchmarks
+# =====================================================
+@app.command("bench:extraction")
+def bench_extraction(
+    dir: str = typer.Option(None, help="Diretório com documentos reais"),
+    repeat: int = typer.Option(1, help="Repetições por arquivo"),
+):
+    """
+    Mede a extração de documentos por formato (roteador vs Docling)
+    """
+    args = ["python", "-m", "benchmarks.document_extraction", "--repeat", str(repeat)]
+    if dir:
+        args += ["--dir", dir]
+    subprocess.run(args)
+
+
+@app.command("bench:json")
+def bench_json(
+    sizes: str = typer.Option("1000,10000,100000", help="Tamanhos das respostas (caracteres)"),
+    repeat: int = typer.Option(20, help="Repetições por amostra"),
+):
+    """
+    Mede a extração de JSON das respostas de LLM (json_repair vs parser antigo)
+    """
+    subprocess.run(["python", "-m", "benchmarks.json_extraction", "--sizes", sizes, "--repeat", str(repeat)])
+
+
 # =====================================================
 # App
 # =====================================================
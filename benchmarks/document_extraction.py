@@ -0,0 +1,181 @@
+"""
+Benchmark da extração de documentos por formato.
+
+Compara o roteador (app.modules.ai.utils.document_extraction) com o caminho
+antigo (tudo pelo Docling), quando o Docling está instalado.
+
+Uso:
+    python -m benchmarks.document_extraction
+    python -m benchmarks.document_extraction --dir storage/screens/12 --repeat 3
+    smartqa bench:extraction
+
+Sem --dir, gera um corpus sintético (txt, md, PDF com texto e PDF sem camada
+de texto) num diretório temporário.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from app.modules.ai.utils.document_extraction import extract_document, extract_with_docling
+
+_PARAGRAPH = (
+    "O usuário acessa a tela de cadastro, preenche nome, e-mail e senha e clica em "
+    "Salvar. O sistema valida os campos obrigatórios e exibe mensagens de erro "
+    "quando o e-mail já está em uso ou a senha não atende à política mínima. "
+)
+
+_CONTENT_TYPES = {
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".pdf": "application/pdf",
+}
+
+
+def _pdf_bytes(pages: list[str]) -> bytes:
+    """
+    Monta um PDF mínimo, uma linha de texto por página (camada de texto real).
+    Páginas com string vazia simulam páginas escaneadas (sem texto).
+    """
+    objects: list[bytes] = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+
+    page_objects = []
+    for text in pages:
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        safe = text.encode("latin-1", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        stream = b"BT /F1 10 Tf 40 800 Td (" + safe + b") Tj ET" if text else b""
+        page_objects.append((content_id, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)))
+        page_objects.append((
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id),
+        ))
+        page_ids.append(page_id)
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects.append((1, b"<< /Type /Catalog /Pages 2 0 R >>"))
+    objects.append((2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))))
+    objects.append((3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    objects.extend(page_objects)
+    objects.sort(key=lambda item: item[0])
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id, body in objects:
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, body)
+
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in range(1, len(objects) + 1):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    return bytes(out)
+
+
+def build_corpus(folder: Path, files_per_format: int = 5, pages: int = 20) -> None:
+    body = "\n\n".join(_PARAGRAPH * 4 for _ in range(pages))
+
+    for i in range(files_per_format):
+        (folder / f"doc_{i}.txt").write_text(body, encoding="utf-8")
+        (folder / f"doc_{i}.md").write_text(f"# Documento {i}\n\n{body}", encoding="utf-8")
+        (folder / f"text_{i}.pdf").write_bytes(_pdf_bytes([_PARAGRAPH[:180]] * pages))
+        (folder / f"scanned_{i}.pdf").write_bytes(_pdf_bytes([""] * pages))
+
+
+def _format_of(path: Path) -> str:
+    if path.suffix.lower() == ".pdf":
+        return "pdf_scanned" if path.name.startswith("scanned_") else "pdf"
+    return path.suffix.lower().lstrip(".")
+
+
+def _docling_available() -> bool:
+    try:
+        import docling  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def run(folder: Path, repeat: int = 1, baseline: bool = True) -> list[dict]:
+    files = sorted(p for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in _CONTENT_TYPES)
+    with_docling = _docling_available()
+
+    strategies = {"router": lambda p: extract_document(str(p), _CONTENT_TYPES[p.suffix.lower()])}
+    if baseline and with_docling:
+        strategies["docling"] = extract_with_docling
+
+    rows = []
+    for name, extract in strategies.items():
+        totals = defaultdict(lambda: {"files": 0, "bytes": 0, "seconds": 0.0, "methods": set(), "skipped": 0})
+
+        for _ in range(repeat):
+            for path in files:
+                fmt = _format_of(path)
+                bucket = totals[fmt]
+                start = time.perf_counter()
+                try:
+                    result = extract(path)
+                except ImportError:
+                    bucket["skipped"] += 1
+                    continue
+                bucket["seconds"] += time.perf_counter() - start
+                bucket["files"] += 1
+                bucket["bytes"] += path.stat().st_size
+                bucket["methods"].add(result.get("method", name))
+
+        for fmt, bucket in sorted(totals.items()):
+            seconds = bucket["seconds"] or 1e-9
+            rows.append({
+                "strategy": name,
+                "format": fmt,
+                "files": bucket["files"],
+                "skipped": bucket["skipped"],
+                "files_per_s": bucket["files"] / seconds if bucket["files"] else 0.0,
+                "mb_per_s": bucket["bytes"] / seconds / 1_000_000 if bucket["files"] else 0.0,
+                "ms_per_file": seconds * 1000 / bucket["files"] if bucket["files"] else 0.0,
+                "methods": ",".join(sorted(bucket["methods"])) or "-",
+            })
+
+    return rows
+
+
+def print_rows(rows: list[dict]) -> None:
+    header = f"{'strategy':<10} {'format':<12} {'files':>6} {'skip':>5} {'files/s':>10} {'MB/s':>9} {'ms/file':>9}  methods"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['strategy']:<10} {r['format']:<12} {r['files']:>6} {r['skipped']:>5} "
+            f"{r['files_per_s']:>10.1f} {r['mb_per_s']:>9.2f} {r['ms_per_file']:>9.2f}  {r['methods']}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de extração de documentos por formato")
+    parser.add_argument("--dir", type=Path, help="diretório com documentos reais (txt/md/pdf)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--files", type=int, default=5, help="arquivos por formato no corpus sintético")
+    parser.add_argument("--pages", type=int, default=20, help="páginas por arquivo no corpus sintético")
+    parser.add_argument("--no-baseline", action="store_true", help="não roda o Docling para comparação")
+    args = parser.parse_args(argv)
+
+    if args.dir:
+        print_rows(run(args.dir, repeat=args.repeat, baseline=not args.no_baseline))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="smartqa-bench-") as tmp:
+        folder = Path(tmp)
+        build_corpus(folder, files_per_format=args.files, pages=args.pages)
+        print_rows(run(folder, repeat=args.repeat, baseline=not args.no_baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark da extração de JSON das respostas de LLM.
+
+Compara app.modules.ai.utils.json_repair com o parser antigo (regex gulosa
++ várias tentativas de json.loads + sanitização caractere a caractere +
+ast.literal_eval), sobre amostras com as falhas vistas em produção, em
+vários tamanhos.
+
+Uso:
+    python -m benchmarks.json_extraction
+    python -m benchmarks.json_extraction --sizes 1000,100000 --repeat 50
+    smartqa bench:json
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import re
+import time
+
+from app.modules.ai.utils.json_repair import extract_json_object
+
+_SENTENCE = (
+    "Na seção \"Planos e preços\" o usuário clica no botão {Assinar} e o modal "
+    "[Pagamento] abre com os campos E-mail e Cartão; "
+)
+
+
+def _payload(size: int) -> dict:
+    text = (_SENTENCE * (size // len(_SENTENCE) + 1))[: max(size // 4, 1)]
+    return {
+        "tests_description": text,
+        "playwright_description": text,
+        "documentation_description": text,
+        "uiux_description": text,
+    }
+
+
+def build_samples(size: int) -> dict[str, str]:
+    """Amostras com as falhas típicas (cada uma com ~size caracteres)."""
+    payload = _payload(size)
+    valid = json.dumps(payload, ensure_ascii=False)
+    with_newlines = json.dumps(payload, ensure_ascii=False).replace("; ", ";\n")
+    with_newlines = with_newlines.replace("\\n", "\n")
+
+    return {
+        "valid": valid,
+        "final_result_prefix": f"Final Result: {valid}\nTask completed.",
+        "markdown_fence": f"```json\n{valid}\n```",
+        "literal_newlines": with_newlines,
+        "trailing_commas": valid[:-1] + ",}",
+        "escaped": valid.replace('"', '\\"'),
+        "python_literal": repr(payload),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Parser antigo (AiUtils.parse_browseruse_json + _sanitize_json_strings)
+# ---------------------------------------------------------------------------
+
+def _legacy_sanitize(s: str) -> str:
+    result = []
+    in_string = False
+    escaped = False
+    for ch in s:
+        if escaped:
+            result.append(ch)
+            escaped = False
+        elif ch == "\\":
+            result.append(ch)
+            escaped = True
+        elif ch == '"':
+            in_string = not in_string
+            result.append(ch)
+        elif in_string and ch == "\n":
+            result.append("\\n")
+        elif in_string and ch == "\r":
+            result.append("\\r")
+        elif in_string and ch == "\t":
+            result.append("\\t")
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def legacy_parse(result: str) -> dict:
+    raw = result.strip()
+    m = re.search(r"\{.*\}", raw, flags=re.DOTALL)
+    if m:
+        raw = m.group(0).strip()
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(_legacy_sanitize(raw))
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(raw.replace('\\"', '"'))
+    except json.JSONDecodeError:
+        pass
+    try:
+        evaluated = ast.literal_eval(raw)
+        if isinstance(evaluated, str):
+            return json.loads(evaluated)
+        if isinstance(evaluated, dict):
+            return evaluated
+    except Exception:
+        pass
+    raise ValueError("não foi possível parsear")
+
+
+def _time(parse, text: str, repeat: int) -> tuple[float, bool]:
+    try:
+        parse(text)
+    except Exception:
+        return 0.0, False
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(text)
+    return (time.perf_counter() - start) * 1000 / repeat, True
+
+
+def run(sizes: list[int], repeat: int = 20) -> list[dict]:
+    strategies = {"repair": extract_json_object, "legacy": legacy_parse}
+    rows = []
+    for size in sizes:
+        for sample, text in build_samples(size).items():
+            row = {"size": len(text), "sample": sample}
+            for name, parse in strategies.items():
+                row[name] = _time(parse, text, repeat)
+            rows.append(row)
+    return rows
+
+
+def print_rows(rows: list[dict]) -> None:
+    header = f"{'sample':<22} {'chars':>8} {'repair ms':>10} {'legacy ms':>10} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        (new_ms, new_ok), (old_ms, old_ok) = r["repair"], r["legacy"]
+        new = f"{new_ms:>10.3f}" if new_ok else f"{'falhou':>10}"
+        old = f"{old_ms:>10.3f}" if old_ok else f"{'falhou':>10}"
+        speedup = f"{old_ms / new_ms:>7.1f}x" if new_ok and old_ok and new_ms else f"{'-':>8}"
+        print(f"{r['sample']:<22} {r['size']:>8} {new} {old} {speedup}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da extração de JSON de respostas de LLM")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="tamanhos aproximados (caracteres)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print_rows(run(sizes, repeat=args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""add duplicate_of_id to test_cases
+
+Revision ID: a7c3e9d1f5b2
+Revises: e0f1a2b3c4d5
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a7c3e9d1f5b2'
+down_revision = 'e0f1a2b3c4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('test_cases', sa.Column('duplicate_of_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_test_cases_duplicate_of_id',
+        'test_cases',
+        'test_cases',
+        ['duplicate_of_id'],
+        ['id'],
+        ondelete='SET NULL',
+    )
+    op.create_index('ix_test_cases_duplicate_of_id', 'test_cases', ['duplicate_of_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_test_cases_duplicate_of_id', table_name='test_cases')
+    op.drop_constraint('fk_test_cases_duplicate_of_id', 'test_cases', type_='foreignkey')
+    op.drop_column('test_cases', 'duplicate_of_id')
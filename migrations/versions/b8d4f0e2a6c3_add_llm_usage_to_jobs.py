@@ -0,0 +1,28 @@
+"""add llm token usage to target_jobs and screen_jobs
+
+Revision ID: b8d4f0e2a6c3
+Revises: a7c3e9d1f5b2
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b8d4f0e2a6c3'
+down_revision = 'a7c3e9d1f5b2'
+branch_labels = None
+depends_on = None
+
+USAGE_COLUMNS = ('llm_prompt_tokens', 'llm_cached_tokens', 'llm_completion_tokens')
+
+
+def upgrade() -> None:
+    for table in ('target_jobs', 'screen_jobs'):
+        for column in USAGE_COLUMNS:
+            op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ('target_jobs', 'screen_jobs'):
+        for column in reversed(USAGE_COLUMNS):
+            op.drop_column(table, column)
@@ -0,0 +1,35 @@
+"""add owner listing indexes to screens and targets
+
+Revision ID: c8d9e0f1a2b3
+Revises: b1c2d3e4f5a6
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c8d9e0f1a2b3'
+down_revision = 'b1c2d3e4f5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ('screens', 'targets'):
+        op.create_index(
+            f'ix_{table}_owner_active_created',
+            table,
+            ['owner_type', 'owner_id', 'created_at', 'id'],
+            postgresql_where=sa.text('deleted_at IS NULL'),
+        )
+        op.create_index(
+            f'ix_{table}_owner_deleted',
+            table,
+            ['owner_type', 'owner_id', 'deleted_at'],
+        )
+
+
+def downgrade() -> None:
+    for table in ('targets', 'screens'):
+        op.drop_index(f'ix_{table}_owner_deleted', table_name=table)
+        op.drop_index(f'ix_{table}_owner_active_created', table_name=table)
@@ -0,0 +1,28 @@
+"""add extraction cache columns to screen_documents
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd9e0f1a2b3c4'
+down_revision = 'c8d9e0f1a2b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('screen_documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('screen_documents', sa.Column('extracted_text', sa.Text(), nullable=True))
+    op.add_column('screen_documents', sa.Column('extracted_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_screen_documents_content_hash', 'screen_documents', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_screen_documents_content_hash', table_name='screen_documents')
+    op.drop_column('screen_documents', 'extracted_at')
+    op.drop_column('screen_documents', 'extracted_text')
+    op.drop_column('screen_documents', 'content_hash')
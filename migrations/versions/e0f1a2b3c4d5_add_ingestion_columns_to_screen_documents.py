@@ -0,0 +1,31 @@
+"""add ingestion columns to screen_documents
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e0f1a2b3c4d5'
+down_revision = 'd9e0f1a2b3c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'screen_documents',
+        sa.Column('ingestion_status', sa.String(length=20), nullable=False, server_default='pending'),
+    )
+    op.add_column('screen_documents', sa.Column('ingestion_error', sa.Text(), nullable=True))
+    op.add_column('screen_documents', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('screen_documents', sa.Column('language', sa.String(length=10), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('screen_documents', 'language')
+    op.drop_column('screen_documents', 'page_count')
+    op.drop_column('screen_documents', 'ingestion_error')
+    op.drop_column('screen_documents', 'ingestion_status')